@@ -2,9 +2,13 @@
 """
 Separates Authentifizierungs-Script für Google MCP Server
 Führe dieses Script aus, BEVOR du Claude Desktop startest
+
+Weitere Accounts (Multi-Account Betrieb): python3 authenticate.py <account>
 """
 
 import os
+import re
+import sys
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -21,9 +25,19 @@ SCOPES = [
 # Pfade für Credentials
 TOKEN_PATH = os.path.expanduser('~/.config/google-mcp/token.json')
 CREDENTIALS_PATH = os.path.expanduser('~/.config/google-mcp/credentials.json')
+ACCOUNTS_DIR = os.path.expanduser('~/.config/google-mcp/accounts')
+
+def token_path(account=None):
+    """Token-Datei des Standard-Accounts oder eines weiteren Accounts"""
+    if not account or account == 'default':
+        return TOKEN_PATH
+    if not re.fullmatch(r'[A-Za-z0-9@._+-]+', account):
+        raise ValueError(f"Ungültiger Account Name: {account}")
+    return os.path.join(ACCOUNTS_DIR, f'{account}.json')
 
-def authenticate():
+def authenticate(account=None):
     """OAuth 2.0 Authentifizierung"""
+    TOKEN_PATH = token_path(account)
     creds = None
 
     # Token laden wenn vorhanden
@@ -64,7 +78,7 @@ def authenticate():
 
 if __name__ == "__main__":
     try:
-        authenticate()
+        authenticate(sys.argv[1] if len(sys.argv) > 1 else None)
     except Exception as e:
         print(f"\n✗ Fehler: {e}")
         exit(1)
@@ -17,13 +17,14 @@ from mcp.types import Tool, TextContent
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import base64
 import sys
 import time
 
+from discovery_docs import build_service
+
 # Scopes mit Schreibzugriff
 SCOPES = [
     'https://www.googleapis.com/auth/gmail.send',
@@ -38,6 +39,7 @@ TOKEN_PATH = os.path.expanduser('~/.config/google-mcp/token.json')
 # credentials.json wird im Bundle mitgeliefert (vom Admin konfiguriert)
 CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), 'credentials.json')
 
+
 class GoogleMCPServer:
     def __init__(self):
         self.creds = None
@@ -160,8 +162,8 @@ class GoogleMCPServer:
             self.authenticate_with_device_code()
 
         # Services initialisieren
-        self.gmail_service = build('gmail', 'v1', credentials=self.creds)
-        self.calendar_service = build('calendar', 'v3', credentials=self.creds)
+        self.gmail_service = build_service('gmail', 'v1', self.creds)
+        self.calendar_service = build_service('calendar', 'v3', self.creds)
 
     def send_email(self, to: str, subject: str, body: str, cc: Optional[str] = None) -> dict:
         """Email senden mit HTML-Formatierung"""
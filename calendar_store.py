@@ -0,0 +1,427 @@
+"""
+Lokaler Spiegel der Google Calendar Events mit Intervall-Index
+
+Die Events werden über events.list mit syncToken inkrementell
+synchronisiert (der Sync läuft im GoogleMCPServer) und in SQLite
+gespeichert. Für Bereichs- und Überlappungsabfragen hält der Store pro
+Kalender einen Index aus sortierten Startzeiten im Speicher. Teilen sich
+mehrere Prozesse die Datenbank, lädt jeder seinen Index neu, sobald ein
+anderer Prozess synchronisiert hat.
+
+Wiederkehrende Events werden als Serie gespiegelt (Master mit recurrence)
+und erst bei der Abfrage lokal expandiert (recurrence.Series). Geänderte
+oder abgesagte Instanzen (Ausnahmen) ersetzen die berechnete Instanz.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left
+from datetime import datetime, date, time as dt_time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from recurrence import Series
+from timezones import get_zone
+
+STORE_PATH = os.path.expanduser('~/.config/google-mcp/calendar_store.sqlite3')
+
+# Events ab dieser Dauer (Sekunden) werden separat gehalten, damit sie das
+# Suchfenster der kurzen Events nicht aufblähen
+LONG_EVENT_SECONDS = 24 * 3600
+
+# Version 2: Serien statt expandierter Instanzen - ältere Spiegel werden neu synchronisiert
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, id)
+);
+CREATE TABLE IF NOT EXISTS calendars (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    time_zone TEXT,
+    synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS series (
+    calendar_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, id)
+);
+CREATE TABLE IF NOT EXISTS overrides (
+    calendar_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    series_id TEXT NOT NULL,
+    original_start REAL NOT NULL,
+    PRIMARY KEY (calendar_id, id)
+);
+"""
+
+
+def parse_time(value: str, tz: ZoneInfo) -> float:
+    """ISO 8601 Zeitpunkt als Unix Timestamp - ohne Offset gilt tz"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=tz)
+    return parsed.timestamp()
+
+
+def time_value(value: dict, tz: ZoneInfo) -> float:
+    """Zeitangabe der API ({dateTime, timeZone} oder {date}) als Unix Timestamp"""
+    if 'dateTime' in value:
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=get_zone(value.get('timeZone') or tz.key))
+    else:
+        parsed = datetime.combine(date.fromisoformat(value['date']), dt_time(), tzinfo=tz)
+    return parsed.timestamp()
+
+
+def event_bounds(event: dict, tz: ZoneInfo) -> tuple:
+    """Start und Ende eines Events als Unix Timestamps (ganztägig: Mitternacht in tz)"""
+    return time_value(event['start'], tz), time_value(event['end'], tz)
+
+
+def merge_intervals(intervals) -> list:
+    """Überlappende oder aneinandergrenzende Intervalle zusammenfassen (Sweep Line)"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def free_intervals(busy: list, window_start: float, window_end: float) -> list:
+    """Freie Lücken in [window_start, window_end) - busy muss gemerged und sortiert sein"""
+    free = []
+    cursor = window_start
+    # Erstes Busy-Intervall, das nach window_start endet
+    position = bisect_left(busy, (window_start,))
+    if position > 0 and busy[position - 1][1] > window_start:
+        position -= 1
+    for start, end in busy[position:]:
+        if start >= window_end:
+            break
+        if start > cursor:
+            free.append((cursor, min(start, window_end)))
+        cursor = max(cursor, end)
+        if cursor >= window_end:
+            break
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def candidate_slots(free: list, duration: float, step: float, align: float = 900) -> list:
+    """Slots der Länge duration in freien Lücken, alle step Sekunden - Start auf align gerundet"""
+    if duration <= 0 or step <= 0:
+        raise ValueError("duration und step müssen größer als 0 sein")
+    slots = []
+    for free_start, free_end in free:
+        start = -(-free_start // align) * align
+        while start + duration <= free_end:
+            slots.append((start, start + duration))
+            start += step
+    return slots
+
+
+def free_slots(busy: list, start: float, end: float, tz: ZoneInfo, duration: float,
+               step: float, day_start: dt_time, day_end: dt_time,
+               include_weekends: bool = False):
+    """Freie Slots innerhalb der Arbeitszeit, chronologisch - busy muss gemerged sein"""
+    if duration <= 0 or step <= 0:
+        raise ValueError("duration und step müssen größer als 0 sein")
+    for window_start, window_end in working_windows(
+            start, end, tz, day_start, day_end, include_weekends):
+        yield from candidate_slots(
+            free_intervals(busy, window_start, window_end), duration, step)
+
+
+def working_windows(start: float, end: float, tz: ZoneInfo, day_start: dt_time,
+                    day_end: dt_time, include_weekends: bool = False):
+    """Arbeitszeit-Fenster (Unix Timestamps) zwischen start und end, Tag für Tag in tz"""
+    day = datetime.fromtimestamp(start, tz).date()
+    last_day = datetime.fromtimestamp(end, tz).date()
+    while day <= last_day:
+        if include_weekends or day.weekday() < 5:
+            window_start = datetime.combine(day, day_start, tzinfo=tz).timestamp()
+            window_end = datetime.combine(day, day_end, tzinfo=tz).timestamp()
+            window_start, window_end = max(window_start, start), min(window_end, end)
+            if window_start < window_end:
+                yield window_start, window_end
+        day += timedelta(days=1)
+
+
+class IntervalIndex:
+    """Überlappungsabfragen über sortierte Startzeiten
+
+    Kurze Events liegen nach Start sortiert in einem Array. Ein Event mit
+    Überlappung zu [start, end) beginnt frühestens max_duration vor start,
+    die Kandidaten sind damit ein zusammenhängender Bereich (zwei bisects).
+    Lange Events (mehrtägig) werden linear geprüft - davon gibt es wenige.
+    """
+
+    def __init__(self):
+        self._events = {}
+        self._dirty = True
+        self._starts = []
+        self._short = []
+        self._long = []
+        self._max_short = 0.0
+
+    def __len__(self):
+        return len(self._events)
+
+    def put(self, event_id: str, start: float, end: float, event: dict):
+        self._events[event_id] = (start, end, event)
+        self._dirty = True
+
+    def remove(self, event_id: str):
+        if self._events.pop(event_id, None) is not None:
+            self._dirty = True
+
+    def clear(self):
+        self._events.clear()
+        self._dirty = True
+
+    def _rebuild(self):
+        short, long = [], []
+        for start, end, event in self._events.values():
+            (long if end - start >= LONG_EVENT_SECONDS else short).append((start, end, event))
+        short.sort(key=lambda item: item[0])
+        self._short = short
+        self._starts = [item[0] for item in short]
+        self._long = long
+        self._max_short = max((end - start for start, end, _ in short), default=0.0)
+        self._dirty = False
+
+    def overlapping(self, start: float, end: float) -> list:
+        """Alle Events mit Überlappung zu [start, end) - sortiert nach Start"""
+        if self._dirty:
+            self._rebuild()
+        low = bisect_left(self._starts, start - self._max_short)
+        high = bisect_left(self._starts, end)
+        hits = [item for item in self._short[low:high] if item[1] > start]
+        hits.extend(item for item in self._long if item[0] < end and item[1] > start)
+        hits.sort(key=lambda item: item[0])
+        return hits
+
+
+class CalendarMirror:
+    """Ein gespiegelter Kalender: einzelne Events im Index, Serien lazy expandiert"""
+
+    def __init__(self, tz: ZoneInfo):
+        self.tz = tz
+        self.index = IntervalIndex()
+        # Master ID -> Series (None: Regel lokal nicht expandierbar)
+        self.series = {}
+        self.masters = {}
+        # Master ID -> {Instanz ID: ursprünglicher Start} der Ausnahmen
+        self.overrides = {}
+
+    def __len__(self):
+        return len(self.index) + len(self.masters)
+
+    def put(self, event_id: str, start: float, end: float, event: dict):
+        self.remove(event_id)
+        self.index.put(event_id, start, end, event)
+
+    def put_series(self, event: dict):
+        """Serie übernehmen - die Expansion beginnt neu (bisheriges Memo verfällt)"""
+        self.remove(event['id'])
+        self.masters[event['id']] = event
+        try:
+            self.series[event['id']] = Series(event, self.tz)
+        except (ValueError, KeyError):
+            self.series[event['id']] = None
+
+    def put_override(self, event_id: str, series_id: str, original_start: float):
+        self.overrides.setdefault(series_id, {})[event_id] = original_start
+
+    def remove(self, event_id: str):
+        self.index.remove(event_id)
+        self.masters.pop(event_id, None)
+        self.series.pop(event_id, None)
+
+    def remove_series(self, series_id: str):
+        """Serie samt Ausnahmen entfernen"""
+        self.remove(series_id)
+        self.overrides.pop(series_id, None)
+
+    def overlapping(self, start: float, end: float) -> list:
+        """Events und berechnete Instanzen mit Überlappung zu [start, end)"""
+        hits = self.index.overlapping(start, end)
+        expanded = False
+        for series_id, series in self.series.items():
+            if series is None:
+                continue
+            overrides = self.overrides.get(series_id)
+            excluded = set(overrides.values()) if overrides else ()
+            for timestamp in series.between(start, end, excluded):
+                instance_start, instance_end = series.bounds(timestamp)
+                hits.append((instance_start, instance_end, series.instance(timestamp)))
+                expanded = True
+        if expanded:
+            hits.sort(key=lambda item: item[0])
+        return hits
+
+    def unexpanded(self) -> list:
+        """Master der Serien, deren Regeln nur die API expandieren kann"""
+        return [self.masters[series_id] for series_id, series in self.series.items()
+                if series is None]
+
+
+class CalendarStore:
+    """SQLite Spiegel der Events plus In-Memory Index und Serien pro Kalender"""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._mirrors = {}
+        # synced_at, auf dem der Spiegel eines Kalenders beruht
+        self._loaded = {}
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            if self._db.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                # Sync Tokens gelten nur für die bisherige Abfrage (singleEvents) - neu aufbauen
+                self._db.executescript(
+                    'DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS calendars;')
+                self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self._db.executescript(_SCHEMA)
+
+    def get_state(self, calendar_id: str) -> Optional[dict]:
+        """Sync-Status eines Kalenders (sync_token, time_zone, synced_at)"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT sync_token, time_zone, synced_at FROM calendars WHERE calendar_id = ?',
+                (calendar_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _mirror(self, calendar_id: str) -> CalendarMirror:
+        """Spiegel aus SQLite laden - erneut nur nach dem Sync eines anderen Prozesses
+
+        Lock muss gehalten werden.
+        """
+        row = self._db.execute(
+            'SELECT synced_at, time_zone FROM calendars WHERE calendar_id = ?',
+            (calendar_id,)).fetchone()
+        synced_at = row['synced_at'] if row else None
+        mirror = self._mirrors.get(calendar_id)
+        if mirror is None or self._loaded.get(calendar_id) != synced_at:
+            mirror = CalendarMirror(get_zone((row['time_zone'] if row else None) or 'UTC'))
+            rows = self._db.execute(
+                'SELECT id, start_ts, end_ts, data FROM events WHERE calendar_id = ?',
+                (calendar_id,))
+            for row in rows:
+                mirror.put(row['id'], row['start_ts'], row['end_ts'], json.loads(row['data']))
+            rows = self._db.execute(
+                'SELECT data FROM series WHERE calendar_id = ?', (calendar_id,))
+            for row in rows:
+                mirror.put_series(json.loads(row['data']))
+            rows = self._db.execute(
+                'SELECT id, series_id, original_start FROM overrides WHERE calendar_id = ?',
+                (calendar_id,))
+            for row in rows:
+                mirror.put_override(row['id'], row['series_id'], row['original_start'])
+            self._mirrors[calendar_id] = mirror
+            self._loaded[calendar_id] = synced_at
+        return mirror
+
+    def apply(self, calendar_id: str, events: list, time_zone: Optional[str],
+              sync_token: str, synced_at: float, full: bool):
+        """Ergebnis eines (Full oder inkrementellen) Syncs übernehmen"""
+        with self._lock, self._db:
+            mirror = self._mirror(calendar_id)
+            state = self._db.execute(
+                'SELECT time_zone FROM calendars WHERE calendar_id = ?', (calendar_id,)).fetchone()
+            time_zone = time_zone or (state['time_zone'] if state else None) or 'UTC'
+            tz = get_zone(time_zone)
+
+            if full:
+                for table in ('events', 'series', 'overrides'):
+                    self._db.execute(f'DELETE FROM {table} WHERE calendar_id = ?', (calendar_id,))
+                mirror = self._mirrors[calendar_id] = CalendarMirror(tz)
+
+            for event in events:
+                event_id = event['id']
+                series_id = event.get('recurringEventId')
+                if series_id and 'originalStartTime' in event:
+                    # Ausnahme: ersetzt (oder streicht) die berechnete Instanz der Serie
+                    original_start = time_value(event['originalStartTime'], tz)
+                    self._db.execute(
+                        'INSERT INTO overrides (calendar_id, id, series_id, original_start) '
+                        'VALUES (?, ?, ?, ?) ON CONFLICT(calendar_id, id) DO UPDATE SET '
+                        'series_id = excluded.series_id, original_start = excluded.original_start',
+                        (calendar_id, event_id, series_id, original_start))
+                    mirror.put_override(event_id, series_id, original_start)
+
+                for table in ('events', 'series'):
+                    self._db.execute(
+                        f'DELETE FROM {table} WHERE calendar_id = ? AND id = ?',
+                        (calendar_id, event_id))
+                if event.get('status') == 'cancelled' or 'start' not in event:
+                    if series_id:
+                        mirror.remove(event_id)
+                    else:
+                        self._db.execute(
+                            'DELETE FROM overrides WHERE calendar_id = ? AND series_id = ?',
+                            (calendar_id, event_id))
+                        mirror.remove_series(event_id)
+                    continue
+
+                if event.get('recurrence'):
+                    self._db.execute(
+                        'INSERT INTO series (calendar_id, id, data) VALUES (?, ?, ?)',
+                        (calendar_id, event_id, json.dumps(event)))
+                    mirror.put_series(event)
+                    continue
+                start, end = event_bounds(event, tz)
+                self._db.execute(
+                    'INSERT INTO events (calendar_id, id, start_ts, end_ts, data) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (calendar_id, event_id, start, end, json.dumps(event)))
+                mirror.put(event_id, start, end, event)
+
+            self._db.execute(
+                'INSERT INTO calendars (calendar_id, sync_token, time_zone, synced_at) '
+                'VALUES (?, ?, ?, ?) ON CONFLICT(calendar_id) DO UPDATE SET '
+                'sync_token = excluded.sync_token, time_zone = excluded.time_zone, '
+                'synced_at = excluded.synced_at',
+                (calendar_id, sync_token, time_zone, synced_at))
+            self._loaded[calendar_id] = synced_at
+
+    def overlapping(self, calendar_id: str, start: float, end: float) -> list:
+        """Events mit Überlappung zu [start, end) als (start, end, event) Tupel
+
+        Serien mit lokal nicht expandierbaren Regeln fehlen - siehe unexpanded().
+        """
+        with self._lock:
+            return self._mirror(calendar_id).overlapping(start, end)
+
+    def unexpanded(self, calendar_id: str) -> list:
+        """Master der Serien, deren Instanzen bei der API abgefragt werden müssen"""
+        with self._lock:
+            return self._mirror(calendar_id).unexpanded()
+
+    def count(self, calendar_id: str) -> int:
+        """Anzahl gespiegelter Events (eine Serie zählt einmal)"""
+        with self._lock:
+            return len(self._mirror(calendar_id))
+
+    def close(self):
+        """Datenbank schließen"""
+        with self._lock:
+            self._db.close()
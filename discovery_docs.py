@@ -0,0 +1,82 @@
+"""
+Kompakte Discovery Dokumente für googleapiclient
+
+build_service() nimmt das mit googleapiclient ausgelieferte Discovery
+Dokument, entfernt die nur für Menschen gedachten Beschreibungstexte und
+legt das Ergebnis unter ~/.config/google-mcp/discovery ab. Spätere Starts
+bauen den Service direkt aus dieser Datei. Wird von server.py und
+bundle/server.py verwendet (bundle/discovery_docs.py ist ein Symlink).
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Cache für vorverarbeitete Discovery Dokumente (ohne Beschreibungstexte)
+DISCOVERY_CACHE_DIR = os.path.expanduser('~/.config/google-mcp/discovery')
+# Nur für Menschen gedachte Felder - für build() nicht nötig
+_DISCOVERY_DOC_FIELDS = ('description', 'enumDescriptions')
+# Teil des Cache-Keys - erhöhen, wenn sich die Vorverarbeitung ändert
+# (2: Schema-Properties namens description bleiben erhalten)
+CACHE_FORMAT = 2
+
+
+def _compact_discovery(node):
+    """Beschreibungstexte rekursiv aus dem Discovery Dokument entfernen
+
+    Nur Texte (str bzw. Liste von str) - ein Schema-Property, das zufällig
+    'description' heißt (z.B. Event.description), ist ein dict und bleibt.
+    """
+    if isinstance(node, dict):
+        return {
+            key: _compact_discovery(value) for key, value in node.items()
+            if key not in _DISCOVERY_DOC_FIELDS or isinstance(value, dict)
+        }
+    if isinstance(node, list):
+        return [_compact_discovery(value) for value in node]
+    return node
+
+
+def build_service(name: str, version: str, credentials):
+    """Wie googleapiclient build(), aber mit kompaktem Discovery Dokument aus dem Cache
+
+    Der Cache-Key enthält die googleapiclient Version und CACHE_FORMAT, ein
+    Update der Bibliothek erzeugt damit automatisch einen neuen Eintrag.
+    """
+    from googleapiclient import discovery, discovery_cache
+    from googleapiclient.version import __version__ as library_version
+
+    cache_path = os.path.join(
+        DISCOVERY_CACHE_DIR, f'{name}.{version}.{library_version}.f{CACHE_FORMAT}.json')
+
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            document = f.read()
+    except OSError:
+        document = None
+
+    if document is None:
+        static_doc = discovery_cache.get_static_doc(name, version)
+        if static_doc is None:
+            # Kein mitgeliefertes Dokument - regulärer build() (lädt per HTTP)
+            return discovery.build(name, version, credentials=credentials)
+
+        document = json.dumps(_compact_discovery(json.loads(static_doc)), separators=(',', ':'))
+        tmp_path = None
+        try:
+            os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=DISCOVERY_CACHE_DIR, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(document)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            # Cache ist optional - ohne Schreibrechte trotzdem weiterarbeiten
+            print(f"⚠️  Discovery Cache nicht geschrieben: {e}", file=sys.stderr)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    return discovery.build_from_document(document, credentials=credentials)
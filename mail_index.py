@@ -0,0 +1,300 @@
+"""
+Lokaler Gmail Index (SQLite + FTS5) für schnelle Suchanfragen
+
+Speichert Metadaten (Header, Snippet, Labels) aller synchronisierten
+Nachrichten. Email Texte werden nicht gespeichert, sie werden bei Bedarf
+von Gmail geladen. Der Sync selbst (Full Sync + history.list) läuft im
+GoogleMCPServer, dieses Modul kümmert sich nur um Speicherung und Abfrage.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Optional
+
+INDEX_PATH = os.path.expanduser('~/.config/google-mcp/mail_index.sqlite3')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    thread_id TEXT,
+    internal_date INTEGER NOT NULL DEFAULT 0,
+    from_addr TEXT,
+    to_addr TEXT,
+    cc_addr TEXT,
+    subject TEXT,
+    date TEXT,
+    snippet TEXT,
+    labels TEXT NOT NULL DEFAULT ' '
+);
+CREATE INDEX IF NOT EXISTS messages_date ON messages (internal_date DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, from_addr, to_addr, cc_addr, snippet
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Gmail Suchoperatoren, die der Index beantworten kann
+_FTS_COLUMNS = {
+    'from': 'from_addr',
+    'to': 'to_addr',
+    'cc': 'cc_addr',
+    'subject': 'subject',
+}
+_IS_LABELS = {
+    'unread': 'UNREAD',
+    'starred': 'STARRED',
+    'important': 'IMPORTANT',
+}
+_IN_LABELS = {
+    'inbox': 'INBOX',
+    'sent': 'SENT',
+    'trash': 'TRASH',
+    'spam': 'SPAM',
+    'drafts': 'DRAFT',
+}
+# label: geht nur für System Labels - eigene Labels speichert der Index als ID (Label_123)
+_SYSTEM_LABELS = {
+    'inbox': 'INBOX',
+    'sent': 'SENT',
+    'trash': 'TRASH',
+    'spam': 'SPAM',
+    'draft': 'DRAFT',
+    'drafts': 'DRAFT',
+    'unread': 'UNREAD',
+    'starred': 'STARRED',
+    'important': 'IMPORTANT',
+    'chat': 'CHAT',
+}
+_TOKEN = re.compile(r'(\w+):("[^"]*"|\S+)|"([^"]*)"|(\S+)')
+
+
+class UnsupportedQuery(ValueError):
+    """Suchanfrage nutzt Operatoren, die der Index nicht abbilden kann"""
+
+
+def _fts_phrase(text: str) -> str:
+    """Text als FTS5 Phrase quoten"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _parse_date(value: str, tz: tzinfo) -> int:
+    """Gmail Datum (YYYY/MM/DD oder YYYY-MM-DD) in Millisekunden seit Epoch
+
+    Gmail rechnet mit dem Tag in der Zeitzone des Accounts, nicht in UTC.
+    """
+    parsed = datetime.strptime(value.replace('-', '/'), '%Y/%m/%d')
+    return int(parsed.replace(tzinfo=tz).timestamp() * 1000)
+
+
+def _label_id(name: str) -> str:
+    """Label ID zu einem label: Operanden - nur System Labels"""
+    key = name.lower()
+    if key in _SYSTEM_LABELS:
+        return _SYSTEM_LABELS[key]
+    if key.startswith('category_'):
+        return key.upper()
+    raise UnsupportedQuery(f"Nur System Labels unterstützt: label:{name}")
+
+
+def translate_query(query: str, tz: tzinfo = timezone.utc) -> tuple:
+    """Gmail Suchanfrage in (FTS MATCH Ausdruck, SQL Bedingungen, Parameter,
+    hat Freitext, früheste Datumsgrenze in ms) übersetzen
+
+    Wirft UnsupportedQuery für Operatoren ohne Entsprechung im Index
+    (z.B. Negation, OR, has:attachment). Wie bei messages.list bleiben
+    SPAM und TRASH draußen, solange die Anfrage nicht danach fragt.
+    """
+    fts_terms = []
+    conditions = []
+    params = []
+    free_text = False
+    bounds = []
+    excluded = {'SPAM', 'TRASH'}
+
+    for match in _TOKEN.finditer(query or ''):
+        operator, operand, phrase, word = match.groups()
+        if operator:
+            operator = operator.lower()
+            operand = operand.strip('"')
+            if operator in _FTS_COLUMNS:
+                fts_terms.append(f'{_FTS_COLUMNS[operator]} : {_fts_phrase(operand)}')
+            elif operator == 'is' and operand.lower() in _IS_LABELS:
+                conditions.append('labels LIKE ?')
+                params.append(f'% {_IS_LABELS[operand.lower()]} %')
+            elif operator == 'is' and operand.lower() == 'read':
+                conditions.append('labels NOT LIKE ?')
+                params.append('% UNREAD %')
+            elif operator == 'in' and operand.lower() in _IN_LABELS:
+                label = _IN_LABELS[operand.lower()]
+                conditions.append('labels LIKE ?')
+                params.append(f'% {label} %')
+                excluded.discard(label)
+            elif operator == 'in' and operand.lower() == 'anywhere':
+                excluded.clear()
+            elif operator == 'label':
+                label = _label_id(operand)
+                conditions.append('labels LIKE ?')
+                params.append(f'% {label} %')
+                excluded.discard(label)
+            elif operator in ('after', 'before'):
+                try:
+                    timestamp = _parse_date(operand, tz)
+                except ValueError:
+                    raise UnsupportedQuery(f"Datum nicht unterstützt: {operand}")
+                conditions.append('internal_date >= ?' if operator == 'after' else 'internal_date < ?')
+                params.append(timestamp)
+                bounds.append(timestamp)
+            elif operator in ('newer_than', 'older_than'):
+                amount = re.fullmatch(r'(\d+)([dmy])', operand.lower())
+                if not amount:
+                    raise UnsupportedQuery(f"Zeitraum nicht unterstützt: {operand}")
+                days = int(amount.group(1)) * {'d': 1, 'm': 30, 'y': 365}[amount.group(2)]
+                cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+                conditions.append('internal_date >= ?' if operator == 'newer_than' else 'internal_date < ?')
+                params.append(int(cutoff.timestamp() * 1000))
+                bounds.append(params[-1])
+            else:
+                raise UnsupportedQuery(f"Operator nicht unterstützt: {operator}:")
+        else:
+            text = phrase if phrase is not None else word
+            if not text.strip():
+                # Leere Phrase ("") schränkt nichts ein
+                continue
+            if text.startswith('-') or text.upper() in ('OR', 'AND') or text[:1] in '{(':
+                raise UnsupportedQuery(f"Ausdruck nicht unterstützt: {text}")
+            fts_terms.append(_fts_phrase(text))
+            free_text = True
+
+    for label in sorted(excluded):
+        conditions.append('labels NOT LIKE ?')
+        params.append(f'% {label} %')
+    return ' AND '.join(fts_terms), conditions, params, free_text, min(bounds, default=None)
+
+
+class MailIndex:
+    """SQLite Index der Gmail Metadaten - thread-safe, Aufrufe blockieren (Worker Thread nutzen)"""
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(_SCHEMA)
+
+    def get_state(self, key: str) -> Optional[str]:
+        """Sync-Status lesen (z.B. history_id)"""
+        with self._lock:
+            row = self._db.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def set_state(self, key: str, value: str):
+        """Sync-Status schreiben"""
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO state (key, value) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value', (key, value))
+
+    def upsert(self, messages: list):
+        """Nachrichten (Zusammenfassungen inkl. internal_date) einfügen oder aktualisieren"""
+        with self._lock, self._db:
+            for message in messages:
+                labels = ' ' + ' '.join(message.get('labels', [])) + ' '
+                self._db.execute(
+                    'INSERT INTO messages (id, thread_id, internal_date, from_addr, to_addr, '
+                    'cc_addr, subject, date, snippet, labels) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(id) DO UPDATE SET thread_id = excluded.thread_id, '
+                    'internal_date = excluded.internal_date, from_addr = excluded.from_addr, '
+                    'to_addr = excluded.to_addr, cc_addr = excluded.cc_addr, '
+                    'subject = excluded.subject, date = excluded.date, '
+                    'snippet = excluded.snippet, labels = excluded.labels',
+                    (message['id'], message.get('thread_id'), message.get('internal_date', 0),
+                     message.get('from'), message.get('to'), message.get('cc'),
+                     message.get('subject'), message.get('date'), message.get('snippet'), labels))
+                row = self._db.execute(
+                    'SELECT rowid FROM messages WHERE id = ?', (message['id'],)).fetchone()
+                self._db.execute('DELETE FROM messages_fts WHERE rowid = ?', (row['rowid'],))
+                self._db.execute(
+                    'INSERT INTO messages_fts (rowid, subject, from_addr, to_addr, cc_addr, snippet) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (row['rowid'], message.get('subject'), message.get('from'),
+                     message.get('to'), message.get('cc'), message.get('snippet')))
+
+    def set_labels(self, message_id: str, labels: list):
+        """Labels einer Nachricht ersetzen (aus history.list labelAdded/labelRemoved)"""
+        with self._lock, self._db:
+            self._db.execute(
+                'UPDATE messages SET labels = ? WHERE id = ?',
+                (' ' + ' '.join(labels) + ' ', message_id))
+
+    def delete(self, message_ids: list):
+        """Nachrichten aus dem Index entfernen"""
+        with self._lock, self._db:
+            for message_id in message_ids:
+                row = self._db.execute(
+                    'SELECT rowid FROM messages WHERE id = ?', (message_id,)).fetchone()
+                if row:
+                    self._db.execute('DELETE FROM messages WHERE rowid = ?', (row['rowid'],))
+                    self._db.execute('DELETE FROM messages_fts WHERE rowid = ?', (row['rowid'],))
+
+    def clear(self):
+        """Index leeren (vor einem Full Sync)"""
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM messages')
+            self._db.execute('DELETE FROM messages_fts')
+            self._db.execute('DELETE FROM state')
+
+    def count(self) -> int:
+        """Anzahl indizierter Nachrichten"""
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+    def oldest(self) -> Optional[int]:
+        """internal_date der ältesten indizierten Nachricht (ms) - None bei leerem Index"""
+        with self._lock:
+            return self._db.execute('SELECT MIN(internal_date) FROM messages').fetchone()[0]
+
+    def search(self, query: str, limit: int, offset: int = 0, tz: tzinfo = timezone.utc) -> list:
+        """Gmail Suchanfrage gegen den Index ausführen - neueste zuerst"""
+        match, conditions, params, _, _ = translate_query(query, tz)
+        sql = 'SELECT m.* FROM messages m'
+        if match:
+            sql += ' JOIN messages_fts f ON f.rowid = m.rowid'
+            conditions = ['messages_fts MATCH ?'] + conditions
+            params = [match] + params
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY m.internal_date DESC LIMIT ? OFFSET ?'
+
+        with self._lock:
+            rows = self._db.execute(sql, params + [limit, offset]).fetchall()
+
+        results = []
+        for row in rows:
+            summary = {
+                'id': row['id'],
+                'thread_id': row['thread_id'],
+                'from': row['from_addr'],
+                'to': row['to_addr'],
+                'cc': row['cc_addr'],
+                'subject': row['subject'],
+                'date': row['date'],
+                'snippet': row['snippet'],
+                'labels': row['labels'].split(),
+            }
+            results.append({key: value for key, value in summary.items() if value is not None})
+        return results
+
+    def close(self):
+        """Datenbank schließen"""
+        with self._lock:
+            self._db.close()
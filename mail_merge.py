@@ -0,0 +1,76 @@
+"""
+Serienmail-Vorlagen mit Platzhaltern
+
+Platzhalter: {{ feld }} oder {{ feld | Ersatzwert }}. Eine Vorlage wird
+einmal in einen Render-Plan zerlegt (Literale und Felder im Wechsel), pro
+Empfänger wird nur noch zusammengefügt - die Kosten wachsen mit der Länge
+der Ausgabe, die Vorlage wird nicht erneut geparst.
+"""
+
+import html
+import re
+from typing import Optional
+
+_PLACEHOLDER = re.compile(r'\{\{\s*([A-Za-z_][\w.-]*)\s*(?:\|([^}]*))?\}\}')
+
+
+class MissingFieldError(ValueError):
+    """Empfänger-Datensatz enthält ein Feld der Vorlage nicht (und es gibt keinen Ersatzwert)"""
+
+
+class Template:
+    """Vorkompilierte Vorlage - escape wird auf jeden eingesetzten Wert angewendet"""
+
+    def __init__(self, source: str, escape=None):
+        pieces = _PLACEHOLDER.split(source)
+        # split liefert Literal, Feld, Ersatzwert, Literal, Feld, Ersatzwert, ..., Literal
+        self._head = pieces[0]
+        self._plan = tuple(
+            (name, None if default is None else default.strip(), literal)
+            for name, default, literal in zip(pieces[1::3], pieces[2::3], pieces[3::3]))
+        self._escape = escape
+        self.fields = frozenset(name for name, _, _ in self._plan)
+
+    def render(self, record: dict) -> str:
+        """Vorlage mit den Werten aus record füllen"""
+        if not self._plan:
+            return self._head
+        parts = [self._head]
+        for name, default, literal in self._plan:
+            value = record.get(name)
+            if value is None or value == '':
+                if default is None:
+                    raise MissingFieldError(f"Feld '{name}' fehlt")
+                value = default
+            else:
+                value = str(value)
+                if self._escape is not None:
+                    value = self._escape(value)
+            parts.append(value)
+            parts.append(literal)
+        return ''.join(parts)
+
+
+class MailMerge:
+    """Vorlagen für Empfänger, Betreff, Text und optional HTML und CC"""
+
+    def __init__(self, to: str, subject: str, body: str, html_body: Optional[str] = None,
+                 cc: Optional[str] = None):
+        self.to = Template(to)
+        self.subject = Template(subject)
+        self.body = Template(body)
+        # Werte im HTML werden escaped, die Vorlage selbst ist bereits HTML
+        self.html = Template(html_body, escape=html.escape) if html_body else None
+        self.cc = Template(cc) if cc else None
+
+    def render(self, record: dict) -> dict:
+        """Nachricht (to, subject, body, html, cc) für einen Empfänger-Datensatz"""
+        if not isinstance(record, dict):
+            raise TypeError("Empfänger muss ein Objekt sein")
+        return {
+            'to': self.to.render(record),
+            'subject': self.subject.render(record),
+            'body': self.body.render(record),
+            'html': self.html.render(record) if self.html is not None else None,
+            'cc': self.cc.render(record) if self.cc is not None else None,
+        }
@@ -0,0 +1,185 @@
+"""
+MIME Nachrichten in einem Durchgang direkt in einen Stream schreiben
+
+Header und Parts werden direkt in einen Puffer bzw. eine Datei geschrieben,
+statt die Nachricht als email.message Objekt aufzubauen und danach zu
+serialisieren. Anhänge werden blockweise gelesen und base64-kodiert - ein
+25 MB Anhang belegt so nur einen Block im Speicher. Für das raw Feld der
+Gmail API wird der Puffer blockweise (memoryview Slices) base64url-kodiert.
+"""
+
+import base64
+import binascii
+import io
+import mimetypes
+import os
+import re
+import uuid
+from typing import Optional
+
+# 57 Bytes ergeben eine base64 Zeile mit 76 Zeichen
+LINE_BYTES = 57
+# Blockgröße beim Lesen der Anhänge (Vielfaches von LINE_BYTES)
+CHUNK_BYTES = LINE_BYTES * 1024
+ADDRESS_HEADERS = ('To', 'Cc', 'Bcc', 'From', 'Reply-To')
+_URLSAFE = bytes.maketrans(b'+/', b'-_')
+
+
+class Attachment:
+    """Anhang aus einer Datei oder aus base64-kodierten Daten des Clients"""
+
+    def __init__(self, filename: str, mime_type: Optional[str] = None,
+                 path: Optional[str] = None, data_base64: Optional[str] = None):
+        if (path is None) == (data_base64 is None):
+            raise ValueError(f"Anhang {filename!r}: genau eines von path oder content_base64 angeben")
+        self.filename = filename
+        self.mime_type = (mime_type or mimetypes.guess_type(filename)[0]
+                          or 'application/octet-stream')
+        self.path = path
+        self.data_base64 = data_base64
+
+    def chunks(self):
+        """Inhalt blockweise (höchstens CHUNK_BYTES) - ohne alles auf einmal zu laden"""
+        if self.path is not None:
+            with open(self.path, 'rb') as source:
+                while True:
+                    chunk = source.read(CHUNK_BYTES)
+                    if not chunk:
+                        return
+                    yield chunk
+        data = self.data_base64
+        if re.search(r'\s', data):
+            data = re.sub(r'\s+', '', data)
+        # 4 base64 Zeichen = 3 Bytes: Blöcke passend zu CHUNK_BYTES schneiden
+        step = CHUNK_BYTES // 3 * 4
+        try:
+            for start in range(0, len(data), step):
+                yield base64.b64decode(data[start:start + step], validate=True)
+        except ValueError as e:
+            raise ValueError(f"Anhang {self.filename!r}: ungültiges base64 ({e})")
+
+
+def _boundary() -> str:
+    return f'=_{uuid.uuid4().hex}'
+
+
+def _header(name: str, value: str) -> bytes:
+    """Header-Zeile - Nicht-ASCII nach RFC 2047, Adressen einzeln kodiert"""
+    if '\n' in value or '\r' in value:
+        raise ValueError(f"Zeilenumbruch im Header {name} nicht erlaubt")
+    if value.isascii():
+        encoded = value
+    elif name in ADDRESS_HEADERS:
+        from email.utils import formataddr, getaddresses
+
+        encoded = ', '.join(
+            formataddr((display, address), charset='utf-8')
+            for display, address in getaddresses([value]))
+    else:
+        from email.header import Header
+
+        encoded = Header(value, 'utf-8').encode()
+    return f'{name}: {encoded}\n'.encode('ascii')
+
+
+def _param(name: str, value: str) -> str:
+    """MIME Parameter (filename, name) - Nicht-ASCII nach RFC 2231"""
+    if value.isascii():
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+        return f'{name}="{escaped}"'
+    from email.utils import encode_rfc2231
+
+    return f"{name}*={encode_rfc2231(value, 'utf-8')}"
+
+
+def write_base64(out, chunks):
+    """Blöcke base64-kodiert in Zeilen zu 76 Zeichen schreiben (Blöcke beliebiger Größe)"""
+    rest = b''
+    for chunk in chunks:
+        if rest:
+            chunk = rest + chunk
+        usable = len(chunk) - len(chunk) % LINE_BYTES
+        if usable:
+            out.write(base64.encodebytes(memoryview(chunk)[:usable]))
+        rest = bytes(memoryview(chunk)[usable:])
+    if rest:
+        out.write(base64.encodebytes(rest))
+
+
+def _slices(data: bytes):
+    """data als memoryview Slices zu CHUNK_BYTES - ohne Kopie"""
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_BYTES):
+        yield view[start:start + CHUNK_BYTES]
+
+
+def _write_text(out, body: str, html: Optional[str] = None, headers: bytes = b''):
+    """Plain Text + HTML Version als multipart/alternative - headers: Header der Nachricht"""
+    boundary = _boundary()
+    out.write(f'Content-Type: multipart/alternative; boundary="{boundary}"\n'.encode())
+    out.write(headers)
+    plain = body.encode('utf-8')
+    if html is None:
+        # HTML Version mit Zeilenumbrüchen konvertiert - auf den Bytes, ohne zweites encode()
+        html_bytes = plain.replace(b'\n', b'<br>\n')
+    else:
+        html_bytes = html.encode('utf-8')
+    for subtype, text in (('plain', plain), ('html', html_bytes)):
+        out.write(f'\n--{boundary}\n'
+                  f'Content-Type: text/{subtype}; charset="utf-8"\n'
+                  'MIME-Version: 1.0\n'
+                  'Content-Transfer-Encoding: base64\n\n'.encode())
+        write_base64(out, _slices(text))
+    out.write(f'\n--{boundary}--\n'.encode())
+
+
+def write_message(out, to: str, subject: str, body: str, cc: Optional[str] = None,
+                  attachments: tuple = (), html: Optional[str] = None):
+    """Komplette MIME Nachricht (Text, HTML, Anhänge) in den binären Stream out schreiben
+
+    Ohne html wird die HTML Version aus body erzeugt.
+    """
+    headers = b'MIME-Version: 1.0\n' + _header('To', to) + _header('Subject', subject)
+    if cc:
+        headers += _header('Cc', cc)
+    if not attachments:
+        _write_text(out, body, html, headers)
+        return
+
+    boundary = _boundary()
+    out.write(f'Content-Type: multipart/mixed; boundary="{boundary}"\n'.encode())
+    out.write(headers)
+    out.write(f'\n--{boundary}\n'.encode())
+    _write_text(out, body, html)
+
+    for attachment in attachments:
+        filename = os.path.basename(attachment.filename)
+        out.write(f'--{boundary}\n'
+                  f'Content-Type: {attachment.mime_type}; {_param("name", filename)}\n'
+                  'MIME-Version: 1.0\n'
+                  'Content-Transfer-Encoding: base64\n'
+                  f'Content-Disposition: attachment; {_param("filename", filename)}\n\n'.encode())
+        write_base64(out, attachment.chunks())
+    out.write(f'--{boundary}--\n'.encode())
+
+
+def encode_base64url(data) -> str:
+    """base64url ohne Zeilenumbrüche - blockweise über memoryview Slices in einen Puffer"""
+    view = memoryview(data)
+    encoded = bytearray(4 * ((len(view) + 2) // 3))
+    position = 0
+    # CHUNK_BYTES ist durch 3 teilbar - nur der letzte Block bekommt Padding
+    for chunk in _slices(view):
+        block = binascii.b2a_base64(chunk, newline=False).translate(_URLSAFE)
+        encoded[position:position + len(block)] = block
+        position += len(block)
+    return encoded.decode('ascii')
+
+
+def raw_message(to: str, subject: str, body: str, cc: Optional[str] = None,
+                html: Optional[str] = None) -> str:
+    """Nachricht ohne Anhänge als base64url String für das raw Feld der Gmail API"""
+    buffer = io.BytesIO()
+    write_message(buffer, to, subject, body, cc, html=html)
+    with buffer.getbuffer() as view:
+        return encode_base64url(view)
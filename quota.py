@@ -0,0 +1,146 @@
+"""
+Clientseitige Quota-Verwaltung für Gmail und Calendar
+
+Jede API Methode kostet Quota-Einheiten (Gmail: send 100, get 5, ...;
+Calendar: 1 pro Request). Pro Nutzer und API gibt es einen Token Bucket,
+vor jedem Request wird dessen Preis entnommen - notfalls wird gewartet.
+So bleibt der Server unter den Limits, statt erst über 429 davon zu erfahren.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+# Quota-Einheiten pro Methode (Gmail: developers.google.com/gmail/api/reference/quota)
+METHOD_COSTS = {
+    'gmail.users.getProfile': 1,
+    'gmail.users.labels.list': 1,
+    'gmail.users.history.list': 2,
+    'gmail.users.messages.get': 5,
+    'gmail.users.messages.list': 5,
+    'gmail.users.messages.modify': 5,
+    'gmail.users.messages.attachments.get': 5,
+    'gmail.users.messages.insert': 25,
+    'gmail.users.messages.import': 25,
+    'gmail.users.messages.batchModify': 50,
+    'gmail.users.messages.send': 100,
+    'gmail.users.threads.get': 10,
+    'gmail.users.threads.list': 10,
+    'gmail.users.drafts.get': 5,
+    'gmail.users.drafts.list': 5,
+    'gmail.users.drafts.create': 10,
+    'gmail.users.drafts.update': 15,
+    'gmail.users.drafts.send': 100,
+}
+# Preis nicht aufgeführter Methoden
+DEFAULT_COST = 1
+
+
+class TokenBucket:
+    """Token Bucket - rate Tokens pro Sekunde, höchstens capacity auf Vorrat"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        # Statistik für die Diagnose
+        self.consumed = 0.0
+        self.waited = 0.0
+        self.waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        """Aktuell verfügbare Tokens"""
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, amount: float = 1):
+        """Warten bis amount Tokens verfügbar sind und sie entnehmen
+
+        Mehr als capacity kann nie angespart werden - größere Beträge
+        (z.B. ein Batch mit vielen sends) werden in Raten zu höchstens
+        capacity entnommen, der volle Preis wird trotzdem bezahlt.
+        """
+        # Lock sorgt für Reihenfolge - wartende Aufrufe werden nacheinander bedient
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            async with self._lock:
+                remaining = amount
+                while remaining > 0:
+                    installment = min(remaining, self.capacity)
+                    self._refill()
+                    while self._tokens < installment:
+                        await asyncio.sleep((installment - self._tokens) / self.rate)
+                        self._refill()
+                    self._tokens -= installment
+                    remaining -= installment
+        finally:
+            self.waiting -= 1
+        self.consumed += amount
+        self.waited += time.monotonic() - started
+
+
+class QuotaManager:
+    """Token Buckets pro (Nutzer, API) - Limits in Einheiten pro Sekunde je API"""
+
+    def __init__(self, limits: dict, costs: Optional[dict] = None):
+        # limits: {'gmail': (rate, capacity), 'calendar': (rate, capacity)}
+        self.limits = limits
+        self.costs = METHOD_COSTS if costs is None else costs
+        self._buckets = {}
+
+    @staticmethod
+    def api(method_id: Optional[str]) -> str:
+        """API einer methodId (gmail.users.messages.send -> gmail)"""
+        return (method_id or 'google').split('.', 1)[0]
+
+    def cost(self, method_id: Optional[str]) -> float:
+        """Quota-Einheiten eines Requests"""
+        return self.costs.get(method_id, DEFAULT_COST)
+
+    def bucket(self, api: str, user: str = 'default') -> Optional[TokenBucket]:
+        """Bucket für Nutzer und API - None, wenn die API kein Limit hat"""
+        key = (user, api)
+        bucket = self._buckets.get(key)
+        if bucket is None and api in self.limits:
+            rate, capacity = self.limits[api]
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    async def acquire(self, method_ids: list, user: str = 'default'):
+        """Preis aller Requests (z.B. eines Batches) entnehmen - wartet bei Bedarf"""
+        totals = {}
+        for method_id in method_ids:
+            api = self.api(method_id)
+            totals[api] = totals.get(api, 0) + self.cost(method_id)
+        for api, amount in totals.items():
+            bucket = self.bucket(api, user)
+            if bucket is not None:
+                await bucket.acquire(amount)
+
+    def stats(self) -> list:
+        """Auslastung aller Buckets für die Diagnose"""
+        return [
+            {
+                'user': user,
+                'api': api,
+                'rate_per_sec': bucket.rate,
+                'capacity': bucket.capacity,
+                'available': round(bucket.available, 1),
+                'used_percent': round(100 * (1 - bucket.available / bucket.capacity), 1),
+                'consumed_total': round(bucket.consumed, 1),
+                'waiting': bucket.waiting,
+                'wait_seconds_total': round(bucket.waited, 2),
+            }
+            for (user, api), bucket in sorted(self._buckets.items())
+        ]
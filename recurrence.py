@@ -0,0 +1,349 @@
+"""
+Lokale Expansion wiederkehrender Calendar Events (RRULE, RFC 5545)
+
+Der Calendar Spiegel speichert eine Serie als Master-Event mit recurrence,
+nicht als tausende einzelne Instanzen. Welche Instanzen in ein Zeitfenster
+fallen, berechnet Series: die Startzeiten entstehen lazy in einem Generator
+und werden nur so weit wie bisher abgefragt gemerkt (array aus Timestamps).
+Event-Objekte werden nur für Treffer gebaut.
+
+Unterstützt: FREQ=DAILY/WEEKLY/MONTHLY/YEARLY mit INTERVAL, COUNT, UNTIL,
+BYDAY, BYMONTHDAY, BYMONTH, BYSETPOS und WKST, dazu RDATE und EXDATE.
+Andere Regeln (z.B. BYWEEKNO, FREQ=HOURLY) lösen UnsupportedRule aus - für
+diese Serien fragt der Server die Instanzen bei der API ab.
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+from calendar import isleap, monthrange
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from heapq import merge
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from timezones import get_zone
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+SUPPORTED_PARTS = {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY', 'BYMONTHDAY', 'BYMONTH',
+                   'BYSETPOS', 'WKST'}
+# Perioden ohne Instanz in Folge, nach denen eine Regel als erschöpft gilt (z.B. 30. Februar)
+MAX_EMPTY_PERIODS = 1000
+
+_BYDAY = re.compile(r'([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)')
+
+
+class UnsupportedRule(ValueError):
+    """Regel kann lokal nicht expandiert werden"""
+
+
+def parse_rule(value: str) -> dict:
+    """RRULE Wert (ohne 'RRULE:') in ein dict zerlegen"""
+    parts = {}
+    for item in value.split(';'):
+        key, _, part = item.partition('=')
+        if key:
+            parts[key.strip().upper()] = part.strip()
+    unsupported = set(parts) - SUPPORTED_PARTS
+    if unsupported:
+        raise UnsupportedRule(f"RRULE Teile nicht unterstützt: {', '.join(sorted(unsupported))}")
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise UnsupportedRule(f"FREQ nicht unterstützt: {freq}")
+
+    byday = []
+    for token in filter(None, parts.get('BYDAY', '').split(',')):
+        match = _BYDAY.fullmatch(token.strip().upper())
+        if not match:
+            raise UnsupportedRule(f"BYDAY nicht unterstützt: {token}")
+        ordinal = int(match.group(1)) if match.group(1) else None
+        if ordinal is not None and freq not in ('MONTHLY', 'YEARLY'):
+            raise UnsupportedRule(f"BYDAY mit Ordnungszahl nur bei MONTHLY/YEARLY: {token}")
+        byday.append((ordinal, WEEKDAYS[match.group(2)]))
+
+    def numbers(key):
+        return [int(number) for number in filter(None, parts.get(key, '').split(','))]
+
+    rule = {
+        'freq': freq,
+        'interval': max(1, int(parts.get('INTERVAL', 1))),
+        'count': int(parts['COUNT']) if 'COUNT' in parts else None,
+        'until': parts.get('UNTIL'),
+        'byday': byday,
+        'bymonthday': numbers('BYMONTHDAY'),
+        'bymonth': numbers('BYMONTH'),
+        'bysetpos': numbers('BYSETPOS'),
+        'wkst': WEEKDAYS.get(parts.get('WKST', 'MO').upper(), 0),
+    }
+    if rule['bymonthday'] and freq == 'WEEKLY':
+        raise UnsupportedRule("BYMONTHDAY ist bei FREQ=WEEKLY nicht erlaubt")
+    return rule
+
+
+def _month_days(rule: dict, year: int, month: int, default_day: int) -> list:
+    """Tage eines Monats nach BYMONTHDAY/BYDAY (Ordnungszahlen relativ zum Monat)"""
+    length = monthrange(year, month)[1]
+    days = None
+    if rule['bymonthday']:
+        days = {day if day > 0 else length + day + 1 for day in rule['bymonthday']}
+        days = {day for day in days if 1 <= day <= length}
+    if rule['byday']:
+        first_weekday = date(year, month, 1).weekday()
+        matched = set()
+        for ordinal, weekday in rule['byday']:
+            candidates = range((weekday - first_weekday) % 7 + 1, length + 1, 7)
+            if ordinal is None:
+                matched.update(candidates)
+            elif 1 <= abs(ordinal) <= len(candidates):
+                matched.add(candidates[ordinal - 1 if ordinal > 0 else ordinal])
+        days = matched if days is None else days & matched
+    if days is None:
+        # Ohne BYMONTHDAY/BYDAY der Tag des Starts - Monate ohne diesen Tag entfallen
+        days = {default_day} if default_day <= length else set()
+    return [date(year, month, day) for day in sorted(days)]
+
+
+def _year_days(rule: dict, year: int, start: date) -> list:
+    """Tage eines Jahres - BYDAY ohne BYMONTH/BYMONTHDAY zählt relativ zum Jahr"""
+    if rule['byday'] and not rule['bymonth'] and not rule['bymonthday']:
+        first = date(year, 1, 1)
+        length = 366 if isleap(year) else 365
+        days = set()
+        for ordinal, weekday in rule['byday']:
+            offset = (weekday - first.weekday()) % 7
+            candidates = range(offset, length, 7)
+            if ordinal is None:
+                days.update(candidates)
+            elif 1 <= abs(ordinal) <= len(candidates):
+                days.add(candidates[ordinal - 1 if ordinal > 0 else ordinal])
+        return [first + timedelta(days=day) for day in sorted(days)]
+
+    if rule['bymonth']:
+        months = sorted(rule['bymonth'])
+    elif rule['bymonthday'] or rule['byday']:
+        months = range(1, 13)
+    else:
+        months = [start.month]
+    days = []
+    for month in months:
+        days.extend(_month_days(rule, year, month, start.day))
+    return days
+
+
+def _periods(rule: dict, start: date):
+    """Kandidaten-Tage pro Periode (Tag, Woche, Monat, Jahr) im Abstand INTERVAL"""
+    freq, interval = rule['freq'], rule['interval']
+    if freq == 'DAILY':
+        day = start
+        while True:
+            yield [day]
+            day += timedelta(days=interval)
+    elif freq == 'WEEKLY':
+        wkst = rule['wkst']
+        weekdays = sorted({weekday for _, weekday in rule['byday']} or {start.weekday()},
+                          key=lambda weekday: (weekday - wkst) % 7)
+        week = start - timedelta(days=(start.weekday() - wkst) % 7)
+        while True:
+            yield [week + timedelta(days=(weekday - wkst) % 7) for weekday in weekdays]
+            week += timedelta(weeks=interval)
+    elif freq == 'MONTHLY':
+        year, month = start.year, start.month
+        while True:
+            yield _month_days(rule, year, month, start.day)
+            month += interval
+            year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    else:
+        year = start.year
+        while True:
+            yield _year_days(rule, year, start)
+            year += interval
+
+
+def _filter(rule: dict, days: list) -> list:
+    """BYMONTH/BYMONTHDAY/BYDAY als Filter und BYSETPOS anwenden"""
+    freq = rule['freq']
+    if rule['bymonth'] and freq != 'YEARLY':
+        days = [day for day in days if day.month in rule['bymonth']]
+    if freq == 'DAILY':
+        if rule['bymonthday']:
+            days = [day for day in days
+                    if day.day in rule['bymonthday']
+                    or day.day - monthrange(day.year, day.month)[1] - 1 in rule['bymonthday']]
+        if rule['byday']:
+            weekdays = {weekday for _, weekday in rule['byday']}
+            days = [day for day in days if day.weekday() in weekdays]
+    if rule['bysetpos'] and days:
+        days = sorted({days[pos - 1 if pos > 0 else pos]
+                       for pos in rule['bysetpos'] if 1 <= abs(pos) <= len(days)})
+    return days
+
+
+def _parse_value(value: str, params: dict, tz: ZoneInfo, all_day: bool) -> datetime:
+    """iCalendar DATE oder DATE-TIME als aware datetime (Datum: Mitternacht in tz)"""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        parsed = datetime.strptime(value[:8], '%Y%m%d')
+        return parsed.replace(tzinfo=tz)
+    if value.endswith('Z'):
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+    zone = get_zone(params['TZID']) if 'TZID' in params else tz
+    return datetime.strptime(value, '%Y%m%dT%H%M%S').replace(tzinfo=zone)
+
+
+def _property(line: str) -> tuple:
+    """'EXDATE;TZID=Europe/Berlin:20250101T090000,...' -> (Name, Parameter, Werte)"""
+    head, _, values = line.partition(':')
+    name, *params = head.split(';')
+    params = dict(param.split('=', 1) for param in params if '=' in param)
+    return name.strip().upper(), params, [value.strip() for value in values.split(',') if value.strip()]
+
+
+class Series:
+    """Wiederkehrendes Event - Instanzen lazy expandiert und pro Serie gemerkt"""
+
+    def __init__(self, event: dict, tz: ZoneInfo):
+        self.event = event
+        start = event['start']
+        self.all_day = 'date' in start
+        if self.all_day:
+            self.tz = tz
+            self.dtstart = datetime.combine(date.fromisoformat(start['date']), dt_time())
+            self.days = (date.fromisoformat(event['end']['date'])
+                         - date.fromisoformat(start['date'])).days
+            self.duration = self.days * 86400
+        else:
+            self.tz = get_zone(start['timeZone']) if start.get('timeZone') else tz
+            parsed = datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00'))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=self.tz)
+            end = datetime.fromisoformat(event['end']['dateTime'].replace('Z', '+00:00'))
+            if end.tzinfo is None:
+                end = end.replace(tzinfo=self.tz)
+            self.dtstart = parsed.astimezone(self.tz).replace(tzinfo=None)
+            self.duration = end.timestamp() - parsed.timestamp()
+
+        self.rules = []
+        self.rdates = []
+        self.exdates = set()
+        for line in event.get('recurrence', []):
+            name, params, values = _property(line)
+            if name == 'RRULE':
+                self.rules.append(parse_rule(line.partition(':')[2]))
+            elif name in ('RDATE', 'EXDATE'):
+                timestamps = [_parse_value(value, params, self.tz, self.all_day).timestamp()
+                              for value in values]
+                if name == 'RDATE':
+                    self.rdates.extend(timestamps)
+                else:
+                    self.exdates.update(timestamps)
+            else:
+                raise UnsupportedRule(f"recurrence nicht unterstützt: {name}")
+        self.rdates.sort()
+
+        self._starts = array('d')
+        self._source = self._generate()
+        self._exhausted = False
+
+    def _timestamp(self, local: datetime) -> float:
+        return local.replace(tzinfo=self.tz).timestamp()
+
+    def _until(self, rule: dict) -> Optional[float]:
+        until = rule['until']
+        if not until:
+            return None
+        if len(until) == 8:
+            # Datum: ganzer Tag zählt noch
+            local = datetime.combine(datetime.strptime(until, '%Y%m%d').date(), dt_time(23, 59, 59))
+            return self._timestamp(local)
+        return _parse_value(until, {}, self.tz, self.all_day).timestamp()
+
+    def _rule_starts(self, rule: dict):
+        """Startzeiten einer RRULE nach DTSTART, aufsteigend"""
+        until = self._until(rule)
+        # DTSTART zählt als erste Instanz (RFC 5545)
+        remaining = None if rule['count'] is None else rule['count'] - 1
+        start_day = self.dtstart.date()
+        empty = 0
+        try:
+            for days in _periods(rule, start_day):
+                emitted = False
+                for day in _filter(rule, days):
+                    if day <= start_day:
+                        continue
+                    if remaining is not None and remaining <= 0:
+                        return
+                    timestamp = self._timestamp(datetime.combine(day, self.dtstart.time()))
+                    if until is not None and timestamp > until:
+                        return
+                    emitted = True
+                    if remaining is not None:
+                        remaining -= 1
+                    yield timestamp
+                empty = 0 if emitted else empty + 1
+                if empty > MAX_EMPTY_PERIODS:
+                    return
+        except (OverflowError, ValueError):
+            # Jenseits von date.max
+            return
+
+    def _generate(self):
+        """Alle Startzeiten (DTSTART, RRULEs, RDATEs) sortiert, ohne Duplikate und EXDATEs"""
+        first = self._timestamp(self.dtstart)
+        sources = [iter([first]), iter(self.rdates)]
+        sources.extend(self._rule_starts(rule) for rule in self.rules)
+        previous = None
+        for timestamp in merge(*sources):
+            if timestamp != previous and timestamp not in self.exdates:
+                yield timestamp
+            previous = timestamp
+
+    def _fill(self, until: float):
+        """Startzeiten bis until expandieren (nur so weit wie nötig)"""
+        starts = self._starts
+        while not self._exhausted and (not starts or starts[-1] < until):
+            try:
+                starts.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+
+    def between(self, start: float, end: float, excluded=()) -> list:
+        """Startzeiten der Instanzen mit Überlappung zu [start, end)
+
+        excluded: Startzeiten geänderter oder abgesagter Instanzen (Ausnahmen).
+        """
+        self._fill(end)
+        starts = self._starts
+        low = bisect_left(starts, start - self.duration)
+        high = bisect_left(starts, end)
+        return [timestamp for timestamp in starts[low:high]
+                if timestamp + self.duration > start and timestamp not in excluded]
+
+    def bounds(self, timestamp: float) -> tuple:
+        """Start und Ende einer Instanz (ganztägig: Mitternacht in tz, sommerzeitfest)"""
+        if not self.all_day:
+            return timestamp, timestamp + self.duration
+        day = datetime.fromtimestamp(timestamp, self.tz).date() + timedelta(days=self.days)
+        return timestamp, datetime.combine(day, dt_time(), tzinfo=self.tz).timestamp()
+
+    def instance(self, timestamp: float) -> dict:
+        """Instanz als Event dict (wie events.instances) - ID nach dem Schema der API"""
+        event = dict(self.event)
+        event.pop('recurrence', None)
+        local = datetime.fromtimestamp(timestamp, self.tz)
+        if self.all_day:
+            start = {'date': local.date().isoformat()}
+            end = {'date': (local.date() + timedelta(days=self.days)).isoformat()}
+            suffix = local.strftime('%Y%m%d')
+        else:
+            end_local = datetime.fromtimestamp(timestamp + self.duration, self.tz)
+            start = {'dateTime': local.isoformat(), 'timeZone': self.tz.key}
+            end = {'dateTime': end_local.isoformat(), 'timeZone': self.tz.key}
+            suffix = datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        event.update(
+            id=f"{self.event['id']}_{suffix}",
+            recurringEventId=self.event['id'],
+            originalStartTime=dict(start),
+            start=start,
+            end=end,
+        )
+        return event
@@ -0,0 +1,125 @@
+"""
+In-Process Cache für lesende Google API Requests
+
+Gecacht werden nur GET Requests, deren methodId eine TTL hat. Nach Ablauf
+der TTL wird ein Eintrag mit ETag nicht verworfen, sondern per
+If-None-Match revalidiert (304 = Eintrag gilt weiter). Schreibende
+Requests entfernen alle Einträge unterhalb der betroffenen Collection.
+"""
+
+import copy
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlsplit
+
+# TTL in Sekunden pro API Methode - nicht aufgeführte Methoden werden nie gecacht
+CACHE_TTLS = {
+    'calendar.events.get': 60,
+    'calendar.events.instances': 60,
+    'calendar.calendars.get': 3600,
+    'calendar.calendarList.get': 3600,
+    'calendar.calendarList.list': 600,
+    'calendar.settings.get': 3600,
+    # Inhalt ist unveränderlich, Labels (z.B. UNREAD) nicht
+    'gmail.users.messages.get': 60,
+    'gmail.users.threads.get': 60,
+    'gmail.users.getProfile': 60,
+    'gmail.users.labels.list': 300,
+}
+
+# POST Requests, die nur lesen und daher nichts invalidieren
+READ_ONLY_POSTS = {'calendar.freebusy.query'}
+
+
+class ResponseCache:
+    """LRU Cache mit TTL pro Methode - nur aus dem Event Loop benutzen (nicht thread-safe)"""
+
+    def __init__(self, max_entries: int, ttls: Optional[dict] = None):
+        self.max_entries = max_entries
+        self.ttls = CACHE_TTLS if ttls is None else ttls
+        self._entries = OrderedDict()
+        # Zählt Invalidierungen - Antworten, die eine Invalidierung überholt hat, werden verworfen
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def cacheable(self, request) -> bool:
+        """True für GET Requests mit konfigurierter TTL"""
+        return request.method == 'GET' and request.methodId in self.ttls
+
+    def lookup(self, request, revalidate: bool = False) -> tuple:
+        """(Kopie des Ergebnisses oder None, ETag für If-None-Match oder None)
+
+        revalidate erzwingt die Prüfung per ETag auch innerhalb der TTL
+        (z.B. vor Read-Modify-Write mit If-Match).
+        """
+        entry = self._entries.get(request.uri)
+        if entry is None:
+            self.misses += 1
+            return None, None
+        expires, etag, result = entry
+        self._entries.move_to_end(request.uri)
+        if expires > time.monotonic() and not revalidate:
+            self.hits += 1
+            return copy.deepcopy(result), None
+        if etag is None:
+            del self._entries[request.uri]
+            self.misses += 1
+            return None, None
+        return None, etag
+
+    def cached(self, request):
+        """Gespeichertes Ergebnis nach einer 304 Antwort - TTL beginnt neu
+
+        None, falls der Eintrag inzwischen verdrängt oder invalidiert wurde.
+        """
+        entry = self._entries.get(request.uri)
+        if entry is None:
+            return None
+        _, etag, result = entry
+        self._entries[request.uri] = (time.monotonic() + self.ttls[request.methodId], etag, result)
+        self._entries.move_to_end(request.uri)
+        self.revalidated += 1
+        return copy.deepcopy(result)
+
+    def store(self, request, result, generation: int):
+        """Ergebnis speichern - außer es wurde inzwischen invalidiert"""
+        if generation != self.generation:
+            return
+        etag = result.get('etag') if isinstance(result, dict) else None
+        self._entries[request.uri] = (
+            time.monotonic() + self.ttls[request.methodId], etag, copy.deepcopy(result))
+        self._entries.move_to_end(request.uri)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_for(self, request):
+        """Nach einem schreibenden Request alle Einträge der betroffenen Collection entfernen"""
+        if request.method == 'GET' or request.methodId in READ_ONLY_POSTS:
+            return
+        # .../calendars/C/events/E -> .../calendars/C/events
+        prefix = urlsplit(request.uri).path.rsplit('/', 1)[0]
+        self.invalidate_prefix(prefix)
+
+    def invalidate_prefix(self, prefix: str):
+        """Alle Einträge entfernen, deren URL-Pfad mit prefix beginnt"""
+        self.generation += 1
+        for uri in [uri for uri in self._entries if urlsplit(uri).path.startswith(prefix)]:
+            del self._entries[uri]
+
+    def clear(self):
+        """Alle Einträge entfernen"""
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Größe und Trefferzähler für die Diagnose"""
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+        }
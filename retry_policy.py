@@ -0,0 +1,167 @@
+"""
+Retry Policy und Circuit Breaker für Google API Requests
+
+Fehler werden in Klassen eingeteilt. Wiederholt wird abhängig davon, ob
+ein Request idempotent ist: Rate Limits (429, 403 rateLimitExceeded) und
+Verbindungsfehler vor dem Senden sind immer sicher, denn Google hat den
+Request nicht verarbeitet. 5xx und Timeouts nach dem Senden werden nur
+bei idempotenten Requests wiederholt - ein send_email geht nie doppelt raus.
+"""
+
+import json
+import random
+import socket
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+from googleapiclient.errors import HttpError
+
+# Fehlerklassen
+RATE_LIMIT = 'rate_limit'   # abgelehnt, nicht verarbeitet
+CONNECT = 'connect'         # Verbindung kam nicht zustande, nicht gesendet
+SERVER = 'server'           # 5xx - Verarbeitung unklar
+TRANSPORT = 'transport'     # Abbruch nach dem Senden (Timeout, Reset) - Verarbeitung unklar
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'PATCH'}
+# POST Methoden, die mit einer ID im Body idempotent werden
+CLIENT_ID_INSERTS = {'calendar.events.insert'}
+
+
+class CircuitOpenError(RuntimeError):
+    """Google API ist gestört - Requests werden bis zum Ablauf der Sperre abgelehnt"""
+
+
+def error_reason(error: HttpError) -> Optional[str]:
+    """reason aus dem JSON Fehler-Body (z.B. rateLimitExceeded)"""
+    try:
+        details = json.loads(error.content)['error']
+        return details.get('errors', [{}])[0].get('reason') or details.get('status')
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+
+def classify(error: BaseException) -> Optional[str]:
+    """Fehlerklasse bestimmen - None für Fehler, die eine Wiederholung nicht behebt"""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status == 429 or (status == 403 and error_reason(error) in RATE_LIMIT_REASONS):
+            return RATE_LIMIT
+        if status in RETRYABLE_STATUS:
+            return SERVER
+        return None
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout,
+                          ConnectionRefusedError, socket.gaierror)):
+        return CONNECT
+    if type(error).__name__ == 'ServerNotFoundError':
+        # httplib2 - DNS Auflösung fehlgeschlagen
+        return CONNECT
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError, socket.timeout)):
+        return TRANSPORT
+    return None
+
+
+def is_idempotent(request) -> bool:
+    """Darf der Request nach unklarem Ausgang wiederholt werden?
+
+    PATCH mit If-Match nicht: war der erste Versuch erfolgreich, schlägt
+    die Wiederholung mit 412 fehl. Inserts mit vom Client vergebener ID
+    schon: ein doppelter Versuch endet mit 409 statt einem zweiten Objekt.
+    """
+    if request.methodId in CLIENT_ID_INSERTS:
+        try:
+            return bool(json.loads(request.body).get('id'))
+        except (TypeError, ValueError, AttributeError):
+            return False
+    if request.method not in IDEMPOTENT_METHODS:
+        return False
+    return not (request.method == 'PATCH' and 'If-Match' in request.headers)
+
+
+def should_retry(kind: Optional[str], idempotent: bool) -> bool:
+    """Wiederholen nur, wenn Google den Request sicher nicht ausgeführt hat - oder es egal ist"""
+    if kind in (RATE_LIMIT, CONNECT):
+        return True
+    return kind in (SERVER, TRANSPORT) and idempotent
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Retry-After Header (Sekunden oder HTTP Datum) einer HttpError Antwort"""
+    if not isinstance(error, HttpError):
+        return None
+    value = error.resp.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponentielles Backoff mit Full Jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Circuit Breaker pro API
+
+    Nach threshold aufeinanderfolgenden Störungen (5xx, Netzwerk) werden
+    Requests cooldown Sekunden sofort abgelehnt. Danach darf ein einzelner
+    Probe-Request durch - Erfolg schließt den Breaker, Fehler sperrt erneut.
+    """
+
+    def __init__(self, name: str, threshold: int, cooldown: float):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """closed, open oder half-open"""
+        if self.opened_at is None:
+            return 'closed'
+        if self._probing or time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half-open'
+        return 'open'
+
+    def before(self):
+        """Vor jedem Versuch - wirft CircuitOpenError, solange die Sperre läuft"""
+        if self.opened_at is None:
+            return
+        remaining = self.cooldown - (time.monotonic() - self.opened_at)
+        if remaining > 0 or self._probing:
+            raise CircuitOpenError(
+                f"Google {self.name} API derzeit gestört - "
+                f"neuer Versuch in {max(1, int(remaining))} s möglich")
+        self._probing = True
+
+    def record(self, kind: Optional[str]):
+        """Ergebnis eines Versuchs - kind aus classify(), None bei Erfolg"""
+        if kind in (SERVER, CONNECT, TRANSPORT):
+            self.failures += 1
+            if self._probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+        elif kind is None:
+            self.failures = 0
+            self.opened_at = None
+        # Rate Limits sagen nichts über den Zustand der API aus
+        self._probing = False
+
+    def release(self):
+        """Abgebrochener Versuch (z.B. Cancel) - Probe freigeben, ohne zu werten"""
+        self._probing = False
+
+    def stats(self) -> dict:
+        """Zustand für die Diagnose"""
+        return {'state': self.state, 'consecutive_failures': self.failures}
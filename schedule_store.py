@@ -0,0 +1,144 @@
+"""
+Persistente Warteschlange für geplante Emails (SQLite)
+
+Der Scheduler im GoogleMCPServer hält nur (Fälligkeit, Job ID) in einem
+Heap. Nachrichten und Status liegen hier, damit geplante Emails einen
+Neustart überstehen. Vor dem Versand wird ein Job per UPDATE ... WHERE
+status = 'pending' beansprucht - so sendet auch bei mehreren Prozessen
+nur einer, und abgebrochene Jobs werden übersprungen.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+STORE_PATH = os.path.expanduser('~/.config/google-mcp/scheduled_mail.sqlite3')
+
+# Job Status
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    due REAL NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_due ON jobs (status, due);
+"""
+
+
+class ScheduleStore:
+    """SQLite Job Store - thread-safe, Aufrufe blockieren (Worker Thread nutzen)"""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(_SCHEMA)
+
+    def add(self, job_id: str, account: str, due: float, message: dict):
+        """Job anlegen"""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO jobs (id, account, due, message, status, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, account, due, json.dumps(message), PENDING, now, now))
+
+    def pending(self) -> list:
+        """Alle offenen Jobs als (Fälligkeit, Job ID)"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT due, id FROM jobs WHERE status = ?', (PENDING,)).fetchall()
+        return [(row['due'], row['id']) for row in rows]
+
+    def recover(self, stale_before: float) -> int:
+        """Jobs, deren Versand abgebrochen ist (Absturz), als fehlgeschlagen markieren
+
+        Ob Gmail sie noch angenommen hat, ist unklar - sie werden nicht erneut
+        gesendet, damit keine Email doppelt rausgeht.
+        """
+        result = json.dumps({'error': 'Versand unterbrochen - Zustellung unklar'})
+        with self._lock, self._db:
+            return self._db.execute(
+                'UPDATE jobs SET status = ?, result = ?, updated = ? '
+                'WHERE status = ? AND updated < ?',
+                (FAILED, result, time.time(), SENDING, stale_before)).rowcount
+
+    def claim(self, job_ids: list) -> list:
+        """Offene Jobs für den Versand beanspruchen - liefert nur die erfolgreich beanspruchten"""
+        claimed = []
+        now = time.time()
+        with self._lock, self._db:
+            for job_id in job_ids:
+                updated = self._db.execute(
+                    'UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?',
+                    (SENDING, now, job_id, PENDING)).rowcount
+                if updated:
+                    row = self._db.execute(
+                        'SELECT id, account, message FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                    claimed.append({
+                        'id': row['id'],
+                        'account': row['account'],
+                        'message': json.loads(row['message']),
+                    })
+        return claimed
+
+    def finish(self, outcomes: list):
+        """Ergebnisse speichern - outcomes: (Job ID, Ergebnis dict mit success)"""
+        now = time.time()
+        with self._lock, self._db:
+            for job_id, outcome in outcomes:
+                self._db.execute(
+                    'UPDATE jobs SET status = ?, result = ?, updated = ? WHERE id = ?',
+                    (SENT if outcome.get('success') else FAILED, json.dumps(outcome), now, job_id))
+
+    def cancel(self, job_id: str, account: str) -> bool:
+        """Offenen Job abbrechen - False, wenn er nicht (mehr) offen ist"""
+        with self._lock, self._db:
+            return bool(self._db.execute(
+                'UPDATE jobs SET status = ?, updated = ? '
+                'WHERE id = ? AND account = ? AND status = ?',
+                (CANCELLED, time.time(), job_id, account, PENDING)).rowcount)
+
+    def list(self, account: str, status: Optional[str] = None, limit: int = 100) -> list:
+        """Jobs eines Accounts, nächste Fälligkeit zuerst"""
+        sql = 'SELECT id, due, message, status, result FROM jobs WHERE account = ?'
+        params = [account]
+        if status:
+            sql += ' AND status = ?'
+            params.append(status)
+        sql += ' ORDER BY due LIMIT ?'
+        with self._lock:
+            rows = self._db.execute(sql, params + [limit]).fetchall()
+        return [
+            {
+                'id': row['id'],
+                'due': row['due'],
+                'message': json.loads(row['message']),
+                'status': row['status'],
+                'result': json.loads(row['result']) if row['result'] else None,
+            }
+            for row in rows
+        ]
+
+    def close(self):
+        """Datenbank schließen"""
+        with self._lock:
+            self._db.close()
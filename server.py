@@ -4,9 +4,28 @@ Google MCP Server mit Schreibzugriff für Gmail und Calendar
 Unterstützt: Email senden, Calendar Events erstellen/bearbeiten/löschen
 """
 
+import time
+
+# Referenzzeitpunkt für den Startup Timing Report
+_STARTUP_T0 = time.perf_counter()
+
 import json
 import os
-from datetime import datetime
+import sys
+import tempfile
+import functools
+import importlib.util
+import threading
+import uuid
+import heapq
+from bisect import bisect_left
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
 from typing import Any, Optional
 import asyncio
 
@@ -14,13 +33,33 @@ from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from discovery_docs import build_service
+from mail_index import MailIndex, UnsupportedQuery, translate_query
+from mail_merge import MailMerge
+from mime_builder import Attachment, encode_base64url, raw_message, write_message
+from quota import METHOD_COSTS, QuotaManager
+from response_cache import ResponseCache
+from schedule_store import STORE_PATH as SCHEDULE_STORE_PATH, ScheduleStore
+from timezones import get_zone, localize
+import token_store
+from retry_policy import (
+    CircuitBreaker, backoff_delay, classify, is_idempotent, retry_after,
+    should_retry
+)
+from calendar_store import (
+    CalendarStore, event_bounds, free_intervals, free_slots, merge_intervals, parse_time,
+    working_windows
+)
+
+# googleapiclient.discovery, google.auth, httplib2 und der MIME Stack werden
+# erst bei Bedarf importiert - der MCP Handshake soll ohne sie beantwortet
+# werden. Nur googleapiclient.errors (für die except Klauseln) lädt sofort,
+# es zieht keins dieser Pakete nach (ca. 10 ms)
+from googleapiclient.errors import HttpError
+import httpx
 import base64
+import html as html_lib
+import re
 
 # Scopes mit Schreibzugriff
 SCOPES = [
@@ -33,186 +72,2488 @@ SCOPES = [
 
 # Pfade für Credentials
 TOKEN_PATH = os.path.expanduser('~/.config/google-mcp/token.json')
+# Tokens weiterer Accounts: <ACCOUNTS_DIR>/<account>.json (python3 authenticate.py <account>)
+ACCOUNTS_DIR = os.path.expanduser('~/.config/google-mcp/accounts')
+DEFAULT_ACCOUNT = 'default'
+ACCOUNT_NAME = re.compile(r'[A-Za-z0-9@._+-]+')
 CREDENTIALS_PATH = os.path.expanduser('~/.config/google-mcp/credentials.json')
 
-class GoogleMCPServer:
-    def __init__(self):
+# API Versionen der lazy gebauten Services
+SERVICE_VERSIONS = {
+    'gmail': 'v1',
+    'calendar': 'v3',
+}
+
+
+def _log_timing(label: str, started: float = _STARTUP_T0):
+    """Startup- und Lazy-Init-Zeiten auf stderr melden"""
+    print(f"⏱  {label}: {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+
+# Worker Pool für blockierende Google API Aufrufe
+# MAX_WORKERS: gleichzeitig laufende Aufrufe, MAX_QUEUE: zusätzlich wartende Aufrufe
+MAX_WORKERS = int(os.environ.get('GOOGLE_MCP_MAX_WORKERS', '8'))
+MAX_QUEUE = int(os.environ.get('GOOGLE_MCP_MAX_QUEUE', '32'))
+
+
+class ServerBusyError(RuntimeError):
+    """Warteschlange des Worker Pools ist voll"""
+
+
+class ToolExecutor:
+    """Begrenzter Worker Pool - führt blockierende Aufrufe außerhalb des Event Loops aus"""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_queue: int = MAX_QUEUE):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='google-mcp')
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Anzahl laufender plus wartender Aufrufe"""
+        return self._pending
+
+    @asynccontextmanager
+    async def admit(self):
+        """Slot für einen Aufruf belegen - begrenzt laufende und wartende Aufrufe"""
+        if self._pending >= self.max_workers + self.max_queue:
+            raise ServerBusyError(
+                f"Server ausgelastet: {self._pending} Aufrufe in Bearbeitung oder Warteschlange"
+            )
+
+        # Semaphore erst im laufenden Event Loop anlegen
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        self._pending += 1
+        try:
+            # Wartende Aufrufe bleiben im Event Loop und sind damit abbrechbar
+            async with self._slots:
+                yield
+        finally:
+            self._pending -= 1
+
+    async def run(self, func, *args, **kwargs):
+        """Aufruf im Worker Pool ausführen, ohne den Event Loop zu blockieren"""
+        async with self.admit():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        """Worker Pool beenden"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# MCP Transport zum Client: 'stdio' (ein Prozess pro Client) oder 'http'
+# (Streamable HTTP/SSE - ein Prozess für viele Sessions, teilt Credentials,
+# Connection Pool und Caches)
+SERVER_TRANSPORT = os.environ.get('GOOGLE_MCP_SERVER_TRANSPORT', 'stdio')
+HTTP_HOST = os.environ.get('GOOGLE_MCP_HTTP_HOST', '127.0.0.1')
+HTTP_PORT = int(os.environ.get('GOOGLE_MCP_HTTP_PORT', '8765'))
+HTTP_PATH = '/mcp'
+# Optionales Bearer Token, das Clients im Authorization Header senden müssen
+HTTP_AUTH_TOKEN = os.environ.get('GOOGLE_MCP_HTTP_TOKEN')
+# Weitere Accounts im HTTP Modus: eigenes Bearer Token pro Account, kommasepariert
+# '<account>:<token>'. Das gemeinsame Token gilt nur für den Standard-Account,
+# Accounts ohne Eintrag sind über HTTP gesperrt
+HTTP_ACCOUNT_TOKENS = dict(
+    (name.strip(), token.strip()) for name, _, token in (
+        entry.partition(':') for entry in
+        os.environ.get('GOOGLE_MCP_HTTP_ACCOUNT_TOKENS', '').split(','))
+    if name.strip() and token.strip()
+)
+# Erlaubte Host Header (DNS Rebinding Schutz), kommasepariert - leer = nur localhost
+HTTP_ALLOWED_HOSTS = [
+    host.strip() for host in os.environ.get('GOOGLE_MCP_HTTP_ALLOWED_HOSTS', '').split(',')
+    if host.strip()
+]
+# Worker Prozesse im HTTP Modus - ab 2 teilen sich die Prozesse den Port
+# (Lastverteilung durch den Kernel) und die Token-Dateien, Sessions sind
+# dann zustandslos, weil Folge-Requests in einem anderen Prozess landen können
+HTTP_WORKERS = max(1, int(os.environ.get('GOOGLE_MCP_HTTP_WORKERS', '1')))
+
+# HTTP Transport für Google API Requests: 'httpx' (asyncio, HTTP/2, Connection Pool)
+# oder 'httplib2' (googleapiclient Standard, im Worker Pool)
+HTTP_TRANSPORT = os.environ.get('GOOGLE_MCP_HTTP_TRANSPORT', 'httpx')
+MAX_CONNECTIONS = int(os.environ.get('GOOGLE_MCP_MAX_CONNECTIONS', '20'))
+KEEPALIVE_EXPIRY = float(os.environ.get('GOOGLE_MCP_KEEPALIVE_EXPIRY', '60'))
+REQUEST_TIMEOUT = float(os.environ.get('GOOGLE_MCP_REQUEST_TIMEOUT', '30'))
+
+# Token wird so viele Sekunden vor Ablauf im Hintergrund erneuert
+TOKEN_REFRESH_MARGIN = float(os.environ.get('GOOGLE_MCP_TOKEN_REFRESH_MARGIN', '300'))
+# Wartezeit nach einem fehlgeschlagenen Refresh
+TOKEN_REFRESH_RETRY = 30
+
+# Maximale Anzahl Requests pro Calendar Batch Request (Limit der Calendar API)
+CALENDAR_BATCH_LIMIT = 50
+# Gmail erlaubt 100 Requests pro Batch, empfiehlt aber höchstens 50
+GMAIL_BATCH_LIMIT = 50
+
+# Quota pro Nutzer und Sekunde: Gmail in Quota-Einheiten (Kosten pro Methode
+# in quota.METHOD_COSTS), Calendar in Requests
+GMAIL_QUOTA_UNITS_PER_SEC = float(os.environ.get('GOOGLE_MCP_GMAIL_QUOTA_UNITS_PER_SEC', '250'))
+CALENDAR_QUOTA_PER_SEC = float(os.environ.get('GOOGLE_MCP_CALENDAR_QUOTA_PER_SEC', '10'))
+
+# Wiederholungen bei 429/5xx/Netzwerkfehlern: Versuche, Backoff (Sekunden)
+# und maximale Wartezeit - verlangt Google per Retry-After länger, wird nicht gewartet
+RETRY_ATTEMPTS = int(os.environ.get('GOOGLE_MCP_RETRY_ATTEMPTS', '4'))
+RETRY_BASE_DELAY = float(os.environ.get('GOOGLE_MCP_RETRY_BASE_DELAY', '0.5'))
+RETRY_MAX_DELAY = float(os.environ.get('GOOGLE_MCP_RETRY_MAX_DELAY', '32'))
+# Circuit Breaker pro API: Störungen in Folge bis zur Sperre, Dauer der Sperre
+BREAKER_THRESHOLD = int(os.environ.get('GOOGLE_MCP_BREAKER_THRESHOLD', '5'))
+BREAKER_COOLDOWN = float(os.environ.get('GOOGLE_MCP_BREAKER_COOLDOWN', '30'))
+
+# Maximale Anzahl gecachter API Antworten (LRU) pro Account, 0 = Cache aus
+RESPONSE_CACHE_SIZE = int(os.environ.get('GOOGLE_MCP_CACHE_SIZE', '1000'))
+
+# Multi-Account: Accounts mit geladenen Credentials (LRU) und gleichzeitige
+# Google API Aufrufe pro Account
+ACCOUNT_POOL_SIZE = int(os.environ.get('GOOGLE_MCP_ACCOUNT_POOL_SIZE', '32'))
+ACCOUNT_MAX_CONCURRENT = int(os.environ.get('GOOGLE_MCP_ACCOUNT_MAX_CONCURRENT', '4'))
+# HTTP Modus: Account aus diesem Header, falls das Tool-Argument fehlt
+ACCOUNT_HEADER = 'x-google-account'
+
+# Emails mit Anhängen: bis MESSAGE_SPOOL_BYTES im Speicher, darüber in einer
+# Temp-Datei. Bis INLINE_MESSAGE_BYTES als raw Feld (base64 im JSON Body),
+# größere per Resumable Upload in Blöcken zu UPLOAD_CHUNK_BYTES (Vielfaches von 256 KB)
+MESSAGE_SPOOL_BYTES = 1024 * 1024
+INLINE_MESSAGE_BYTES = int(os.environ.get('GOOGLE_MCP_INLINE_MESSAGE_BYTES', str(1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+# Größenlimit der Gmail API für Uploads
+GMAIL_MAX_MESSAGE_BYTES = 35 * 1024 * 1024
+# Verzeichnisse, aus denen Anhänge per Pfad gelesen werden dürfen (getrennt
+# durch os.pathsep) - leer: beliebige Pfade im stdio Modus, keine im HTTP Modus
+ATTACHMENT_DIRS = [
+    os.path.realpath(os.path.expanduser(directory))
+    for directory in os.environ.get('GOOGLE_MCP_ATTACHMENT_DIRS', '').split(os.pathsep)
+    if directory.strip()
+]
+
+# Geplante Emails: höchstens so viele fällige Jobs pro Durchgang, Jobs, die
+# seit so vielen Sekunden im Versand hängen, gelten als abgebrochen (geprüft
+# beim Start und bei jedem Aufwachen des Schedulers)
+SCHEDULE_BATCH_SIZE = 100
+SCHEDULE_CLAIM_TIMEOUT = 300
+# Mehrere Worker Prozesse: so oft (Sekunden) lädt der Scheduler Jobs nach,
+# die andere Prozesse in den Job Store geschrieben haben
+SCHEDULE_RELOAD_INTERVAL = 30
+# Worker Prozesse ohne Hintergrund-Tasks versuchen so oft (Sekunden), sie zu übernehmen
+BACKGROUND_ELECTION_RETRY = 30
+
+# Lese-Tools: Standard-Header im metadata Format und Byte-Budget pro Antwort
+METADATA_HEADERS = ['From', 'To', 'Cc', 'Subject', 'Date']
+MAX_RESULT_BYTES = int(os.environ.get('GOOGLE_MCP_MAX_RESULT_BYTES', '50000'))
+# Nachrichten pro Batch beim Laden: Metadaten sind klein, volle Bodies nicht
+METADATA_FETCH_CHUNK = 50
+FULL_FETCH_CHUNK = 5
+
+# Optionaler lokaler Mail Index (SQLite + FTS5) für Suchanfragen ohne API Aufruf
+MAIL_INDEX_ENABLED = os.environ.get('GOOGLE_MCP_MAIL_INDEX', '0') == '1'
+MAIL_INDEX_LIMIT = int(os.environ.get('GOOGLE_MCP_MAIL_INDEX_LIMIT', '10000'))
+MAIL_SYNC_INTERVAL = float(os.environ.get('GOOGLE_MCP_MAIL_SYNC_INTERVAL', '60'))
+
+# Lokaler Calendar Spiegel: höchstens so alt (Sekunden), bevor vor einer
+# Abfrage inkrementell nachsynchronisiert wird
+CALENDAR_SYNC_INTERVAL = float(os.environ.get('GOOGLE_MCP_CALENDAR_SYNC_INTERVAL', '30'))
+# Zeitzone, falls der Kalender (noch) keine liefert - sonst gilt pro Aufruf
+# time_zone bzw. die Zeitzone des Kalenders (calendars.get, gecacht)
+DEFAULT_TIME_ZONE = 'Europe/Berlin'
+# Zeilen im recurrence Feld eines Events (RFC 5545)
+RECURRENCE_LINE = re.compile(r'(RRULE|EXRULE):\S|(RDATE|EXDATE)[;:]\S', re.IGNORECASE)
+# after:/before: in einer Gmail Suchanfrage (Tag in der Zeitzone des Accounts)
+MAIL_DATE_OPERATOR = re.compile(r'\b(after|before):', re.IGNORECASE)
+
+# Free/Busy Konfliktprüfung: Cache-Dauer (Sekunden), Kalender pro
+# freebusy.query (Limit der Calendar API) und Suchhorizont für Alternativen
+FREEBUSY_CACHE_TTL = float(os.environ.get('GOOGLE_MCP_FREEBUSY_CACHE_TTL', '60'))
+FREEBUSY_CALENDAR_LIMIT = 50
+# Zeitraum pro freebusy.query - längere Zeiträume werden aufgeteilt
+FREEBUSY_RANGE_DAYS = 60
+PROPOSE_HORIZON_DAYS = 7
+WORKING_DAY_START = dt_time(9, 0)
+WORKING_DAY_END = dt_time(18, 0)
+# Maximaler Zeitraum für suggest_meeting_times
+MEETING_HORIZON_DAYS = 180
+
+
+class AsyncGoogleTransport:
+    """Führt googleapiclient Requests über einen gemeinsamen httpx.AsyncClient aus
+
+    Die Requests werden weiterhin mit build() erzeugt (URI, Body, Header),
+    nur der Versand läuft asynchron über eine gepoolte HTTP/2 Verbindung.
+    """
+
+    def __init__(self, creds_provider, refresh):
+        self._creds_provider = creds_provider
+        self._refresh = refresh
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Gemeinsamer AsyncClient - wird beim ersten Request angelegt"""
+        if self._client is None:
+            # Ohne h2 Paket nur HTTP/1.1 (Keep-Alive Pool bleibt aktiv)
+            http2 = importlib.util.find_spec('h2') is not None
+
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._client
+
+    async def _send(self, request) -> tuple:
+        headers = {
+            key: value for key, value in request.headers.items()
+            if key.lower() != 'content-length'
+        }
+        creds = self._creds_provider()
+        token = creds.token
+        creds.apply(headers, token=token)
+        response = await self.client.request(
+            request.method, request.uri, content=request.body, headers=headers)
+        return response, token
+
+    async def execute(self, request):
+        """googleapiclient HttpRequest asynchron ausführen"""
+        await self._refresh()
+        response, token = await self._send(request)
+
+        # Token wurde serverseitig ungültig - einmal erneuern und wiederholen
+        if response.status_code == 401:
+            await self._refresh(stale_token=token)
+            response, _ = await self._send(request)
+
+        import httplib2
+
+        resp = httplib2.Response({'status': response.status_code, **response.headers})
+        resp.reason = response.reason_phrase
+        if response.status_code >= 300:
+            raise HttpError(resp, response.content, uri=request.uri)
+        return request.postproc(resp, response.content)
+
+    async def aclose(self):
+        """Verbindungen schließen"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Account des laufenden Tool-Aufrufs (gesetzt in call_tool)
+_current_account: ContextVar[Optional['GoogleAccount']] = ContextVar('google_account', default=None)
+
+
+class GoogleAccount:
+    """Credentials, Services und Caches eines Google Accounts"""
+
+    def __init__(self, name: str, token_path: str):
+        self.name = name
+        self.token_path = token_path
         self.creds = None
-        self.gmail_service = None
-        self.calendar_service = None
+        self.services = {}
+        self._service_lock = threading.Lock()
+        self._auth_task: Optional[asyncio.Task] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+        # Kalender mit eigenen Schreibzugriffen seit dem letzten Sync
+        self.calendar_stale = set()
+        # Free/Busy pro Kalender: (abgerufen, Fenster Start, Fenster Ende, Busy-Intervalle, Fehler)
+        self.freebusy_cache = {}
+        # Standard-Zeitzone pro Kalender (Task von calendars.get)
+        self.calendar_zones = {}
+        self.in_flight = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Begrenzt gleichzeitige Google API Aufrufe dieses Accounts"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(ACCOUNT_MAX_CONCURRENT)
+        self.in_flight += 1
+        try:
+            async with self._slots:
+                yield
+        finally:
+            self.in_flight -= 1
 
     def authenticate(self):
         """OAuth 2.0 Authentifizierung - verwendet existierendes Token"""
+        from google.oauth2.credentials import Credentials
+
+        started = time.perf_counter()
         # Token laden
-        if not os.path.exists(TOKEN_PATH):
+        if not os.path.exists(self.token_path):
+            command = 'python3 authenticate.py'
+            if self.name != DEFAULT_ACCOUNT:
+                command += f' {self.name}'
             raise FileNotFoundError(
-                f"Token nicht gefunden: {TOKEN_PATH}\n"
-                "Führe zuerst 'python3 authenticate.py' aus, um dich zu authentifizieren."
+                f"Token nicht gefunden: {self.token_path}\n"
+                f"Führe zuerst '{command}' aus, um dich zu authentifizieren."
             )
 
-        self.creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+        self.creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
 
         # Token erneuern falls abgelaufen
         if self.creds and self.creds.expired and self.creds.refresh_token:
-            self.creds.refresh(Request())
-            # Token speichern
-            with open(TOKEN_PATH, 'w') as token:
+            self._refresh_sync()
+
+        _log_timing(f'Credentials geladen ({self.name})', started)
+
+    async def ready(self):
+        """Warten bis die Credentials geladen sind
+
+        authenticate() läuft beim ersten Aufruf im Hintergrund-Thread. Schlägt
+        es fehl (z.B. Token fehlt), wird der Fehler gemeldet und beim nächsten
+        Aufruf erneut versucht.
+        """
+        if self._auth_task is None or (
+                self._auth_task.done() and self._auth_task.exception() is not None):
+            self._auth_task = asyncio.ensure_future(asyncio.to_thread(self.authenticate))
+        await asyncio.shield(self._auth_task)
+
+    def _build_service(self, name: str):
+        """Service bauen (blockierend) - jeder Service nur einmal"""
+        with self._service_lock:
+            service = self.services.get(name)
+            if service is None:
+                started = time.perf_counter()
+                service = build_service(name, SERVICE_VERSIONS[name], self.creds)
+                self.services[name] = service
+                _log_timing(f'{name} Service gebaut', started)
+        return service
+
+    async def service(self, name: str):
+        """Google API Service - wird beim ersten Zugriff im Hintergrund gebaut"""
+        await self.ready()
+        service = self.services.get(name)
+        if service is None:
+            service = await asyncio.to_thread(self._build_service, name)
+        return service
+
+    def _save_token(self):
+        """Token atomar speichern (Temp-Datei + Rename) - Leser sehen nie eine halbe Datei"""
+        directory = os.path.dirname(self.token_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as token:
                 token.write(self.creds.to_json())
+                token.flush()
+                os.fsync(token.fileno())
+            os.replace(tmp_path, self.token_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _refresh_sync(self):
+        """Token erneuern und speichern (blockierend)
+
+        Unter dem File Lock der Token-Datei - hat ein anderer Worker Prozess
+        inzwischen erneuert, wird dessen Token übernommen.
+        """
+        from google.auth.transport.requests import Request
+
+        with token_store.locked(self.token_path):
+            if token_store.adopt_stored_token(self.creds, self.token_path, SCOPES):
+                return
+            self.creds.refresh(Request())
+            self._save_token()
+
+    def _expires_within(self, margin: float) -> bool:
+        """True, wenn das Access Token fehlt, abgelaufen ist oder in margin Sekunden abläuft"""
+        if not self.creds.valid:
+            return True
+        if self.creds.expiry is None:
+            return False
+        return self.creds.expiry - datetime.utcnow() <= timedelta(seconds=margin)
+
+    async def refresh_credentials(self, margin: float = 0, stale_token: Optional[str] = None):
+        """Token erneuern, falls es bald abläuft oder stale_token abgelehnt wurde
+
+        Die Credentials werden in-place erneuert, alle laufenden und folgenden
+        Requests verwenden damit automatisch das neue Token. Der Lock sorgt
+        dafür, dass gleichzeitig nur ein Refresh (im Worker Pool) läuft.
+        """
+        def needed():
+            if stale_token is not None and self.creds.token == stale_token:
+                return True
+            return self._expires_within(margin)
+
+        if not needed():
+            return
+
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Ein anderer Aufruf hat inzwischen erneuert
+            if needed():
+                # Eigener Thread statt Worker Pool: Requests, die auf das neue
+                # Token warten, belegen dort bereits Slots
+                await asyncio.to_thread(self._refresh_sync)
+
+    async def run_token_refresher(self):
+        """Hintergrund-Task: Token TOKEN_REFRESH_MARGIN Sekunden vor Ablauf erneuern"""
+        try:
+            await self.ready()
+        except Exception as e:
+            print(f"⚠️  {e}", file=sys.stderr)
+            return
+
+        margin = TOKEN_REFRESH_MARGIN
+        while True:
+            if self.creds is None or not self.creds.refresh_token:
+                return
+
+            if self.creds.expiry is not None:
+                remaining = (self.creds.expiry - datetime.utcnow()).total_seconds()
+                delay = remaining - margin
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            try:
+                await self.refresh_credentials(margin=margin)
+            except Exception as e:
+                print(f"⚠️  Token refresh fehlgeschlagen: {e}", file=sys.stderr)
+                await asyncio.sleep(TOKEN_REFRESH_RETRY)
+                continue
+
+            # Ohne Ablaufzeit gibt es nichts zu planen
+            if self.creds.expiry is None:
+                return
+
+            # Margin höchstens die halbe Laufzeit - sonst läge jedes neue Token
+            # sofort wieder im Margin und würde ohne Pause erneuert
+            lifetime = (self.creds.expiry - datetime.utcnow()).total_seconds()
+            margin = min(TOKEN_REFRESH_MARGIN, lifetime / 2)
+            if lifetime - margin < TOKEN_REFRESH_RETRY:
+                await asyncio.sleep(TOKEN_REFRESH_RETRY)
+
+
+class AccountPool:
+    """LRU Pool der Accounts - ungenutzte Accounts werden über max_accounts hinaus verdrängt
+
+    Verdrängt werden nur Accounts ohne laufende Aufrufe; der Standard-Account
+    bleibt immer erhalten. Beim nächsten Zugriff wird das Token neu geladen.
+    """
+
+    def __init__(self, max_accounts: int):
+        self.max_accounts = max(1, max_accounts)
+        self._accounts = OrderedDict()
+        # Token Refresher pro geladenem Account, solange run_token_refreshers läuft
+        self._refreshers = {}
+        self._refreshing = False
+
+    @staticmethod
+    def token_path(name: str) -> str:
+        """Token-Datei eines Accounts - der Standard-Account nutzt TOKEN_PATH"""
+        if name == DEFAULT_ACCOUNT:
+            return TOKEN_PATH
+        if not ACCOUNT_NAME.fullmatch(name):
+            raise ValueError(f"Ungültiger Account Name: {name}")
+        return os.path.join(ACCOUNTS_DIR, f'{name}.json')
+
+    def get(self, name: str) -> GoogleAccount:
+        """Account holen oder anlegen (Credentials werden erst bei Bedarf geladen)"""
+        account = self._accounts.get(name)
+        if account is None:
+            account = self._accounts[name] = GoogleAccount(name, self.token_path(name))
+            if self._refreshing:
+                self._refreshers[name] = asyncio.ensure_future(account.run_token_refresher())
+        self._accounts.move_to_end(name)
+        self._evict(keep=name)
+        return account
+
+    def _evict(self, keep: str):
+        """Älteste ungenutzte Accounts verdrängen - keep (gerade angefragt) bleibt"""
+        for name in list(self._accounts):
+            if len(self._accounts) <= self.max_accounts:
+                break
+            account = self._accounts[name]
+            if name not in (DEFAULT_ACCOUNT, keep) and account.in_flight == 0:
+                del self._accounts[name]
+                refresher = self._refreshers.pop(name, None)
+                if refresher is not None:
+                    refresher.cancel()
+
+    async def run_token_refreshers(self):
+        """Hintergrund-Task: Tokens aller geladenen Accounts vor Ablauf erneuern
+
+        Auch später geladene Accounts bekommen einen Refresher, verdrängte
+        verlieren ihn.
+        """
+        self._refreshing = True
+        for name, account in self._accounts.items():
+            if name not in self._refreshers:
+                self._refreshers[name] = asyncio.ensure_future(account.run_token_refresher())
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._refreshing = False
+            for refresher in self._refreshers.values():
+                refresher.cancel()
+            self._refreshers.clear()
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def stats(self) -> list:
+        """Geladene Accounts für die Diagnose (älteste Nutzung zuerst)"""
+        return [
+            {
+                'account': name,
+                'authenticated': account.creds is not None,
+                'services': sorted(account.services),
+                'in_flight': account.in_flight,
+                'cache': account.response_cache.stats(),
+            }
+            for name, account in self._accounts.items()
+        ]
+
+
+class GoogleMCPServer:
+    def __init__(self, executor: ToolExecutor):
+        self.accounts = AccountPool(ACCOUNT_POOL_SIZE)
+        self.executor = executor
+        self.transport = None
+        if HTTP_TRANSPORT == 'httpx':
+            self.transport = AsyncGoogleTransport(lambda: self.creds, self.refresh_credentials)
+        self.breakers = {}
+        self.mail_index: Optional[MailIndex] = None
+        self._mail_sync_lock: Optional[asyncio.Lock] = None
+        self.calendar_store: Optional[CalendarStore] = None
+        self._calendar_sync_lock: Optional[asyncio.Lock] = None
+        self.schedule_store: Optional[ScheduleStore] = None
+        # Geplante Emails: Heap aus (Fälligkeit, Job ID), Event weckt den Scheduler
+        self._schedule_heap = []
+        self._schedule_wakeup: Optional[asyncio.Event] = None
+        # Worker Prozesse teilen sich die Quota der Nutzer
+        workers = HTTP_WORKERS if SERVER_TRANSPORT == 'http' else 1
+        gmail_rate = GMAIL_QUOTA_UNITS_PER_SEC / workers
+        calendar_rate = CALENDAR_QUOTA_PER_SEC / workers
+        self.quota = QuotaManager({
+            'gmail': (gmail_rate, gmail_rate),
+            'calendar': (calendar_rate, calendar_rate),
+        })
+        self._local = threading.local()
+
+    def _http(self, creds):
+        """Eigene HTTP Verbindung pro Worker Thread und Account (httplib2 ist nicht thread-safe)"""
+        connections = getattr(self._local, 'http', None)
+        if connections is None:
+            connections = self._local.http = {}
+        http = connections.get(id(creds))
+        if http is None or http.credentials is not creds:
+            import google_auth_httplib2
+            import httplib2
+
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+            connections[id(creds)] = http
+        return http
+
+    def _execute_sync(self, request, creds):
+        """API Request über die Verbindung des aktuellen Threads ausführen"""
+        return request.execute(http=self._http(creds))
+
+    def _breaker(self, request) -> CircuitBreaker:
+        """Circuit Breaker der API eines Requests (gmail, calendar)"""
+        api = (request.methodId or 'google').split('.', 1)[0]
+        breaker = self.breakers.get(api)
+        if breaker is None:
+            breaker = self.breakers[api] = CircuitBreaker(api, BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+        return breaker
+
+    async def _send_once(self, request):
+        """API Request senden - asynchron über httpx oder im Worker Pool"""
+        async with self.account.slot():
+            # Resumable Media Uploads laufen immer über googleapiclient
+            if self.transport is not None and request.resumable is None:
+                async with self.executor.admit():
+                    return await self.transport.execute(request)
+            return await self.executor.run(self._execute_sync, request, self.creds)
+
+    def quota_status(self) -> dict:
+        """Diagnose: Quota-Auslastung und Cache des aktuellen Accounts, Circuit Breaker, Worker Pool
+
+        Andere Accounts erscheinen nur als Anzahl - im HTTP Modus darf ein
+        Client nicht sehen, welche Accounts der Server sonst bedient.
+        """
+        name = self.account.name
+        return {
+            'success': True,
+            'quota': [bucket for bucket in self.quota.stats() if bucket['user'] == name],
+            'circuit_breakers': {api: breaker.stats() for api, breaker in self.breakers.items()},
+            'accounts': [entry for entry in self.accounts.stats() if entry['account'] == name],
+            'loaded_accounts': len(self.accounts),
+            'executor': {
+                'max_workers': self.executor.max_workers,
+                'max_queue': self.executor.max_queue,
+                'pending': self.executor.pending,
+            },
+        }
+
+    async def _retry_wait(self, attempt: int, error: BaseException) -> bool:
+        """Backoff vor dem nächsten Versuch - False, wenn nicht mehr gewartet werden soll"""
+        if attempt >= RETRY_ATTEMPTS:
+            return False
+        delay = backoff_delay(attempt, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+        requested = retry_after(error)
+        if requested is not None:
+            if requested > RETRY_MAX_DELAY:
+                return False
+            delay = max(delay, requested)
+        await asyncio.sleep(delay)
+        return True
+
+    async def _send(self, request):
+        """API Request senden - mit Retry/Backoff und Circuit Breaker pro API"""
+        breaker = self._breaker(request)
+        idempotent = is_idempotent(request)
+        attempt = 0
+        while True:
+            # Jeder Versuch kostet Quota - auch eine Wiederholung. Vor before():
+            # ein Abbruch während des Wartens darf keinen Probe-Slot belegen
+            await self.quota.acquire([request.methodId], user=self.account.name)
+            breaker.before()
+            try:
+                result = await self._send_once(request)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                kind = classify(e)
+                breaker.record(kind)
+                if not should_retry(kind, idempotent) or not await self._retry_wait(attempt, e):
+                    raise
+                attempt += 1
+                continue
+            breaker.record(None)
+            return result
+
+    async def _execute(self, request, revalidate: bool = False):
+        """API Request ausführen - lesende Requests über den Response Cache
+
+        Schreibende Requests invalidieren die betroffenen Cache Einträge.
+        revalidate prüft einen gecachten Eintrag immer per ETag (304).
+        """
+        cache = self.response_cache
+        if not cache.cacheable(request):
+            try:
+                return await self._send(request)
+            finally:
+                cache.invalidate_for(request)
+
+        result, etag = cache.lookup(request, revalidate)
+        if result is not None:
+            return result
+        generation = cache.generation
+        if etag:
+            request.headers['If-None-Match'] = etag
+        try:
+            result = await self._send(request)
+        except HttpError as e:
+            if e.resp.status != 304:
+                raise
+            result = cache.cached(request)
+            if result is not None:
+                return result
+            # Eintrag wurde zwischenzeitlich verdrängt - ohne Bedingung neu laden
+            del request.headers['If-None-Match']
+            result = await self._send(request)
+        cache.store(request, result, generation)
+        return result
+
+    def _execute_batch_sync(self, service, requests: list, creds) -> dict:
+        """Requests als ein Batch HTTP Request senden - liefert {request_id: (response, exception)}"""
+        responses = {}
+
+        def callback(request_id, response, exception):
+            responses[request_id] = (response, exception)
+
+        batch = service.new_batch_http_request(callback=callback)
+        for request_id, request in requests:
+            batch.add(request, request_id=request_id)
+        batch.execute(http=self._http(creds))
+        return responses
+
+    async def _execute_batch(self, service, requests: list) -> dict:
+        """Batch Request im Worker Pool ausführen - gecachte Lesezugriffe werden nicht gesendet"""
+        cache = self.response_cache
+        responses = {}
+        pending = []
+        for request_id, request in requests:
+            if cache.cacheable(request):
+                result, _ = cache.lookup(request)
+                if result is not None:
+                    responses[request_id] = (result, None)
+                    continue
+            pending.append((request_id, request))
+        if not pending:
+            return responses
+
+        generation = cache.generation
+        try:
+            sent = await self._send_batch(service, pending)
+        finally:
+            for _, request in pending:
+                cache.invalidate_for(request)
+        for request_id, request in pending:
+            result, exception = sent.get(request_id, (None, None))
+            if exception is None and result is not None and cache.cacheable(request):
+                cache.store(request, result, generation)
+        responses.update(sent)
+        return responses
+
+    async def _send_batch(self, service, requests: list) -> dict:
+        """Batch senden - Requests mit wiederholbaren Fehlern werden erneut gebündelt"""
+        breaker = self._breaker(requests[0][1])
+        responses = {}
+        pending = requests
+        attempt = 0
+        while pending:
+            await self.quota.acquire(
+                [request.methodId for _, request in pending], user=self.account.name)
+            breaker.before()
+            try:
+                async with self.account.slot():
+                    sent = await self.executor.run(
+                        self._execute_batch_sync, service, pending, self.creds)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                # Ganzer Batch fehlgeschlagen - nur wiederholen, wenn das für alle Requests sicher ist
+                kind = classify(e)
+                breaker.record(kind)
+                if (not all(should_retry(kind, is_idempotent(request)) for _, request in pending)
+                        or not await self._retry_wait(attempt, e)):
+                    raise
+                attempt += 1
+                continue
+
+            retry, last_error = [], None
+            for request_id, request in pending:
+                result, exception = sent.get(request_id, (None, None))
+                if exception is not None and should_retry(classify(exception), is_idempotent(request)):
+                    retry.append((request_id, request))
+                    last_error = exception
+                responses[request_id] = (result, exception)
+            breaker.record(classify(last_error) if last_error is not None else None)
+            if retry and not await self._retry_wait(attempt, last_error):
+                break
+            pending = retry
+            attempt += 1
+        return responses
+
+    @property
+    def account(self) -> 'GoogleAccount':
+        """Account des laufenden Tool-Aufrufs (Default: Standard-Account)"""
+        return _current_account.get() or self.accounts.get(DEFAULT_ACCOUNT)
+
+    @property
+    def creds(self):
+        return self.account.creds
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        return self.account.response_cache
+
+    async def ready(self):
+        """Warten bis die Credentials des aktuellen Accounts geladen sind"""
+        await self.account.ready()
+
+    async def service(self, name: str):
+        """Google API Service des aktuellen Accounts"""
+        return await self.account.service(name)
+
+    async def refresh_credentials(self, margin: float = 0, stale_token: Optional[str] = None):
+        """Token des aktuellen Accounts bei Bedarf erneuern"""
+        await self.account.refresh_credentials(margin, stale_token)
+
+    async def run_token_refresher(self):
+        """Hintergrund-Task: Tokens des Standard-Accounts und aller geladenen Accounts vor Ablauf erneuern"""
+        self.accounts.get(DEFAULT_ACCOUNT)
+        await self.accounts.run_token_refreshers()
+
+    @staticmethod
+    def _attachment_path(path: str) -> str:
+        """Pfad eines Anhangs prüfen - nur Dateien in ATTACHMENT_DIRS (HTTP Modus: Pflicht)"""
+        real_path = os.path.realpath(os.path.expanduser(path))
+        if ATTACHMENT_DIRS:
+            allowed = any(os.path.commonpath([real_path, directory]) == directory
+                          for directory in ATTACHMENT_DIRS)
+        else:
+            # Ein entfernter Client soll keine beliebigen Dateien des Servers verschicken
+            allowed = SERVER_TRANSPORT != 'http'
+        if not allowed:
+            raise ValueError(f"Anhang außerhalb der erlaubten Verzeichnisse: {path}")
+        if not os.path.isfile(real_path):
+            raise ValueError(f"Anhang nicht gefunden: {path}")
+        return real_path
+
+    def _attachments(self, items: list) -> list:
+        """Tool-Argument attachments in Attachment Objekte umwandeln"""
+        attachments = []
+        for item in items:
+            path = item.get('path')
+            if path is not None:
+                path = self._attachment_path(path)
+            filename = item.get('filename') or (os.path.basename(path) if path else None)
+            if not filename:
+                raise ValueError("Anhang ohne filename")
+            attachments.append(Attachment(
+                filename, item.get('mime_type'), path=path, data_base64=item.get('content_base64')))
+        return attachments
+
+    @staticmethod
+    def _spool_message(to: str, subject: str, body: str, cc: Optional[str],
+                       attachments: list):
+        """MIME Nachricht mit Anhängen in eine (Temp-)Datei schreiben (blockierend)"""
+        spool = tempfile.SpooledTemporaryFile(max_size=MESSAGE_SPOOL_BYTES)
+        try:
+            write_message(spool, to, subject, body, cc, attachments)
+            if spool.tell() > GMAIL_MAX_MESSAGE_BYTES:
+                raise ValueError(
+                    f"Email zu groß: {spool.tell() // (1024 * 1024)} MB "
+                    f"(Gmail erlaubt {GMAIL_MAX_MESSAGE_BYTES // (1024 * 1024)} MB)")
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+    async def _upload_message(self, to: str, subject: str, body: str, cc: Optional[str],
+                              attachments: list, draft: bool) -> dict:
+        """Email mit Anhängen senden oder als Entwurf speichern
+
+        Kleine Nachrichten gehen als raw Feld, große per Resumable Upload
+        direkt aus der Temp-Datei - ohne base64 Kopie der ganzen Nachricht.
+        """
+        spool = await asyncio.to_thread(
+            self._spool_message, to, subject, body, cc, self._attachments(attachments))
+        try:
+            size = spool.tell()
+            spool.seek(0)
+            media = None
+            if size <= INLINE_MESSAGE_BYTES:
+                message = {'raw': encode_base64url(spool.read())}
+            else:
+                from googleapiclient.http import MediaIoBaseUpload
+
+                message = {}
+                media = MediaIoBaseUpload(
+                    spool, mimetype='message/rfc822', chunksize=UPLOAD_CHUNK_BYTES, resumable=True)
+
+            gmail = await self.service('gmail')
+            if draft:
+                request = gmail.users().drafts().create(
+                    userId='me', body={'message': message}, media_body=media)
+            else:
+                request = gmail.users().messages().send(
+                    userId='me', body=message, media_body=media)
+            return await self._execute(request)
+        finally:
+            spool.close()
+
+    async def send_email(self, to: str, subject: str, body: str, cc: Optional[str] = None,
+                         attachments: Optional[list] = None) -> dict:
+        """Email senden mit HTML-Formatierung und optionalen Anhängen"""
+        if attachments:
+            result = await self._upload_message(to, subject, body, cc, attachments, draft=False)
+        else:
+            raw = raw_message(to, subject, body, cc)
+            message_body = {'raw': raw}
+
+            gmail = await self.service('gmail')
+            result = await self._execute(gmail.users().messages().send(
+                userId='me', body=message_body))
+
+        return {
+            'success': True,
+            'message_id': result['id'],
+            'thread_id': result['threadId']
+        }
+
+    async def create_draft(self, to: str, subject: str, body: str, cc: Optional[str] = None,
+                           attachments: Optional[list] = None) -> dict:
+        """Email als Entwurf speichern mit HTML-Formatierung und optionalen Anhängen"""
+        if attachments:
+            result = await self._upload_message(to, subject, body, cc, attachments, draft=True)
+        else:
+            raw = raw_message(to, subject, body, cc)
+            draft_body = {'message': {'raw': raw}}
+
+            gmail = await self.service('gmail')
+            result = await self._execute(gmail.users().drafts().create(
+                userId='me', body=draft_body))
+
+        return {
+            'success': True,
+            'draft_id': result['id'],
+            'message_id': result['message']['id']
+        }
+
+    async def send_bulk_email(self, messages: list, progress=None) -> dict:
+        """Viele Emails per Gmail Batch Request senden"""
+        return await self._bulk_gmail(messages, draft=False, progress=progress)
+
+    async def create_bulk_drafts(self, messages: list, progress=None) -> dict:
+        """Viele Entwürfe per Gmail Batch Request erstellen"""
+        return await self._bulk_gmail(messages, draft=True, progress=progress)
+
+    async def send_mail_merge(self, recipients: list, subject: str, body: str,
+                              to: str = '{{email}}', html: Optional[str] = None,
+                              cc: Optional[str] = None, draft: bool = False,
+                              progress=None) -> dict:
+        """Serienmail aus Vorlagen - einmal kompiliert, pro Empfänger nur gerendert"""
+        merge = MailMerge(to, subject, body, html, cc)
+        return await self._bulk_gmail(recipients, draft=draft, progress=progress, merge=merge)
+
+    async def _bulk_gmail(self, messages: list, draft: bool, progress=None,
+                          merge: Optional[MailMerge] = None) -> dict:
+        """Emails/Entwürfe in Batches senden, gebremst durch das Gmail Quota
+
+        Mit merge sind messages Empfänger-Datensätze, die Nachrichten
+        entstehen aus den Vorlagen.
+        """
+        cost = METHOD_COSTS['gmail.users.drafts.create' if draft else 'gmail.users.messages.send']
+        gmail = await self.service('gmail')
+        users = gmail.users()
+        total = len(messages)
+        results = [None] * total
+        recipients = [None] * total
+        requests = []
+
+        # Alle MIME Payloads vorab bauen - Fehler betreffen nur den einzelnen Eintrag
+        for index, message in enumerate(messages):
+            try:
+                if merge is not None:
+                    message = merge.render(message)
+                recipients[index] = message['to']
+                raw = raw_message(
+                    message['to'], message['subject'], message['body'], message.get('cc'),
+                    message.get('html'))
+            except (KeyError, TypeError, AttributeError, ValueError) as e:
+                results[index] = {
+                    'index': index,
+                    'to': recipients[index] or (
+                        message.get('to') if isinstance(message, dict) else None),
+                    'success': False,
+                    'error': f"Ungültige Nachricht: {e!r}"
+                }
+                continue
+            if draft:
+                request = users.drafts().create(userId='me', body={'message': {'raw': raw}})
+            else:
+                request = users.messages().send(userId='me', body={'raw': raw})
+            requests.append((str(index), request))
+
+        # Batch-Größe so wählen, dass ein Batch in das Quota pro Sekunde passt
+        capacity = self.quota.bucket('gmail', self.account.name).capacity
+        chunk_size = max(1, min(GMAIL_BATCH_LIMIT, int(capacity // cost)))
+        done = total - len(requests)
+
+        for start in range(0, len(requests), chunk_size):
+            chunk = requests[start:start + chunk_size]
+            try:
+                responses = await self._execute_batch(gmail, chunk)
+            except Exception as e:
+                # Ganzer Batch fehlgeschlagen (z.B. Netzwerkfehler)
+                responses = {request_id: (None, e) for request_id, _ in chunk}
+
+            for request_id, _ in chunk:
+                index = int(request_id)
+                response, exception = responses.get(request_id, (None, None))
+                item = {'index': index, 'to': recipients[index]}
+                if exception is not None:
+                    item.update(success=False, error=str(exception))
+                elif draft:
+                    item.update(success=True, draft_id=response['id'],
+                                message_id=response['message']['id'])
+                else:
+                    item.update(success=True, message_id=response['id'],
+                                thread_id=response['threadId'])
+                results[index] = item
+
+            done += len(chunk)
+            if progress is not None:
+                failed = sum(1 for item in results if item is not None and not item['success'])
+                await progress(done, total, f"{done}/{total} verarbeitet, {failed} fehlgeschlagen")
+
+        failed = sum(1 for item in results if not item['success'])
+        return {
+            'success': failed == 0,
+            'total': total,
+            'succeeded': total - failed,
+            'failed': failed,
+            'results': results
+        }
+
+    async def _get_schedule_store(self) -> ScheduleStore:
+        """Job Store der geplanten Emails öffnen (einmalig, im Worker Thread)"""
+        if self.schedule_store is None:
+            store = await asyncio.to_thread(ScheduleStore)
+            if self.schedule_store is None:
+                self.schedule_store = store
+            else:
+                store.close()
+        return self.schedule_store
+
+    def _wake_scheduler(self):
+        if self._schedule_wakeup is None:
+            self._schedule_wakeup = asyncio.Event()
+        self._schedule_wakeup.set()
+
+    async def schedule_email(self, to: str, subject: str, body: str, send_at: str,
+                             cc: Optional[str] = None, time_zone: Optional[str] = None) -> dict:
+        """Email zum Zeitpunkt send_at senden (ohne Offset: time_zone, sonst Zeitzone des Kalenders)"""
+        tz = get_zone(time_zone) if time_zone else await self._calendar_zone('primary')
+        due = parse_time(send_at, tz)
+        # Header jetzt prüfen, nicht erst beim Versand
+        raw_message(to, subject, body, cc)
+
+        store = await self._get_schedule_store()
+        job_id = uuid.uuid4().hex
+        message = {'to': to, 'subject': subject, 'body': body, 'cc': cc}
+        await asyncio.to_thread(store.add, job_id, self.account.name, due, message)
+        heapq.heappush(self._schedule_heap, (due, job_id))
+        self._wake_scheduler()
+
+        return {
+            'success': True,
+            'job_id': job_id,
+            'send_at': datetime.fromtimestamp(due, tz).isoformat()
+        }
+
+    async def list_scheduled_emails(self, status: Optional[str] = None,
+                                    max_results: int = 100,
+                                    time_zone: Optional[str] = None) -> dict:
+        """Geplante Emails des Accounts mit Status - Zeiten in time_zone bzw. der Zeitzone des Kalenders"""
+        tz = get_zone(time_zone) if time_zone else await self._calendar_zone('primary')
+        store = await self._get_schedule_store()
+        jobs = await asyncio.to_thread(store.list, self.account.name, status, max_results)
+        results = []
+        for job in jobs:
+            item = {
+                'job_id': job['id'],
+                'send_at': datetime.fromtimestamp(job['due'], tz).isoformat(),
+                'status': job['status'],
+                'to': job['message']['to'],
+                'subject': job['message']['subject'],
+            }
+            outcome = job['result'] or {}
+            for key in ('message_id', 'error'):
+                if outcome.get(key):
+                    item[key] = outcome[key]
+            results.append(item)
+        return {'success': True, 'count': len(results), 'jobs': results}
+
+    async def cancel_scheduled_email(self, job_id: str) -> dict:
+        """Geplante Email abbrechen - der Eintrag im Heap wird beim Versand übersprungen"""
+        store = await self._get_schedule_store()
+        if not await asyncio.to_thread(store.cancel, job_id, self.account.name):
+            raise ValueError(f"Keine offene geplante Email: {job_id}")
+        return {'success': True, 'job_id': job_id, 'status': 'cancelled'}
+
+    async def _dispatch_scheduled(self, job_ids: list):
+        """Fällige Jobs beanspruchen und pro Account gebündelt senden"""
+        store = await self._get_schedule_store()
+        jobs = await asyncio.to_thread(store.claim, job_ids)
+        by_account = {}
+        for job in jobs:
+            by_account.setdefault(job['account'], []).append(job)
+
+        for account, group in by_account.items():
+            # Auch ein ungültiger Account muss ein Ergebnis liefern, sonst
+            # blieben die beanspruchten Jobs im Status sending hängen
+            token = None
+            try:
+                token = _current_account.set(self.accounts.get(account))
+                sent = await self._bulk_gmail([job['message'] for job in group], draft=False)
+                outcomes = sent['results']
+            except Exception as e:
+                outcomes = [{'success': False, 'error': str(e)}] * len(group)
+            finally:
+                if token is not None:
+                    _current_account.reset(token)
+            await asyncio.to_thread(
+                store.finish, [(job['id'], outcome) for job, outcome in zip(group, outcomes)])
+
+    async def _recover_scheduled(self):
+        """Jobs, die seit SCHEDULE_CLAIM_TIMEOUT im Versand hängen, als fehlgeschlagen markieren"""
+        # Ohne Job Store gibt es nichts zu prüfen - er entsteht mit dem ersten Job
+        if not os.path.exists(SCHEDULE_STORE_PATH):
+            return
+        store = await self._get_schedule_store()
+        try:
+            await asyncio.to_thread(store.recover, time.time() - SCHEDULE_CLAIM_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️  Prüfung hängender Versände fehlgeschlagen: {e}", file=sys.stderr)
+
+    async def _load_scheduled(self):
+        """Offene Jobs aus dem Job Store in den Heap übernehmen - bekannte Jobs nur einmal"""
+        if not os.path.exists(SCHEDULE_STORE_PATH):
+            return
+        store = await self._get_schedule_store()
+        pending = await asyncio.to_thread(store.pending)
+        known = {job_id for _, job_id in self._schedule_heap}
+        for entry in pending:
+            if entry[1] not in known:
+                heapq.heappush(self._schedule_heap, entry)
+
+    async def run_scheduler(self):
+        """Hintergrund-Task: geplante Emails bei Fälligkeit senden
+
+        Schläft bis zum nächsten fälligen Job oder bis schedule_email einen
+        neuen einplant, höchstens SCHEDULE_CLAIM_TIMEOUT Sekunden - auch bei
+        Tausenden wartenden Jobs. Bei jedem Aufwachen werden hängende
+        Versände als fehlgeschlagen markiert.
+        """
+        if self._schedule_wakeup is None:
+            self._schedule_wakeup = asyncio.Event()
+        await self._recover_scheduled()
+        await self._load_scheduled()
+
+        # Mehrere Worker Prozesse: schedule_email kann in einem anderen Prozess
+        # laufen, dessen Jobs stehen nur im Job Store
+        reload_interval = (SCHEDULE_RELOAD_INTERVAL
+                           if SERVER_TRANSPORT == 'http' and HTTP_WORKERS > 1 else None)
+        reloaded = time.monotonic()
+        heap = self._schedule_heap
+        while True:
+            self._schedule_wakeup.clear()
+            if reload_interval is not None and time.monotonic() - reloaded >= reload_interval:
+                await self._load_scheduled()
+                reloaded = time.monotonic()
+            if not heap or heap[0][0] > time.time():
+                timeout = SCHEDULE_CLAIM_TIMEOUT
+                if heap:
+                    timeout = min(timeout, heap[0][0] - time.time())
+                if reload_interval is not None:
+                    timeout = min(timeout, reloaded + reload_interval - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._schedule_wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                await self._recover_scheduled()
+                continue
+
+            now = time.time()
+            job_ids = []
+            while heap and heap[0][0] <= now and len(job_ids) < SCHEDULE_BATCH_SIZE:
+                job_ids.append(heapq.heappop(heap)[1])
+            try:
+                await self._dispatch_scheduled(job_ids)
+            except Exception as e:
+                print(f"⚠️  Versand geplanter Emails fehlgeschlagen: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _decode_part(data: str) -> str:
+        """base64url-kodierten Body eines Message Parts dekodieren"""
+        return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4)).decode('utf-8', errors='replace')
+
+    @classmethod
+    def _extract_text(cls, payload: dict) -> tuple:
+        """Text-Body (bevorzugt text/plain) und Anhänge aus dem Message Payload holen"""
+        plain, html, attachments = [], [], []
+        stack = [payload]
+        while stack:
+            part = stack.pop()
+            mime_type = part.get('mimeType', '')
+            body = part.get('body', {})
+            if part.get('filename'):
+                attachments.append({
+                    'filename': part['filename'],
+                    'mime_type': mime_type,
+                    'size': body.get('size', 0),
+                    'attachment_id': body.get('attachmentId')
+                })
+            elif mime_type == 'text/plain' and body.get('data'):
+                plain.append(cls._decode_part(body['data']))
+            elif mime_type == 'text/html' and body.get('data'):
+                html.append(cls._decode_part(body['data']))
+            # Reihenfolge der Parts beibehalten
+            stack.extend(reversed(part.get('parts', [])))
+
+        if plain:
+            return '\n'.join(plain), attachments
+        # Fallback: HTML ohne Tags
+        text = re.sub(r'<br\s*/?>', '\n', '\n'.join(html), flags=re.IGNORECASE)
+        text = html_lib.unescape(re.sub(r'<[^>]+>', '', text))
+        return text, attachments
+
+    @classmethod
+    def _summarize_message(cls, message: dict, include_body: bool, max_body_bytes: int) -> dict:
+        """Gmail Message auf die für den Client relevanten Felder reduzieren"""
+        payload = message.get('payload', {})
+        headers = {
+            header['name'].lower(): header['value']
+            for header in payload.get('headers', [])
+        }
+        summary = {
+            'id': message['id'],
+            'thread_id': message.get('threadId'),
+            'from': headers.get('from'),
+            'to': headers.get('to'),
+            'cc': headers.get('cc'),
+            'subject': headers.get('subject'),
+            'date': headers.get('date'),
+            'snippet': html_lib.unescape(message.get('snippet', '')),
+            'labels': message.get('labelIds', []),
+        }
+        summary = {key: value for key, value in summary.items() if value is not None}
+
+        if include_body:
+            body, attachments = cls._extract_text(payload)
+            encoded = body.encode('utf-8')
+            if len(encoded) > max_body_bytes:
+                body = encoded[:max_body_bytes].decode('utf-8', errors='ignore')
+                summary['body_truncated'] = True
+            summary['body'] = body
+            if attachments:
+                summary['attachments'] = attachments
+        return summary
+
+    async def _fetch_messages(self, gmail, message_ids: list, include_body: bool) -> list:
+        """Nachrichten per Batch laden - Metadaten oder volle Bodies"""
+        messages_api = gmail.users().messages()
+        requests = []
+        for message_id in message_ids:
+            if include_body:
+                request = messages_api.get(userId='me', id=message_id, format='full')
+            else:
+                request = messages_api.get(
+                    userId='me', id=message_id, format='metadata',
+                    metadataHeaders=METADATA_HEADERS)
+            requests.append((message_id, request))
+
+        responses = await self._execute_batch(gmail, requests)
+
+        fetched = []
+        for message_id in message_ids:
+            response, exception = responses.get(message_id, (None, None))
+            if exception is not None or response is None:
+                fetched.append({'id': message_id, 'error': str(exception)})
+            else:
+                fetched.append(response)
+        return fetched
+
+    async def _collect_within_budget(
+        self, gmail, message_ids: list, include_body: bool,
+        results: list, used_bytes: int, max_bytes: int
+    ) -> tuple:
+        """Nachrichten chunkweise laden und anhängen, bis das Byte-Budget erreicht ist
+
+        Liefert (used_bytes, Anzahl übernommener IDs). Ist die Anzahl kleiner
+        als len(message_ids), wurde das Budget erreicht.
+        """
+        chunk_size = FULL_FETCH_CHUNK if include_body else METADATA_FETCH_CHUNK
+        max_body_bytes = max_bytes // 4
+
+        for start in range(0, len(message_ids), chunk_size):
+            fetched = await self._fetch_messages(
+                gmail, message_ids[start:start + chunk_size], include_body)
+            for position, message in enumerate(fetched):
+                if 'error' in message:
+                    item = message
+                else:
+                    item = self._summarize_message(message, include_body, max_body_bytes)
+                item_bytes = len(json.dumps(item))
+                # Mindestens ein Ergebnis liefern, danach Budget einhalten
+                if results and used_bytes + item_bytes > max_bytes:
+                    return used_bytes, start + position
+                results.append(item)
+                used_bytes += item_bytes
+        return used_bytes, len(message_ids)
+
+    async def search_emails(
+        self,
+        query: str = '',
+        max_results: int = 20,
+        cursor: Optional[str] = None,
+        include_body: bool = False,
+        max_bytes: int = MAX_RESULT_BYTES,
+        source: str = 'auto'
+    ) -> dict:
+        """Emails suchen (Gmail Suchsyntax) - seitenweise, begrenzt durch ein Byte-Budget"""
+        if source not in ('auto', 'index', 'api'):
+            raise ValueError(f"Unbekannte Quelle: {source} (erlaubt: auto, index, api)")
+
+        # Lokaler Index, falls aktiviert und die Anfrage abbildbar ist
+        if cursor and cursor.startswith('index:'):
+            source = 'index'
+        if source != 'api':
+            result = await self._search_index(
+                query, max_results, cursor, include_body, max_bytes, force=source == 'index')
+            if result is not None:
+                return result
+
+        gmail = await self.service('gmail')
+        messages_api = gmail.users().messages()
+
+        # Cursor = "<pageToken>:<Offset innerhalb der Seite>"
+        page_token, _, offset = (cursor or '').rpartition(':')
+        page_token = page_token or None
+        offset = int(offset or 0)
+
+        results = []
+        used_bytes = 0
+        next_cursor = None
+
+        while len(results) < max_results:
+            remaining = max_results - len(results)
+            page = await self._execute(messages_api.list(
+                userId='me', q=query or None, pageToken=page_token,
+                maxResults=min(500, offset + remaining),
+                fields='messages/id,nextPageToken'))
+            page_ids = [message['id'] for message in page.get('messages', [])]
+            wanted = page_ids[offset:offset + remaining]
+
+            used_bytes, taken = await self._collect_within_budget(
+                gmail, wanted, include_body, results, used_bytes, max_bytes)
+            if taken < len(wanted):
+                next_cursor = f"{page_token or ''}:{offset + taken}"
+                break
+
+            consumed = offset + len(wanted)
+            if consumed < len(page_ids):
+                next_cursor = f"{page_token or ''}:{consumed}"
+                break
+            page_token = page.get('nextPageToken')
+            offset = 0
+            if not page_token:
+                break
+            if len(results) >= max_results:
+                next_cursor = f"{page_token}:0"
+
+        return {
+            'success': True,
+            'source': 'api',
+            'count': len(results),
+            'messages': results,
+            'next_cursor': next_cursor,
+            'truncated': next_cursor is not None
+        }
+
+    async def _search_index(
+        self, query: str, max_results: int, cursor: Optional[str],
+        include_body: bool, max_bytes: int, force: bool
+    ) -> Optional[dict]:
+        """Suche aus dem lokalen Index beantworten - None, wenn das nicht möglich ist
+
+        Im Modus 'auto' werden nur Anfragen ohne Freitext aus dem Index
+        beantwortet: Gmail durchsucht bei Freitext auch die Email Texte,
+        der Index kennt nur Header und Snippet. Hält der Index nur die
+        neuesten MAIL_INDEX_LIMIT Nachrichten, fragt 'auto' Gmail, sobald
+        ältere Nachrichten zum Ergebnis gehören könnten.
+        """
+        if not MAIL_INDEX_ENABLED or self.account.name != DEFAULT_ACCOUNT:
+            if force:
+                raise ValueError("Mail Index ist nicht aktiviert (GOOGLE_MCP_MAIL_INDEX=1, "
+                                 "nur für den Standard-Account)")
+            return None
+
+        index = await self._get_mail_index()
+        if not await asyncio.to_thread(index.get_state, 'history_id'):
+            if force:
+                raise ValueError("Mail Index ist noch nicht synchronisiert")
+            return None
+
+        # after:/before: meinen den Tag in der Zeitzone des Accounts
+        tz = get_zone(DEFAULT_TIME_ZONE)
+        if MAIL_DATE_OPERATOR.search(query or ''):
+            try:
+                tz = await self._calendar_zone('primary')
+            except Exception as e:
+                print(f"⚠️  Zeitzone des Accounts unbekannt, nutze {DEFAULT_TIME_ZONE}: {e}",
+                      file=sys.stderr)
+
+        try:
+            _, _, _, free_text, earliest = translate_query(query, tz)
+        except UnsupportedQuery:
+            if force:
+                raise
+            return None
+        if free_text and not force:
+            return None
+
+        complete = await asyncio.to_thread(index.get_state, 'complete') == '1'
+        if not force and not complete and earliest is not None:
+            oldest = await asyncio.to_thread(index.oldest)
+            if oldest is None or earliest < oldest:
+                return None
+
+        offset = int(cursor.partition(':')[2] or 0) if cursor else 0
+        rows = await asyncio.to_thread(index.search, query, max_results + 1, offset, tz)
+        has_more = len(rows) > max_results
+        if not force and not complete and not has_more:
+            # Kurze Seite - die fehlenden Treffer liegen womöglich vor dem Index
+            return None
+        rows = rows[:max_results]
+
+        results = []
+        used_bytes = 0
+        if include_body:
+            # Bodies sind nicht im Index - von Gmail laden
+            gmail = await self.service('gmail')
+            used_bytes, taken = await self._collect_within_budget(
+                gmail, [row['id'] for row in rows], True, results, used_bytes, max_bytes)
+        else:
+            taken = 0
+            for row in rows:
+                item_bytes = len(json.dumps(row))
+                if results and used_bytes + item_bytes > max_bytes:
+                    break
+                results.append(row)
+                used_bytes += item_bytes
+                taken += 1
+
+        next_cursor = None
+        if taken < len(rows) or has_more:
+            next_cursor = f"index:{offset + taken}"
+        return {
+            'success': True,
+            'source': 'index',
+            'count': len(results),
+            'messages': results,
+            'next_cursor': next_cursor,
+            'truncated': next_cursor is not None
+        }
+
+    async def _get_mail_index(self) -> MailIndex:
+        """Lokalen Mail Index öffnen (einmalig, im Worker Thread)"""
+        if self.mail_index is None:
+            index = await asyncio.to_thread(MailIndex)
+            if self.mail_index is None:
+                self.mail_index = index
+            else:
+                index.close()
+        return self.mail_index
+
+    def _index_entry(self, message: dict) -> dict:
+        """Gmail Message (metadata Format) in einen Index-Eintrag umwandeln"""
+        entry = self._summarize_message(message, False, 0)
+        entry['internal_date'] = int(message.get('internalDate', 0))
+        return entry
 
-        # Services initialisieren
-        self.gmail_service = build('gmail', 'v1', credentials=self.creds)
-        self.calendar_service = build('calendar', 'v3', credentials=self.creds)
+    async def _index_messages(self, gmail, index: MailIndex, message_ids: list) -> int:
+        """Metadaten per Batch laden und in den Index schreiben"""
+        indexed = 0
+        for start in range(0, len(message_ids), METADATA_FETCH_CHUNK):
+            fetched = await self._fetch_messages(
+                gmail, message_ids[start:start + METADATA_FETCH_CHUNK], False)
+            entries = [self._index_entry(message) for message in fetched if 'error' not in message]
+            await asyncio.to_thread(index.upsert, entries)
+            indexed += len(entries)
+        return indexed
+
+    async def _full_mail_sync(self, gmail, index: MailIndex) -> int:
+        """Index neu aufbauen - neueste MAIL_INDEX_LIMIT Nachrichten"""
+        users = gmail.users()
+        # historyId vor dem Listing merken, damit Änderungen währenddessen
+        # beim nächsten inkrementellen Sync ankommen
+        profile = await self._execute(users.getProfile(userId='me'))
+
+        message_ids = []
+        page_token = None
+        while len(message_ids) < MAIL_INDEX_LIMIT:
+            page = await self._execute(users.messages().list(
+                userId='me', pageToken=page_token,
+                maxResults=min(500, MAIL_INDEX_LIMIT - len(message_ids)),
+                fields='messages/id,nextPageToken'))
+            message_ids.extend(message['id'] for message in page.get('messages', []))
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                break
+
+        await asyncio.to_thread(index.clear)
+        indexed = await self._index_messages(gmail, index, message_ids)
+        # Ohne nextPageToken ist das ganze Postfach im Index, sonst fehlen ältere Nachrichten
+        await asyncio.to_thread(index.set_state, 'complete', '0' if page_token else '1')
+        await asyncio.to_thread(index.set_state, 'history_id', str(profile['historyId']))
+        return indexed
+
+    async def _incremental_mail_sync(self, gmail, index: MailIndex, history_id: str) -> int:
+        """Änderungen seit history_id über users.history.list übernehmen"""
+        history_api = gmail.users().history()
+        added, deleted, labels = set(), set(), {}
+        page_token = None
+        latest = history_id
+
+        while True:
+            page = await self._execute(history_api.list(
+                userId='me', startHistoryId=history_id, pageToken=page_token,
+                historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']))
+            for record in page.get('history', []):
+                for change in record.get('messagesAdded', []):
+                    added.add(change['message']['id'])
+                for change in record.get('messagesDeleted', []):
+                    deleted.add(change['message']['id'])
+                for change in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                    message = change['message']
+                    labels[message['id']] = message.get('labelIds', [])
+            latest = page.get('historyId', latest)
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                break
+
+        added -= deleted
+        await self._index_messages(gmail, index, sorted(added))
+        if deleted:
+            await asyncio.to_thread(index.delete, sorted(deleted))
+        for message_id, label_ids in labels.items():
+            if message_id not in added and message_id not in deleted:
+                await asyncio.to_thread(index.set_labels, message_id, label_ids)
+        await asyncio.to_thread(index.set_state, 'history_id', str(latest))
+        return len(added) + len(deleted) + len(labels)
+
+    async def sync_mail_index(self, full: bool = False) -> dict:
+        """Lokalen Mail Index synchronisieren - inkrementell, Full Sync nur wenn nötig"""
+        if not MAIL_INDEX_ENABLED:
+            raise ValueError("Mail Index ist nicht aktiviert (GOOGLE_MCP_MAIL_INDEX=1)")
+        if self.account.name != DEFAULT_ACCOUNT:
+            raise ValueError("Mail Index gibt es nur für den Standard-Account")
+
+        gmail = await self.service('gmail')
+        index = await self._get_mail_index()
+        if self._mail_sync_lock is None:
+            self._mail_sync_lock = asyncio.Lock()
+
+        async with self._mail_sync_lock:
+            history_id = await asyncio.to_thread(index.get_state, 'history_id')
+            mode = 'full' if full or not history_id else 'incremental'
+            if mode == 'incremental':
+                try:
+                    changed = await self._incremental_mail_sync(gmail, index, history_id)
+                except HttpError as e:
+                    # historyId zu alt - Gmail hält die History nur begrenzt vor
+                    if e.resp.status != 404:
+                        raise
+                    mode = 'full'
+            if mode == 'full':
+                changed = await self._full_mail_sync(gmail, index)
+
+            synced_at = datetime.now().astimezone().isoformat(timespec='seconds')
+            await asyncio.to_thread(index.set_state, 'last_sync', synced_at)
+            return {
+                'success': True,
+                'mode': mode,
+                'changed': changed,
+                'indexed': await asyncio.to_thread(index.count),
+                'history_id': await asyncio.to_thread(index.get_state, 'history_id'),
+                'last_sync': synced_at
+            }
+
+    async def _get_calendar_store(self) -> CalendarStore:
+        """Lokalen Calendar Spiegel öffnen (einmalig, im Worker Thread)"""
+        if self.calendar_store is None:
+            store = await asyncio.to_thread(CalendarStore)
+            if self.calendar_store is None:
+                self.calendar_store = store
+            else:
+                store.close()
+        return self.calendar_store
+
+    def _store_key(self, calendar_id: str) -> str:
+        """Schlüssel im Calendar Spiegel - 'primary' usw. gibt es in jedem Account"""
+        account = self.account.name
+        return calendar_id if account == DEFAULT_ACCOUNT else f'{account}/{calendar_id}'
+
+    async def sync_calendar(self, calendar_id: str = 'primary', full: bool = False) -> dict:
+        """Calendar Spiegel synchronisieren - inkrementell per syncToken
+
+        Ohne singleEvents: Serien kommen als Master plus Ausnahmen und werden
+        erst bei der Abfrage lokal expandiert.
+        """
+        calendar = await self.service('calendar')
+        key = self._store_key(calendar_id)
+        store = await self._get_calendar_store()
+        if self._calendar_sync_lock is None:
+            self._calendar_sync_lock = asyncio.Lock()
+
+        async with self._calendar_sync_lock:
+            state = await asyncio.to_thread(store.get_state, key)
+            sync_token = None if full or not state else state['sync_token']
+            # Eigene Schreibzugriffe, die während des Syncs passieren, bleiben markiert
+            self.account.calendar_stale.discard(calendar_id)
+
+            events = []
+            page_token = None
+            while True:
+                try:
+                    page = await self._execute(calendar.events().list(
+                        calendarId=calendar_id, maxResults=2500,
+                        syncToken=sync_token, pageToken=page_token))
+                except HttpError as e:
+                    # syncToken abgelaufen - Full Sync
+                    if e.resp.status == 410 and sync_token is not None:
+                        sync_token, page_token, events = None, None, []
+                        continue
+                    self.account.calendar_stale.add(calendar_id)
+                    raise
+                events.extend(page.get('items', []))
+                page_token = page.get('nextPageToken')
+                if not page_token:
+                    break
+
+            synced_at = time.time()
+            await asyncio.to_thread(
+                store.apply, key, events, page.get('timeZone'),
+                page['nextSyncToken'], synced_at, sync_token is None)
+
+            return {
+                'success': True,
+                'calendar_id': calendar_id,
+                'mode': 'full' if sync_token is None else 'incremental',
+                'changed': len(events),
+                'events': await asyncio.to_thread(store.count, key)
+            }
+
+    async def _synced_calendar(self, calendar_id: str) -> tuple:
+        """Store und Zeitzone liefern - vorher nachsynchronisieren, falls veraltet"""
+        store = await self._get_calendar_store()
+        state = await asyncio.to_thread(store.get_state, self._store_key(calendar_id))
+        if (state is None or calendar_id in self.account.calendar_stale
+                or time.time() - state['synced_at'] > CALENDAR_SYNC_INTERVAL):
+            await self.sync_calendar(calendar_id)
+            state = await asyncio.to_thread(store.get_state, self._store_key(calendar_id))
+        return store, get_zone(state['time_zone'] or DEFAULT_TIME_ZONE)
+
+    async def _calendar_zone(self, calendar_id: str) -> ZoneInfo:
+        """Standard-Zeitzone eines Kalenders - einmal per calendars.get geladen, dann gecacht
+
+        Gleichzeitige Aufrufe (z.B. ein Batch) warten auf dieselbe Anfrage.
+        """
+        calendar = await self.service('calendar')
+        zones = self.account.calendar_zones
+        task = zones.get(calendar_id)
+        if task is None:
+            task = zones[calendar_id] = asyncio.ensure_future(self._execute(
+                calendar.calendars().get(calendarId=calendar_id, fields='timeZone')))
+        try:
+            result = await asyncio.shield(task)
+        except Exception:
+            # Fehler nicht cachen
+            if zones.get(calendar_id) is task:
+                del zones[calendar_id]
+            raise
+        return get_zone(result.get('timeZone') or DEFAULT_TIME_ZONE)
+
+    async def _calendar_hits(self, store: CalendarStore, calendar_id: str,
+                             start: float, end: float, tz: ZoneInfo) -> list:
+        """Events im Zeitraum aus dem Spiegel - Serien mit lokal nicht
+        expandierbaren Regeln per events.instances ergänzt"""
+        key = self._store_key(calendar_id)
+        hits = await asyncio.to_thread(store.overlapping, key, start, end)
+        masters = await asyncio.to_thread(store.unexpanded, key)
+        if not masters:
+            return hits
+
+        # Geänderte Instanzen liegen schon als Ausnahme im Spiegel
+        known = {event['id'] for _, _, event in hits}
+        events = (await self.service('calendar')).events()
+        for master in masters:
+            page_token = None
+            while True:
+                page = await self._execute(events.instances(
+                    calendarId=calendar_id, eventId=master['id'],
+                    timeMin=datetime.fromtimestamp(start, tz).isoformat(),
+                    timeMax=datetime.fromtimestamp(end, tz).isoformat(),
+                    maxResults=2500, pageToken=page_token))
+                for instance in page.get('items', []):
+                    if instance['id'] not in known and instance.get('status') != 'cancelled':
+                        instance_start, instance_end = event_bounds(instance, tz)
+                        hits.append((instance_start, instance_end, instance))
+                page_token = page.get('nextPageToken')
+                if not page_token:
+                    break
+        hits.sort(key=lambda item: item[0])
+        return hits
+
+    @staticmethod
+    def _event_summary(event: dict) -> dict:
+        """Calendar Event auf die für den Client relevanten Felder reduzieren"""
+        summary = {
+            'event_id': event['id'],
+            'summary': event.get('summary'),
+            'start': event['start'].get('dateTime', event['start'].get('date')),
+            'end': event['end'].get('dateTime', event['end'].get('date')),
+            'all_day': 'date' in event['start'],
+            'location': event.get('location'),
+            'status': event.get('status'),
+            'attendees': [attendee['email'] for attendee in event.get('attendees', [])
+                          if 'email' in attendee] or None,
+            'recurring_event_id': event.get('recurringEventId'),
+            'html_link': event.get('htmlLink'),
+        }
+        return {key: value for key, value in summary.items() if value is not None}
+
+    @staticmethod
+    def _blocks_time(event: dict) -> bool:
+        """True, wenn das Event als belegt zählt (nicht 'frei', nicht abgesagt)"""
+        if event.get('transparency') == 'transparent':
+            return False
+        for attendee in event.get('attendees', []):
+            if attendee.get('self') and attendee.get('responseStatus') == 'declined':
+                return False
+        return True
+
+    async def list_calendar_events(
+        self,
+        time_min: str,
+        time_max: str,
+        calendar_id: str = 'primary',
+        max_results: int = 250,
+        recurring_event_id: Optional[str] = None
+    ) -> dict:
+        """Events im Zeitraum aus dem lokalen Spiegel lesen - Serien als Instanzen"""
+        store, tz = await self._synced_calendar(calendar_id)
+        start, end = parse_time(time_min, tz), parse_time(time_max, tz)
+        hits = await self._calendar_hits(store, calendar_id, start, end, tz)
+        if recurring_event_id:
+            hits = [hit for hit in hits if hit[2].get('recurringEventId') == recurring_event_id]
+
+        return {
+            'success': True,
+            'time_zone': tz.key,
+            'count': min(len(hits), max_results),
+            'events': [self._event_summary(event) for _, _, event in hits[:max_results]],
+            'truncated': len(hits) > max_results
+        }
+
+    async def find_free_slots(
+        self,
+        time_min: str,
+        time_max: str,
+        duration_minutes: int = 30,
+        calendar_id: str = 'primary',
+        working_hours_start: str = '09:00',
+        working_hours_end: str = '18:00',
+        include_weekends: bool = False,
+        max_results: int = 10
+    ) -> dict:
+        """Freie Zeitfenster innerhalb der Arbeitszeit aus dem lokalen Spiegel berechnen"""
+        store, tz = await self._synced_calendar(calendar_id)
+        start, end = parse_time(time_min, tz), parse_time(time_max, tz)
+        hits = await self._calendar_hits(store, calendar_id, start, end, tz)
+        busy = merge_intervals(
+            (event_start, event_end) for event_start, event_end, event in hits
+            if self._blocks_time(event))
+
+        duration = duration_minutes * 60
+        day_start = datetime.strptime(working_hours_start, '%H:%M').time()
+        day_end = datetime.strptime(working_hours_end, '%H:%M').time()
+        slots = []
+        for window_start, window_end in working_windows(
+                start, end, tz, day_start, day_end, include_weekends):
+            for free_start, free_end in free_intervals(busy, window_start, window_end):
+                if free_end - free_start >= duration:
+                    slots.append({
+                        'start_time': datetime.fromtimestamp(free_start, tz).isoformat(),
+                        'end_time': datetime.fromtimestamp(free_end, tz).isoformat(),
+                        'free_minutes': int((free_end - free_start) // 60)
+                    })
+            if len(slots) >= max_results:
+                break
+
+        return {
+            'success': True,
+            'time_zone': tz.key,
+            'slots': slots[:max_results]
+        }
+
+    async def run_mail_sync(self):
+        """Hintergrund-Task: Mail Index alle MAIL_SYNC_INTERVAL Sekunden synchronisieren"""
+        if not MAIL_INDEX_ENABLED:
+            return
+        while True:
+            try:
+                await self.sync_mail_index()
+            except Exception as e:
+                print(f"⚠️  Mail Index Sync fehlgeschlagen: {e}", file=sys.stderr)
+            await asyncio.sleep(MAIL_SYNC_INTERVAL)
+
+    async def get_email(
+        self,
+        message_id: str,
+        include_body: bool = True,
+        max_bytes: int = MAX_RESULT_BYTES
+    ) -> dict:
+        """Einzelne Email laden - Body auf max_bytes begrenzt"""
+        gmail = await self.service('gmail')
+        messages_api = gmail.users().messages()
+        if include_body:
+            request = messages_api.get(userId='me', id=message_id, format='full')
+        else:
+            request = messages_api.get(
+                userId='me', id=message_id, format='metadata', metadataHeaders=METADATA_HEADERS)
+
+        message = await self._execute(request)
+        return {
+            'success': True,
+            'message': self._summarize_message(message, include_body, max_bytes)
+        }
+
+    async def get_thread(
+        self,
+        thread_id: str,
+        include_body: bool = False,
+        max_bytes: int = MAX_RESULT_BYTES
+    ) -> dict:
+        """Email Thread laden - Nachrichten bis zum Byte-Budget"""
+        gmail = await self.service('gmail')
+        threads_api = gmail.users().threads()
+        if include_body:
+            request = threads_api.get(userId='me', id=thread_id, format='full')
+        else:
+            request = threads_api.get(
+                userId='me', id=thread_id, format='metadata', metadataHeaders=METADATA_HEADERS)
+
+        thread = await self._execute(request)
+
+        messages = thread.get('messages', [])
+        results = []
+        used_bytes = 0
+        max_body_bytes = max_bytes // 4
+        for message in messages:
+            item = self._summarize_message(message, include_body, max_body_bytes)
+            item_bytes = len(json.dumps(item))
+            if results and used_bytes + item_bytes > max_bytes:
+                break
+            results.append(item)
+            used_bytes += item_bytes
+
+        return {
+            'success': True,
+            'thread_id': thread['id'],
+            'message_count': len(messages),
+            'messages': results,
+            'truncated': len(results) < len(messages)
+        }
+
+    def _calendar_changed(self, calendar_id: str, attendees: Optional[list] = None):
+        """Nach eigenen Schreibzugriffen Spiegel und Free/Busy Cache als veraltet markieren"""
+        self.account.calendar_stale.add(calendar_id)
+        for key in [calendar_id] + list(attendees or []):
+            self.account.freebusy_cache.pop(key, None)
+
+    async def _freebusy(self, calendar_ids: list, start: float, end: float, tz: ZoneInfo) -> tuple:
+        """Busy-Intervalle pro Kalender - aus dem Cache oder per freebusy.query
+
+        Abgefragt werden ganze Tage in tz, damit mehrere Terminierungen am
+        selben Tag kurz hintereinander aus dem Cache bedient werden.
+        Liefert (busy pro Kalender, Fehler pro Kalender).
+        """
+        now = time.time()
+        busy, errors, missing = {}, {}, []
+        for calendar_id in dict.fromkeys(calendar_ids):
+            cached = self.account.freebusy_cache.get(calendar_id)
+            if (cached and now - cached[0] < FREEBUSY_CACHE_TTL
+                    and cached[1] <= start and cached[2] >= end):
+                if cached[4]:
+                    errors[calendar_id] = cached[4]
+                else:
+                    busy[calendar_id] = cached[3]
+            else:
+                missing.append(calendar_id)
+        if not missing:
+            return busy, errors
+
+        first_day = datetime.fromtimestamp(start, tz).date()
+        last_day = datetime.fromtimestamp(end, tz).date() + timedelta(days=1)
+        window_start = datetime.combine(first_day, dt_time(), tzinfo=tz)
+        window_end = datetime.combine(last_day, dt_time(), tzinfo=tz)
+
+        # Aufteilen nach Kalendern und Zeitraum, alle Teilabfragen parallel
+        ranges = []
+        range_start = window_start
+        while range_start < window_end:
+            range_end = min(range_start + timedelta(days=FREEBUSY_RANGE_DAYS), window_end)
+            ranges.append((range_start, range_end))
+            range_start = range_end
+        chunks = [
+            missing[offset:offset + FREEBUSY_CALENDAR_LIMIT]
+            for offset in range(0, len(missing), FREEBUSY_CALENDAR_LIMIT)
+        ]
+        calendar = await self.service('calendar')
+        responses = await asyncio.gather(*(
+            self._execute(calendar.freebusy().query(body={
+                'timeMin': range_start.isoformat(),
+                'timeMax': range_end.isoformat(),
+                'items': [{'id': calendar_id} for calendar_id in chunk]
+            }))
+            for chunk in chunks for range_start, range_end in ranges
+        ))
+
+        # Abgelaufene Einträge bei der Gelegenheit entfernen
+        for key in [key for key, cached in self.account.freebusy_cache.items()
+                    if now - cached[0] >= FREEBUSY_CACHE_TTL]:
+            del self.account.freebusy_cache[key]
+
+        fetched, failed = {}, {}
+        for response in responses:
+            for calendar_id, entry in response.get('calendars', {}).items():
+                if entry.get('errors'):
+                    failed[calendar_id] = entry['errors'][0].get('reason', 'unknown')
+                fetched.setdefault(calendar_id, []).extend(
+                    (parse_time(interval['start'], tz), parse_time(interval['end'], tz))
+                    for interval in entry.get('busy', []))
+        for calendar_id, intervals in fetched.items():
+            intervals = merge_intervals(intervals)
+            error = failed.get(calendar_id)
+            if error:
+                errors[calendar_id] = error
+            else:
+                busy[calendar_id] = intervals
+            self.account.freebusy_cache[calendar_id] = (
+                now, window_start.timestamp(), window_end.timestamp(), intervals, error)
+        return busy, errors
+
+    async def _check_conflicts(
+        self,
+        calendar_id: str,
+        attendees: Optional[list],
+        start_time: str,
+        end_time: str,
+        propose_count: int = 0,
+        tz: Optional[ZoneInfo] = None
+    ) -> dict:
+        """Konflikte des Kalenders und aller Teilnehmer im Zeitraum finden, optional Alternativen
 
-    def send_email(self, to: str, subject: str, body: str, cc: Optional[str] = None) -> dict:
-        """Email senden mit HTML-Formatierung"""
-        # Multipart Message für HTML + Plain Text
-        message = MIMEMultipart('alternative')
-        message['to'] = to
-        message['subject'] = subject
-        if cc:
-            message['cc'] = cc
+        tz: Zeitzone für Zeitpunkte ohne Offset und für die Antwort
+        """
+        tz = tz or await self._calendar_zone(calendar_id)
+        start, end = parse_time(start_time, tz), parse_time(end_time, tz)
+        horizon = start + PROPOSE_HORIZON_DAYS * 86400 if propose_count else end
+        busy, errors = await self._freebusy(
+            [calendar_id] + list(attendees or []), start, horizon, tz)
 
-        # Plain text version (Fallback)
-        plain_part = MIMEText(body, 'plain')
-        message.attach(plain_part)
+        def iso(timestamp):
+            return datetime.fromtimestamp(timestamp, tz).isoformat()
 
-        # HTML version (mit Zeilenumbrüchen konvertiert)
-        html_body = body.replace('\n', '<br>\n')
-        html_part = MIMEText(html_body, 'html')
-        message.attach(html_part)
+        conflicts = []
+        for owner, intervals in busy.items():
+            overlapping = [(s, e) for s, e in intervals if s < end and e > start]
+            if overlapping:
+                conflicts.append({
+                    'calendar': owner,
+                    'busy': [{'start': iso(s), 'end': iso(e)} for s, e in overlapping]
+                })
+        result = {'conflicts': conflicts}
+        if errors:
+            # Kalender ohne Free/Busy Freigabe können nicht geprüft werden
+            result['unchecked'] = errors
 
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        message_body = {'raw': raw}
+        if propose_count and conflicts and end > start:
+            # Sweep Line über alle Busy-Intervalle, dann freie Slots gleicher Dauer
+            merged = merge_intervals(
+                interval for intervals in busy.values() for interval in intervals)
+            proposals = islice(free_slots(
+                merged, start, horizon, tz, end - start, end - start,
+                WORKING_DAY_START, WORKING_DAY_END), propose_count)
+            result['proposed_slots'] = [
+                {'start_time': iso(s), 'end_time': iso(e)} for s, e in proposals
+            ]
+        return result
 
-        result = self.gmail_service.users().messages().send(
-            userId='me', body=message_body).execute()
+    async def suggest_meeting_times(
+        self,
+        attendees: list,
+        duration_minutes: int = 30,
+        time_min: Optional[str] = None,
+        time_max: Optional[str] = None,
+        optional_attendees: Optional[list] = None,
+        calendar_id: str = 'primary',
+        working_hours_start: str = '09:00',
+        working_hours_end: str = '18:00',
+        include_weekends: bool = False,
+        step_minutes: int = 30,
+        max_per_day: int = 2,
+        max_results: int = 10
+    ) -> dict:
+        """Gemeinsame freie Termine für viele Teilnehmer finden und ranken
 
-        return {
-            'success': True,
-            'message_id': result['id'],
-            'thread_id': result['threadId']
-        }
+        Pflicht-Teilnehmer (inkl. eigenem Kalender) müssen frei sein; Slots
+        werden nach Anzahl freier optionaler Teilnehmer, dann nach Datum
+        sortiert. max_per_day verteilt die Vorschläge über mehrere Tage.
+        Zeiten ohne Offset gelten in der Zeitzone des eigenen Kalenders.
+        """
+        if duration_minutes < 1 or step_minutes < 1:
+            raise ValueError("duration_minutes und step_minutes müssen mindestens 1 sein")
+        tz = await self._calendar_zone(calendar_id)
+        start = parse_time(time_min, tz) if time_min else time.time()
+        end = parse_time(time_max, tz) if time_max else start + 14 * 86400
+        if end <= start:
+            raise ValueError("time_max muss nach time_min liegen")
+        if end - start > MEETING_HORIZON_DAYS * 86400:
+            raise ValueError(f"Zeitraum darf höchstens {MEETING_HORIZON_DAYS} Tage umfassen")
 
-    def create_draft(self, to: str, subject: str, body: str, cc: Optional[str] = None) -> dict:
-        """Email als Entwurf speichern mit HTML-Formatierung"""
-        # Multipart Message für HTML + Plain Text
-        message = MIMEMultipart('alternative')
-        message['to'] = to
-        message['subject'] = subject
-        if cc:
-            message['cc'] = cc
+        required = list(dict.fromkeys([calendar_id] + list(attendees)))
+        optional = [email for email in dict.fromkeys(optional_attendees or [])
+                    if email not in required]
+        busy, errors = await self._freebusy(required + optional, start, end, tz)
 
-        # Plain text version (Fallback)
-        plain_part = MIMEText(body, 'plain')
-        message.attach(plain_part)
+        # Ohne Free/Busy Daten lässt sich für Pflicht-Teilnehmer nichts garantieren -
+        # die Slots gelten dann nur als ungeprüft
+        unchecked_required = [owner for owner in required if owner in errors]
+        blocked = merge_intervals(
+            interval for owner in required for interval in busy.get(owner, []))
+        optional_busy = {
+            email: (busy[email], [s for s, _ in busy[email]])
+            for email in optional if email in busy
+        }
 
-        # HTML version (mit Zeilenumbrüchen konvertiert)
-        html_body = body.replace('\n', '<br>\n')
-        html_part = MIMEText(html_body, 'html')
-        message.attach(html_part)
+        def unavailable(slot_start, slot_end):
+            absent = []
+            for email, (intervals, starts) in optional_busy.items():
+                position = bisect_left(starts, slot_end)
+                if position and intervals[position - 1][1] > slot_start:
+                    absent.append(email)
+            return absent
 
-        raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        draft_body = {'message': {'raw': raw}}
+        day_start = datetime.strptime(working_hours_start, '%H:%M').time()
+        day_end = datetime.strptime(working_hours_end, '%H:%M').time()
+        candidates = []
+        for slot_start, slot_end in free_slots(
+                blocked, start, end, tz, duration_minutes * 60, step_minutes * 60,
+                day_start, day_end, include_weekends):
+            candidates.append((len(unavailable(slot_start, slot_end)), slot_start, slot_end))
+        candidates.sort()
 
-        result = self.gmail_service.users().drafts().create(
-            userId='me', body=draft_body).execute()
+        slots, per_day = [], {}
+        for absent_count, slot_start, slot_end in candidates:
+            day = datetime.fromtimestamp(slot_start, tz).date()
+            if per_day.get(day, 0) >= max_per_day:
+                continue
+            per_day[day] = per_day.get(day, 0) + 1
+            slot = {
+                'start_time': datetime.fromtimestamp(slot_start, tz).isoformat(),
+                'end_time': datetime.fromtimestamp(slot_end, tz).isoformat(),
+            }
+            if unchecked_required:
+                slot['verified'] = False
+            if optional:
+                slot['optional_available'] = len(optional) - absent_count
+                if absent_count:
+                    slot['optional_unavailable'] = unavailable(slot_start, slot_end)
+            slots.append(slot)
+            if len(slots) >= max_results:
+                break
 
-        return {
+        result = {
             'success': True,
-            'draft_id': result['id'],
-            'message_id': result['message']['id']
+            'time_zone': tz.key,
+            'attendees': [email for email in required + optional if email != calendar_id],
+            'candidates_checked': len(candidates),
+            'slots': slots
         }
+        if errors:
+            result['unchecked'] = errors
+        if unchecked_required:
+            result['unchecked_required'] = unchecked_required
+        return result
 
-    def create_calendar_event(
-        self,
-        summary: str,
-        start_time: str,
-        end_time: str,
+    @staticmethod
+    def _build_event(
+        summary: Optional[str] = None,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
         description: Optional[str] = None,
         location: Optional[str] = None,
         attendees: Optional[list] = None,
-        calendar_id: str = 'primary'
+        recurrence: Optional[list] = None,
+        tz: Optional[ZoneInfo] = None
     ) -> dict:
-        """Calendar Event erstellen"""
-        event = {
-            'summary': summary,
-            'start': {
-                'dateTime': start_time,
-                'timeZone': 'Europe/Berlin',
-            },
-            'end': {
-                'dateTime': end_time,
-                'timeZone': 'Europe/Berlin',
-            },
-        }
+        """Event Body aus den Tool-Argumenten bauen - nur gesetzte Felder
 
+        Start und Ende werden in tz normalisiert: ohne Offset gelten sie als
+        Ortszeit in tz, mit Offset wird nach tz umgerechnet.
+        """
+        event = {}
+        if summary:
+            event['summary'] = summary
+        times = {}
+        for key, value in (('start', start_time), ('end', end_time)):
+            if value:
+                times[key] = localize(value, tz)
+                event[key] = {
+                    'dateTime': times[key].isoformat(),
+                    'timeZone': tz.key,
+                }
+        if len(times) == 2 and times['end'] <= times['start']:
+            raise ValueError(f"Ende ({end_time}) muss nach dem Start ({start_time}) liegen")
         if description:
             event['description'] = description
         if location:
             event['location'] = location
         if attendees:
             event['attendees'] = [{'email': email} for email in attendees]
+        if recurrence:
+            for line in recurrence:
+                if not RECURRENCE_LINE.match(line):
+                    raise ValueError(
+                        f"Ungültige recurrence Zeile: {line!r} (erwartet RRULE:, EXRULE:, RDATE oder EXDATE)")
+            event['recurrence'] = list(recurrence)
+        return event
+
+    async def create_calendar_event(
+        self,
+        summary: str,
+        start_time: str,
+        end_time: str,
+        description: Optional[str] = None,
+        location: Optional[str] = None,
+        attendees: Optional[list] = None,
+        calendar_id: str = 'primary',
+        check_conflicts: str = 'off',
+        propose_count: int = 3,
+        recurrence: Optional[list] = None,
+        time_zone: Optional[str] = None
+    ) -> dict:
+        """Calendar Event erstellen - optional mit Free/Busy Konfliktprüfung
 
-        result = self.calendar_service.events().insert(
-            calendarId=calendar_id, body=event).execute()
+        check_conflicts: 'off', 'reject' (nicht anlegen), 'warn' (trotzdem
+        anlegen) oder 'propose' (nicht anlegen, freie Alternativen liefern).
+        Bei Serien (recurrence) wird nur die erste Instanz geprüft.
+        time_zone: IANA Zeitzone - default: Zeitzone des Kalenders.
+        """
+        if check_conflicts not in ('off', 'reject', 'warn', 'propose'):
+            raise ValueError(
+                f"Unbekannter Modus: {check_conflicts} (erlaubt: off, reject, warn, propose)")
 
-        return {
+        tz = get_zone(time_zone) if time_zone else await self._calendar_zone(calendar_id)
+        event = self._build_event(
+            summary=summary,
+            start_time=start_time,
+            end_time=end_time,
+            description=description,
+            location=location,
+            attendees=attendees,
+            recurrence=recurrence,
+            tz=tz
+        )
+
+        check = None
+        if check_conflicts != 'off':
+            check = await self._check_conflicts(
+                calendar_id, attendees, event['start']['dateTime'], event['end']['dateTime'],
+                propose_count if check_conflicts == 'propose' else 0, tz)
+            if check['conflicts'] and check_conflicts in ('reject', 'propose'):
+                return {
+                    'success': False,
+                    'created': False,
+                    'error': 'Terminkonflikt - Event wurde nicht erstellt',
+                    **check
+                }
+
+        # Eigene ID macht den Insert wiederholbar (Duplikat -> 409)
+        event['id'] = uuid.uuid4().hex
+
+        events = (await self.service('calendar')).events()
+        try:
+            result = await self._execute(events.insert(calendarId=calendar_id, body=event))
+        except HttpError as e:
+            if e.resp.status != 409:
+                raise
+            # Ein vorheriger Versuch war erfolgreich, nur die Antwort ging verloren
+            result = await self._execute(events.get(
+                calendarId=calendar_id, eventId=event['id'], fields='id,htmlLink'))
+        self._calendar_changed(calendar_id, attendees)
+
+        response = {
             'success': True,
             'event_id': result['id'],
-            'html_link': result['htmlLink']
+            'html_link': result['htmlLink'],
+            'start': event['start']['dateTime'],
+            'end': event['end']['dateTime'],
+            'time_zone': tz.key
         }
+        if check is not None:
+            response.update(check)
+        return response
 
-    def update_calendar_event(
+    async def update_calendar_event(
         self,
         event_id: str,
         calendar_id: str = 'primary',
         summary: Optional[str] = None,
         start_time: Optional[str] = None,
         end_time: Optional[str] = None,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        location: Optional[str] = None,
+        attendees: Optional[list] = None,
+        merge_attendees: bool = False,
+        etag: Optional[str] = None,
+        recurrence: Optional[list] = None,
+        time_zone: Optional[str] = None
     ) -> dict:
-        """Calendar Event aktualisieren"""
-        # Event laden
-        event = self.calendar_service.events().get(
-            calendarId=calendar_id, eventId=event_id).execute()
+        """Calendar Event aktualisieren - PATCH mit nur den geänderten Feldern
 
-        # Felder aktualisieren
-        if summary:
-            event['summary'] = summary
-        if start_time:
-            event['start']['dateTime'] = start_time
-        if end_time:
-            event['end']['dateTime'] = end_time
-        if description:
-            event['description'] = description
+        Eine Serie wird über die ID des Masters geändert (recurrence ersetzt
+        die Regeln), eine einzelne Instanz über deren ID. Neue Zeiten ohne
+        Offset gelten in time_zone, sonst in der Zeitzone des Events (nur
+        eine Zeit geändert, wird gegen die andere geprüft) bzw. des Kalenders
+        (Start und Ende geändert). If-Match nur mit übergebenem etag.
+        """
+        events = (await self.service('calendar')).events()
+
+        # Nur lesen, wenn es nötig ist: Teilnehmer zusammenführen oder eine
+        # einzelne neue Zeit gegen die bestehende prüfen - sonst ein PATCH
+        one_bound = bool(start_time) != bool(end_time)
+        current = None
+        if (merge_attendees and attendees) or one_bound:
+            current = await self._execute(events.get(
+                calendarId=calendar_id, eventId=event_id, fields='etag,attendees,start,end'),
+                revalidate=True)
+            if etag and current['etag'] != etag:
+                raise ValueError(f"Event {event_id} wurde zwischenzeitlich geändert (ETag veraltet)")
+
+        tz = None
+        if start_time or end_time:
+            if not time_zone and current is not None:
+                time_zone = current['start'].get('timeZone') or current['end'].get('timeZone')
+            tz = get_zone(time_zone) if time_zone else await self._calendar_zone(calendar_id)
+
+        patch = self._build_event(
+            summary=summary,
+            start_time=start_time,
+            end_time=end_time,
+            description=description,
+            location=location,
+            attendees=attendees,
+            recurrence=recurrence,
+            tz=tz
+        )
+        if not patch:
+            raise ValueError("Keine Felder zum Aktualisieren angegeben")
+
+        if one_bound:
+            bounds = {'start': patch.get('start', current['start']),
+                      'end': patch.get('end', current['end'])}
+            if ('date' in bounds['start']) != ('date' in bounds['end']):
+                raise ValueError(
+                    "Ganztägiges Event: start_time und end_time gemeinsam angeben")
+            event_start, event_end = event_bounds(bounds, tz)
+            if event_end <= event_start:
+                raise ValueError(
+                    f"Ende ({bounds['end'].get('dateTime')}) muss nach dem Start "
+                    f"({bounds['start'].get('dateTime')}) liegen")
+
+        if merge_attendees and attendees:
+            patch['attendees'] = self._merge_attendees(current.get('attendees', []), attendees)
 
-        result = self.calendar_service.events().update(
-            calendarId=calendar_id, eventId=event_id, body=event).execute()
+        request = events.patch(
+            calendarId=calendar_id, eventId=event_id, body=patch,
+            fields='id,etag,updated')
+        if etag:
+            request.headers['If-Match'] = etag
+
+        try:
+            result = await self._execute(request)
+            self._calendar_changed(calendar_id, attendees)
+        except HttpError as e:
+            if e.resp.status == 412:
+                raise ValueError(
+                    f"Event {event_id} wurde zwischenzeitlich geändert (ETag veraltet)") from e
+            raise
 
         return {
             'success': True,
             'event_id': result['id'],
-            'updated': result['updated']
+            'updated': result['updated'],
+            'etag': result['etag']
         }
 
-    def delete_calendar_event(self, event_id: str, calendar_id: str = 'primary') -> dict:
+    @staticmethod
+    def _merge_attendees(current: list, emails: list) -> list:
+        """Neue Teilnehmer anhängen, bestehende (inkl. Antwortstatus) behalten"""
+        known = {attendee.get('email', '').lower() for attendee in current}
+        merged = list(current)
+        for email in emails:
+            if email.lower() not in known:
+                merged.append({'email': email})
+                known.add(email.lower())
+        return merged
+
+    async def delete_calendar_event(self, event_id: str, calendar_id: str = 'primary') -> dict:
         """Calendar Event löschen"""
-        self.calendar_service.events().delete(
-            calendarId=calendar_id, eventId=event_id).execute()
+        calendar = await self.service('calendar')
+        await self._execute(calendar.events().delete(
+            calendarId=calendar_id, eventId=event_id))
+        self._calendar_changed(calendar_id)
 
         return {
             'success': True,
             'message': f'Event {event_id} gelöscht'
         }
 
+    def _calendar_operation_request(self, events, operation: dict, calendar_id: str,
+                                    zones: dict):
+        """Einzelne Batch-Operation in einen Calendar API Request übersetzen
+
+        zones: vorab geladene Standard-Zeitzonen der Kalender (oder deren Fehler)
+        """
+        action = operation.get('action')
+        calendar_id = operation.get('calendar_id', calendar_id)
+        tz = None
+        if operation.get('start_time') or operation.get('end_time'):
+            time_zone = operation.get('time_zone')
+            tz = get_zone(time_zone) if time_zone else zones[calendar_id]
+            if isinstance(tz, Exception):
+                raise ValueError(f"Zeitzone des Kalenders {calendar_id} unbekannt: {tz}")
+
+        if action == 'insert':
+            for field in ('summary', 'start_time', 'end_time'):
+                if not operation.get(field):
+                    raise ValueError(f"Feld '{field}' fehlt für insert")
+            event = self._build_event(
+                summary=operation['summary'],
+                start_time=operation['start_time'],
+                end_time=operation['end_time'],
+                description=operation.get('description'),
+                location=operation.get('location'),
+                attendees=operation.get('attendees'),
+                recurrence=operation.get('recurrence'),
+                tz=tz
+            )
+            event['id'] = uuid.uuid4().hex
+            return events.insert(calendarId=calendar_id, body=event)
+
+        if action not in ('patch', 'delete'):
+            raise ValueError(f"Unbekannte Aktion: {action} (erlaubt: insert, patch, delete)")
+        if not operation.get('event_id'):
+            raise ValueError(f"Feld 'event_id' fehlt für {action}")
+
+        if action == 'delete':
+            return events.delete(calendarId=calendar_id, eventId=operation['event_id'])
+
+        event = self._build_event(
+            summary=operation.get('summary'),
+            start_time=operation.get('start_time'),
+            end_time=operation.get('end_time'),
+            description=operation.get('description'),
+            location=operation.get('location'),
+            attendees=operation.get('attendees'),
+            recurrence=operation.get('recurrence'),
+            tz=tz
+        )
+        if not event:
+            raise ValueError("Keine Felder zum Aktualisieren angegeben")
+        request = events.patch(calendarId=calendar_id, eventId=operation['event_id'], body=event)
+        if operation.get('etag'):
+            request.headers['If-Match'] = operation['etag']
+        return request
+
+    async def batch_calendar_operations(self, operations: list, calendar_id: str = 'primary') -> dict:
+        """Mehrere Calendar Events per Batch Request erstellen/ändern/löschen"""
+        calendar = await self.service('calendar')
+        events = calendar.events()
+        results = [None] * len(operations)
+        requests = []
+
+        # Standard-Zeitzonen nur für Kalender mit Zeiten ohne eigene time_zone, je einmal
+        zone_ids = list({
+            operation.get('calendar_id', calendar_id) for operation in operations
+            if isinstance(operation, dict) and not operation.get('time_zone')
+            and (operation.get('start_time') or operation.get('end_time'))})
+        zones = dict(zip(zone_ids, await asyncio.gather(
+            *(self._calendar_zone(zone_id) for zone_id in zone_ids), return_exceptions=True)))
+
+        for index, operation in enumerate(operations):
+            try:
+                requests.append((str(index), self._calendar_operation_request(
+                    events, operation, calendar_id, zones)))
+            except (ValueError, AttributeError) as e:
+                action = operation.get('action') if isinstance(operation, dict) else None
+                results[index] = {'index': index, 'action': action, 'success': False, 'error': str(e)}
+
+        # Requests in Chunks bis zum Batch-Limit aufteilen und parallel senden
+        chunks = [
+            requests[start:start + CALENDAR_BATCH_LIMIT]
+            for start in range(0, len(requests), CALENDAR_BATCH_LIMIT)
+        ]
+        chunk_responses = await asyncio.gather(
+            *(self._execute_batch(calendar, chunk) for chunk in chunks),
+            return_exceptions=True
+        )
+        for changed in {calendar_id} | {
+                operation['calendar_id'] for operation in operations
+                if isinstance(operation, dict) and operation.get('calendar_id')}:
+            self._calendar_changed(changed, [
+                email for operation in operations if isinstance(operation, dict)
+                for email in operation.get('attendees') or []])
+
+        for chunk, responses in zip(chunks, chunk_responses):
+            for request_id, request in chunk:
+                index = int(request_id)
+                action = operations[index]['action']
+                # Ganzer Batch fehlgeschlagen (z.B. Netzwerkfehler)
+                if isinstance(responses, Exception):
+                    response, exception = None, responses
+                else:
+                    response, exception = responses.get(request_id, (None, None))
+
+                item = {'index': index, 'action': action}
+                if (action == 'insert' and isinstance(exception, HttpError)
+                        and exception.resp.status == 409):
+                    # Wiederholter Insert - Event existiert bereits aus dem ersten Versuch
+                    item.update(success=True, event_id=json.loads(request.body)['id'])
+                elif exception is not None:
+                    item.update(success=False, error=str(exception))
+                elif action == 'delete':
+                    item.update(success=True, event_id=operations[index]['event_id'])
+                else:
+                    item.update(success=True, event_id=response['id'])
+                    if action == 'insert':
+                        item['html_link'] = response.get('htmlLink')
+                    else:
+                        item['updated'] = response.get('updated')
+                results[index] = item
+
+        failed = sum(1 for item in results if not item['success'])
+        return {
+            'success': failed == 0,
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'results': results
+        }
+
 # MCP Server Setup
 app = Server("google-mcp-server")
-google_server = GoogleMCPServer()
+executor = ToolExecutor()
+google_server = GoogleMCPServer(executor)
+
+_handshake_logged = False
+
+ATTACHMENTS_SCHEMA = {
+    "type": "array",
+    "description": "Anhänge (optional) - Dateipfad oder base64-kodierter Inhalt",
+    "items": {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string", "description": "Pfad der Datei auf dem Server"},
+            "content_base64": {"type": "string", "description": "Inhalt base64-kodiert (statt path)"},
+            "filename": {"type": "string", "description": "Dateiname (bei path optional)"},
+            "mime_type": {"type": "string", "description": "MIME Typ (optional, sonst aus dem Dateinamen)"}
+        }
+    }
+}
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """Verfügbare Tools auflisten"""
-    return [
+    global _handshake_logged
+    if not _handshake_logged:
+        _handshake_logged = True
+        _log_timing('Erstes list_tools beantwortet')
+
+    tools = [
         Tool(
             name="send_email",
             description="Email über Gmail senden",
@@ -222,7 +2563,8 @@ async def list_tools() -> list[Tool]:
                     "to": {"type": "string", "description": "Empfänger Email"},
                     "subject": {"type": "string", "description": "Betreff"},
                     "body": {"type": "string", "description": "Email Text"},
-                    "cc": {"type": "string", "description": "CC Empfänger (optional)"}
+                    "cc": {"type": "string", "description": "CC Empfänger (optional)"},
+                    "attachments": ATTACHMENTS_SCHEMA
                 },
                 "required": ["to", "subject", "body"]
             }
@@ -236,11 +2578,231 @@ async def list_tools() -> list[Tool]:
                     "to": {"type": "string", "description": "Empfänger Email"},
                     "subject": {"type": "string", "description": "Betreff"},
                     "body": {"type": "string", "description": "Email Text"},
-                    "cc": {"type": "string", "description": "CC Empfänger (optional)"}
+                    "cc": {"type": "string", "description": "CC Empfänger (optional)"},
+                    "attachments": ATTACHMENTS_SCHEMA
                 },
                 "required": ["to", "subject", "body"]
             }
         ),
+        Tool(
+            name="send_bulk_email",
+            description="Viele Emails per Gmail Batch Request senden (Serienmail), mit Quota-Drosselung",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "messages": {
+                        "type": "array",
+                        "description": "Liste von Emails, Ergebnis wird pro Empfänger gemeldet",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "to": {"type": "string", "description": "Empfänger Email"},
+                                "subject": {"type": "string", "description": "Betreff"},
+                                "body": {"type": "string", "description": "Email Text"},
+                                "cc": {"type": "string", "description": "CC Empfänger (optional)"}
+                            },
+                            "required": ["to", "subject", "body"]
+                        }
+                    }
+                },
+                "required": ["messages"]
+            }
+        ),
+        Tool(
+            name="create_bulk_drafts",
+            description="Viele Email Entwürfe per Gmail Batch Request erstellen",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "messages": {
+                        "type": "array",
+                        "description": "Liste von Emails, Ergebnis wird pro Empfänger gemeldet",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "to": {"type": "string", "description": "Empfänger Email"},
+                                "subject": {"type": "string", "description": "Betreff"},
+                                "body": {"type": "string", "description": "Email Text"},
+                                "cc": {"type": "string", "description": "CC Empfänger (optional)"}
+                            },
+                            "required": ["to", "subject", "body"]
+                        }
+                    }
+                },
+                "required": ["messages"]
+            }
+        ),
+        Tool(
+            name="send_mail_merge",
+            description="Serienmail aus Vorlagen mit Platzhaltern {{feld}} bzw. {{feld|Ersatzwert}} "
+                        "senden oder als Entwürfe speichern, ein Datensatz pro Empfänger",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "recipients": {
+                        "type": "array",
+                        "description": "Empfänger-Datensätze, z.B. {\"email\": \"anna@example.com\", \"name\": \"Anna\"}",
+                        "items": {"type": "object"}
+                    },
+                    "subject": {"type": "string", "description": "Vorlage für den Betreff"},
+                    "body": {"type": "string", "description": "Vorlage für den Email Text"},
+                    "html": {"type": "string", "description": "Vorlage für die HTML Version (optional, Werte werden escaped)"},
+                    "to": {"type": "string", "description": "Vorlage für den Empfänger (default: {{email}})"},
+                    "cc": {"type": "string", "description": "Vorlage für CC (optional)"},
+                    "draft": {"type": "boolean", "description": "Als Entwürfe speichern statt senden (default: false)"}
+                },
+                "required": ["recipients", "subject", "body"]
+            }
+        ),
+        Tool(
+            name="search_emails",
+            description="Emails suchen (Gmail Suchsyntax, z.B. 'from:anna is:unread'). Liefert Metadaten, Bodies nur auf Wunsch; große Ergebnisse werden per next_cursor fortgesetzt",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Gmail Suchanfrage (optional)"},
+                    "max_results": {"type": "integer", "description": "Maximale Anzahl Emails (default: 20)"},
+                    "cursor": {"type": "string", "description": "next_cursor aus der vorherigen Antwort (optional)"},
+                    "include_body": {"type": "boolean", "description": "Email Text mitladen (default: false)"},
+                    "max_bytes": {"type": "integer", "description": "Maximale Antwortgröße in Bytes (optional)"},
+                    "source": {"type": "string", "enum": ["auto", "index", "api"], "description": "auto: lokaler Index wenn möglich (ohne Freitext), index: nur Index (Freitext nur in Header/Snippet), api: immer Gmail API"}
+                }
+            }
+        ),
+        Tool(
+            name="schedule_email",
+            description="Email zu einem späteren Zeitpunkt senden (übersteht Neustarts des Servers)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "to": {"type": "string", "description": "Empfänger Email"},
+                    "subject": {"type": "string", "description": "Betreff"},
+                    "body": {"type": "string", "description": "Email Text"},
+                    "cc": {"type": "string", "description": "CC Empfänger (optional)"},
+                    "send_at": {"type": "string", "description": "Sendezeitpunkt (ISO 8601, ohne Offset: time_zone)"},
+                    "time_zone": {"type": "string", "description": "IANA Zeitzone, z.B. America/New_York (optional, default: Zeitzone des Kalenders)"}
+                },
+                "required": ["to", "subject", "body", "send_at"]
+            }
+        ),
+        Tool(
+            name="list_scheduled_emails",
+            description="Geplante Emails mit Status auflisten",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "status": {
+                        "type": "string",
+                        "enum": ["pending", "sending", "sent", "failed", "cancelled"],
+                        "description": "Nur Jobs mit diesem Status (optional)"
+                    },
+                    "max_results": {"type": "integer", "description": "Maximale Anzahl (default: 100)"},
+                    "time_zone": {"type": "string", "description": "IANA Zeitzone der Antwort (optional, default: Zeitzone des Kalenders)"}
+                }
+            }
+        ),
+        Tool(
+            name="cancel_scheduled_email",
+            description="Geplante Email abbrechen, solange sie noch nicht gesendet wurde",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {"type": "string", "description": "Job ID aus schedule_email"}
+                },
+                "required": ["job_id"]
+            }
+        ),
+        Tool(
+            name="sync_mail_index",
+            description="Lokalen Mail Index mit Gmail synchronisieren (nur mit GOOGLE_MCP_MAIL_INDEX=1)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "full": {"type": "boolean", "description": "Index komplett neu aufbauen (default: false)"}
+                }
+            }
+        ),
+        Tool(
+            name="get_email",
+            description="Einzelne Email mit Text und Anhang-Liste laden",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "message_id": {"type": "string", "description": "Message ID"},
+                    "include_body": {"type": "boolean", "description": "Email Text mitladen (default: true)"},
+                    "max_bytes": {"type": "integer", "description": "Maximale Größe des Email Texts in Bytes (optional)"}
+                },
+                "required": ["message_id"]
+            }
+        ),
+        Tool(
+            name="get_thread",
+            description="Alle Emails eines Threads laden",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "thread_id": {"type": "string", "description": "Thread ID"},
+                    "include_body": {"type": "boolean", "description": "Email Texte mitladen (default: false)"},
+                    "max_bytes": {"type": "integer", "description": "Maximale Antwortgröße in Bytes (optional)"}
+                },
+                "required": ["thread_id"]
+            }
+        ),
+        Tool(
+            name="list_calendar_events",
+            description="Calendar Events in einem Zeitraum auflisten (aus dem lokal synchronisierten Kalender, Serien als einzelne Instanzen)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "time_min": {"type": "string", "description": "Beginn des Zeitraums (ISO 8601)"},
+                    "time_max": {"type": "string", "description": "Ende des Zeitraums (ISO 8601)"},
+                    "calendar_id": {"type": "string", "description": "Calendar ID (default: primary)"},
+                    "max_results": {"type": "integer", "description": "Maximale Anzahl Events (default: 250)"},
+                    "recurring_event_id": {"type": "string", "description": "Nur Instanzen dieser Serie (ID des Masters) (optional)"}
+                },
+                "required": ["time_min", "time_max"]
+            }
+        ),
+        Tool(
+            name="find_free_slots",
+            description="Freie Zeitfenster im eigenen Kalender innerhalb der Arbeitszeit finden",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "time_min": {"type": "string", "description": "Beginn des Zeitraums (ISO 8601)"},
+                    "time_max": {"type": "string", "description": "Ende des Zeitraums (ISO 8601)"},
+                    "duration_minutes": {"type": "integer", "description": "Mindestdauer in Minuten (default: 30)"},
+                    "calendar_id": {"type": "string", "description": "Calendar ID (default: primary)"},
+                    "working_hours_start": {"type": "string", "description": "Beginn der Arbeitszeit HH:MM (default: 09:00)"},
+                    "working_hours_end": {"type": "string", "description": "Ende der Arbeitszeit HH:MM (default: 18:00)"},
+                    "include_weekends": {"type": "boolean", "description": "Wochenenden einbeziehen (default: false)"},
+                    "max_results": {"type": "integer", "description": "Maximale Anzahl Slots (default: 10)"}
+                },
+                "required": ["time_min", "time_max"]
+            }
+        ),
+        Tool(
+            name="suggest_meeting_times",
+            description="Gemeinsame freie Termine für mehrere Teilnehmer vorschlagen (Free/Busy), sortiert nach Eignung",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "attendees": {"type": "array", "items": {"type": "string"}, "description": "Pflicht-Teilnehmer Emails"},
+                    "duration_minutes": {"type": "integer", "minimum": 1, "description": "Dauer in Minuten (default: 30)"},
+                    "time_min": {"type": "string", "description": "Beginn des Suchzeitraums (ISO 8601, default: jetzt)"},
+                    "time_max": {"type": "string", "description": "Ende des Suchzeitraums (ISO 8601, default: +14 Tage, max. 180 Tage)"},
+                    "optional_attendees": {"type": "array", "items": {"type": "string"}, "description": "Optionale Teilnehmer - beeinflussen nur die Reihenfolge"},
+                    "calendar_id": {"type": "string", "description": "Eigener Kalender (default: primary)"},
+                    "working_hours_start": {"type": "string", "description": "Beginn der Arbeitszeit HH:MM (default: 09:00)"},
+                    "working_hours_end": {"type": "string", "description": "Ende der Arbeitszeit HH:MM (default: 18:00)"},
+                    "include_weekends": {"type": "boolean", "description": "Wochenenden einbeziehen (default: false)"},
+                    "step_minutes": {"type": "integer", "minimum": 1, "description": "Raster der Startzeiten in Minuten (default: 30)"},
+                    "max_per_day": {"type": "integer", "description": "Maximale Vorschläge pro Tag (default: 2)"},
+                    "max_results": {"type": "integer", "description": "Maximale Anzahl Vorschläge (default: 10)"}
+                },
+                "required": ["attendees"]
+            }
+        ),
         Tool(
             name="create_calendar_event",
             description="Neues Calendar Event erstellen",
@@ -248,12 +2810,20 @@ async def list_tools() -> list[Tool]:
                 "type": "object",
                 "properties": {
                     "summary": {"type": "string", "description": "Event Titel"},
-                    "start_time": {"type": "string", "description": "Start (ISO 8601, z.B. 2025-10-10T10:00:00)"},
+                    "start_time": {"type": "string", "description": "Start (ISO 8601, z.B. 2025-10-10T10:00:00 - ohne Offset in time_zone)"},
                     "end_time": {"type": "string", "description": "Ende (ISO 8601)"},
+                    "time_zone": {"type": "string", "description": "IANA Zeitzone, z.B. America/New_York (optional, default: Zeitzone des Kalenders)"},
                     "description": {"type": "string", "description": "Beschreibung (optional)"},
                     "location": {"type": "string", "description": "Ort (optional)"},
                     "attendees": {"type": "array", "items": {"type": "string"}, "description": "Teilnehmer Emails (optional)"},
-                    "calendar_id": {"type": "string", "description": "Calendar ID (default: primary)"}
+                    "calendar_id": {"type": "string", "description": "Calendar ID (default: primary)"},
+                    "check_conflicts": {
+                        "type": "string",
+                        "enum": ["off", "reject", "warn", "propose"],
+                        "description": "Free/Busy Prüfung von Kalender und Teilnehmern: reject = bei Konflikt nicht erstellen, warn = trotzdem erstellen, propose = nicht erstellen und freie Alternativen vorschlagen (default: off)"
+                    },
+                    "propose_count": {"type": "integer", "description": "Anzahl vorgeschlagener Alternativen bei propose (default: 3)"},
+                    "recurrence": {"type": "array", "items": {"type": "string"}, "description": "Wiederholung als RFC 5545 Zeilen, z.B. [\"RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10\", \"EXDATE;TZID=Europe/Berlin:20251013T100000\"] (optional)"}
                 },
                 "required": ["summary", "start_time", "end_time"]
             }
@@ -269,7 +2839,13 @@ async def list_tools() -> list[Tool]:
                     "summary": {"type": "string", "description": "Neuer Titel (optional)"},
                     "start_time": {"type": "string", "description": "Neue Startzeit (optional)"},
                     "end_time": {"type": "string", "description": "Neue Endzeit (optional)"},
-                    "description": {"type": "string", "description": "Neue Beschreibung (optional)"}
+                    "time_zone": {"type": "string", "description": "IANA Zeitzone für Zeiten ohne Offset (optional, default: Zeitzone des Events)"},
+                    "description": {"type": "string", "description": "Neue Beschreibung (optional)"},
+                    "location": {"type": "string", "description": "Neuer Ort (optional)"},
+                    "attendees": {"type": "array", "items": {"type": "string"}, "description": "Teilnehmer Emails - ersetzt die Liste (optional)"},
+                    "merge_attendees": {"type": "boolean", "description": "Teilnehmer zur bestehenden Liste hinzufügen statt ersetzen (default: false)"},
+                    "etag": {"type": "string", "description": "ETag aus vorheriger Antwort - Änderung schlägt fehl, wenn das Event inzwischen geändert wurde (optional)"},
+                    "recurrence": {"type": "array", "items": {"type": "string"}, "description": "Neue Wiederholungsregeln der Serie (RFC 5545 Zeilen, ersetzt die bisherigen, nur mit der ID des Masters) (optional)"}
                 },
                 "required": ["event_id"]
             }
@@ -285,51 +2861,268 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["event_id"]
             }
+        ),
+        Tool(
+            name="batch_calendar_operations",
+            description="Viele Calendar Events in einem Batch Request erstellen, ändern oder löschen",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "operations": {
+                        "type": "array",
+                        "description": "Liste von Operationen, Ergebnis wird pro Eintrag gemeldet",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "action": {"type": "string", "enum": ["insert", "patch", "delete"], "description": "Aktion"},
+                                "event_id": {"type": "string", "description": "Event ID (für patch/delete)"},
+                                "etag": {"type": "string", "description": "ETag für patch (optional)"},
+                                "calendar_id": {"type": "string", "description": "Calendar ID (optional, überschreibt Default)"},
+                                "summary": {"type": "string", "description": "Event Titel"},
+                                "start_time": {"type": "string", "description": "Start (ISO 8601)"},
+                                "end_time": {"type": "string", "description": "Ende (ISO 8601)"},
+                                "time_zone": {"type": "string", "description": "IANA Zeitzone (optional, default: Zeitzone des Kalenders)"},
+                                "description": {"type": "string", "description": "Beschreibung"},
+                                "location": {"type": "string", "description": "Ort"},
+                                "attendees": {"type": "array", "items": {"type": "string"}, "description": "Teilnehmer Emails"},
+                                "recurrence": {"type": "array", "items": {"type": "string"}, "description": "Wiederholung als RFC 5545 Zeilen (RRULE:, EXDATE, RDATE)"}
+                            },
+                            "required": ["action"]
+                        }
+                    },
+                    "calendar_id": {"type": "string", "description": "Calendar ID (default: primary)"}
+                },
+                "required": ["operations"]
+            }
+        ),
+        Tool(
+            name="get_quota_status",
+            description="Diagnose: aktuelle Quota-Auslastung pro API, Circuit Breaker und Cache des Accounts",
+            inputSchema={
+                "type": "object",
+                "properties": {}
+            }
         )
     ]
+    # Jedes Tool kann für einen anderen Account ausgeführt werden
+    for tool in tools:
+        tool.inputSchema["properties"]["account"] = {
+            "type": "string",
+            "description": "Google Account (optional, default: Standard-Account bzw. "
+                           "Header X-Google-Account)"
+        }
+    return tools
+
+def _bearer_matches(supplied: str, token: Optional[str]) -> bool:
+    """Authorization Header gegen ein Bearer Token prüfen (zeitkonstant)"""
+    import hmac
+    return token is not None and hmac.compare_digest(supplied, f'Bearer {token}')
+
+def _request_account(arguments: dict) -> str:
+    """Account aus dem Tool-Argument, sonst aus dem HTTP Header der Session
+
+    Im HTTP Modus muss der Request das Token des Accounts vorlegen
+    (GOOGLE_MCP_HTTP_ACCOUNT_TOKENS, Standard-Account: GOOGLE_MCP_HTTP_TOKEN).
+    Ohne Angabe gilt der Account, zu dem das Token gehört.
+    """
+    account = arguments.pop("account", None)
+    try:
+        request = app.request_context.request
+    except LookupError:
+        request = None
+    headers = getattr(request, 'headers', None)
+    if SERVER_TRANSPORT != 'http':
+        return account or (headers.get(ACCOUNT_HEADER) if headers else None) or DEFAULT_ACCOUNT
+
+    supplied = headers.get('authorization', '') if headers else ''
+    account = account or (headers.get(ACCOUNT_HEADER) if headers else None) or next(
+        (name for name, token in HTTP_ACCOUNT_TOKENS.items() if _bearer_matches(supplied, token)),
+        DEFAULT_ACCOUNT)
+    if account == DEFAULT_ACCOUNT:
+        if HTTP_AUTH_TOKEN and not _bearer_matches(supplied, HTTP_AUTH_TOKEN):
+            raise PermissionError("Standard-Account nur mit GOOGLE_MCP_HTTP_TOKEN")
+    elif account not in HTTP_ACCOUNT_TOKENS:
+        raise PermissionError(f"Account {account} ist im HTTP Modus nicht freigegeben "
+                              "(GOOGLE_MCP_HTTP_ACCOUNT_TOKENS)")
+    elif not _bearer_matches(supplied, HTTP_ACCOUNT_TOKENS[account]):
+        raise PermissionError(f"Falsches Token für Account {account}")
+    return account
+
+def _progress_reporter():
+    """Progress Callback für den laufenden MCP Request - None ohne progressToken"""
+    ctx = app.request_context
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return None
+
+    async def report(done: int, total: int, message: Optional[str] = None):
+        await ctx.session.send_progress_notification(
+            token, done, total=total, message=message, related_request_id=ctx.request_id)
+
+    return report
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     """Tool ausführen"""
     try:
+        arguments = dict(arguments or {})
+        _current_account.set(google_server.accounts.get(_request_account(arguments)))
         if name == "send_email":
-            result = google_server.send_email(
+            result = await google_server.send_email(
                 to=arguments["to"],
                 subject=arguments["subject"],
                 body=arguments["body"],
-                cc=arguments.get("cc")
+                cc=arguments.get("cc"),
+                attachments=arguments.get("attachments")
             )
         elif name == "create_draft":
-            result = google_server.create_draft(
+            result = await google_server.create_draft(
+                to=arguments["to"],
+                subject=arguments["subject"],
+                body=arguments["body"],
+                cc=arguments.get("cc"),
+                attachments=arguments.get("attachments")
+            )
+        elif name == "send_bulk_email":
+            result = await google_server.send_bulk_email(
+                messages=arguments["messages"],
+                progress=_progress_reporter()
+            )
+        elif name == "create_bulk_drafts":
+            result = await google_server.create_bulk_drafts(
+                messages=arguments["messages"],
+                progress=_progress_reporter()
+            )
+        elif name == "send_mail_merge":
+            result = await google_server.send_mail_merge(
+                recipients=arguments["recipients"],
+                subject=arguments["subject"],
+                body=arguments["body"],
+                to=arguments.get("to", "{{email}}"),
+                html=arguments.get("html"),
+                cc=arguments.get("cc"),
+                draft=arguments.get("draft", False),
+                progress=_progress_reporter()
+            )
+        elif name == "search_emails":
+            result = await google_server.search_emails(
+                query=arguments.get("query", ""),
+                max_results=arguments.get("max_results", 20),
+                cursor=arguments.get("cursor"),
+                include_body=arguments.get("include_body", False),
+                max_bytes=arguments.get("max_bytes", MAX_RESULT_BYTES),
+                source=arguments.get("source", "auto")
+            )
+        elif name == "schedule_email":
+            result = await google_server.schedule_email(
                 to=arguments["to"],
                 subject=arguments["subject"],
                 body=arguments["body"],
-                cc=arguments.get("cc")
+                send_at=arguments["send_at"],
+                cc=arguments.get("cc"),
+                time_zone=arguments.get("time_zone")
+            )
+        elif name == "list_scheduled_emails":
+            result = await google_server.list_scheduled_emails(
+                status=arguments.get("status"),
+                max_results=arguments.get("max_results", 100),
+                time_zone=arguments.get("time_zone")
+            )
+        elif name == "cancel_scheduled_email":
+            result = await google_server.cancel_scheduled_email(
+                job_id=arguments["job_id"]
+            )
+        elif name == "sync_mail_index":
+            result = await google_server.sync_mail_index(
+                full=arguments.get("full", False)
+            )
+        elif name == "get_email":
+            result = await google_server.get_email(
+                message_id=arguments["message_id"],
+                include_body=arguments.get("include_body", True),
+                max_bytes=arguments.get("max_bytes", MAX_RESULT_BYTES)
+            )
+        elif name == "get_thread":
+            result = await google_server.get_thread(
+                thread_id=arguments["thread_id"],
+                include_body=arguments.get("include_body", False),
+                max_bytes=arguments.get("max_bytes", MAX_RESULT_BYTES)
+            )
+        elif name == "list_calendar_events":
+            result = await google_server.list_calendar_events(
+                time_min=arguments["time_min"],
+                time_max=arguments["time_max"],
+                calendar_id=arguments.get("calendar_id", "primary"),
+                max_results=arguments.get("max_results", 250),
+                recurring_event_id=arguments.get("recurring_event_id")
+            )
+        elif name == "find_free_slots":
+            result = await google_server.find_free_slots(
+                time_min=arguments["time_min"],
+                time_max=arguments["time_max"],
+                duration_minutes=arguments.get("duration_minutes", 30),
+                calendar_id=arguments.get("calendar_id", "primary"),
+                working_hours_start=arguments.get("working_hours_start", "09:00"),
+                working_hours_end=arguments.get("working_hours_end", "18:00"),
+                include_weekends=arguments.get("include_weekends", False),
+                max_results=arguments.get("max_results", 10)
+            )
+        elif name == "suggest_meeting_times":
+            result = await google_server.suggest_meeting_times(
+                attendees=arguments["attendees"],
+                duration_minutes=arguments.get("duration_minutes", 30),
+                time_min=arguments.get("time_min"),
+                time_max=arguments.get("time_max"),
+                optional_attendees=arguments.get("optional_attendees"),
+                calendar_id=arguments.get("calendar_id", "primary"),
+                working_hours_start=arguments.get("working_hours_start", "09:00"),
+                working_hours_end=arguments.get("working_hours_end", "18:00"),
+                include_weekends=arguments.get("include_weekends", False),
+                step_minutes=arguments.get("step_minutes", 30),
+                max_per_day=arguments.get("max_per_day", 2),
+                max_results=arguments.get("max_results", 10)
             )
         elif name == "create_calendar_event":
-            result = google_server.create_calendar_event(
+            result = await google_server.create_calendar_event(
                 summary=arguments["summary"],
                 start_time=arguments["start_time"],
                 end_time=arguments["end_time"],
                 description=arguments.get("description"),
                 location=arguments.get("location"),
                 attendees=arguments.get("attendees"),
-                calendar_id=arguments.get("calendar_id", "primary")
+                calendar_id=arguments.get("calendar_id", "primary"),
+                check_conflicts=arguments.get("check_conflicts", "off"),
+                propose_count=arguments.get("propose_count", 3),
+                recurrence=arguments.get("recurrence"),
+                time_zone=arguments.get("time_zone")
             )
         elif name == "update_calendar_event":
-            result = google_server.update_calendar_event(
+            result = await google_server.update_calendar_event(
                 event_id=arguments["event_id"],
                 calendar_id=arguments.get("calendar_id", "primary"),
                 summary=arguments.get("summary"),
                 start_time=arguments.get("start_time"),
                 end_time=arguments.get("end_time"),
-                description=arguments.get("description")
+                description=arguments.get("description"),
+                location=arguments.get("location"),
+                attendees=arguments.get("attendees"),
+                merge_attendees=arguments.get("merge_attendees", False),
+                etag=arguments.get("etag"),
+                recurrence=arguments.get("recurrence"),
+                time_zone=arguments.get("time_zone")
             )
         elif name == "delete_calendar_event":
-            result = google_server.delete_calendar_event(
+            result = await google_server.delete_calendar_event(
                 event_id=arguments["event_id"],
                 calendar_id=arguments.get("calendar_id", "primary")
             )
+        elif name == "batch_calendar_operations":
+            result = await google_server.batch_calendar_operations(
+                operations=arguments["operations"],
+                calendar_id=arguments.get("calendar_id", "primary")
+            )
+        elif name == "get_quota_status":
+            result = google_server.quota_status()
         else:
             raise ValueError(f"Unknown tool: {name}")
 
@@ -338,11 +3131,85 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     except Exception as e:
         return [TextContent(type="text", text=f"Error: {str(e)}")]
 
-async def main():
-    """Server starten"""
-    # Authentifizierung beim Start
-    google_server.authenticate()
+class MCPHttpEndpoint:
+    """ASGI Endpoint für /mcp - prüft das optionale Bearer Token und reicht an den Session Manager weiter
+
+    Account Tokens öffnen den Endpoint ebenfalls, welchen Account ein
+    Request nutzen darf, entscheidet _request_account.
+    """
+
+    def __init__(self, session_manager, token: Optional[str], account_tokens: Optional[dict] = None):
+        self.session_manager = session_manager
+        self.token = token
+        self.account_tokens = account_tokens or {}
+
+    async def __call__(self, scope, receive, send):
+        if self.token:
+            from starlette.responses import JSONResponse
+
+            supplied = dict(scope['headers']).get(b'authorization', b'').decode('latin-1')
+            tokens = [self.token, *self.account_tokens.values()]
+            if not any([_bearer_matches(supplied, token) for token in tokens]):
+                response = JSONResponse({'error': 'Unauthorized'}, status_code=401)
+                await response(scope, receive, send)
+                return
+        await self.session_manager.handle_request(scope, receive, send)
+
+def create_http_app(worker: bool = False):
+    """Starlette App für den Streamable HTTP Transport (POST/GET/DELETE auf /mcp)
 
+    Jede Client Session ist nur ein Session-Objekt im selben Prozess - alle
+    teilen google_server, also Credentials, Connection Pool und Caches.
+    Als Worker Prozess (worker=True) sind Sessions zustandslos und die
+    Hintergrund-Tasks laufen im Lifespan der App - nur in einem der Worker.
+    """
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from mcp.server.transport_security import TransportSecuritySettings
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    allowed_hosts = HTTP_ALLOWED_HOSTS or [
+        f'{host}:{HTTP_PORT}' for host in ('127.0.0.1', 'localhost', '[::1]')]
+    session_manager = StreamableHTTPSessionManager(
+        app=app,
+        stateless=worker,
+        security_settings=TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=allowed_hosts,
+            allowed_origins=[f'http://{host}' for host in allowed_hosts]
+        )
+    )
+
+    async def health(request):
+        return JSONResponse({
+            'status': 'ok',
+            'pid': os.getpid(),
+            'authenticated': google_server.creds is not None,
+            'pending_calls': executor.pending
+        })
+
+    @asynccontextmanager
+    async def lifespan(_):
+        async with (background_tasks(elect=True) if worker else nullcontext()), session_manager.run():
+            yield
+
+    return Starlette(
+        routes=[
+            Route(HTTP_PATH,
+                  endpoint=MCPHttpEndpoint(session_manager, HTTP_AUTH_TOKEN, HTTP_ACCOUNT_TOKENS),
+                  methods=['GET', 'POST', 'DELETE']),
+            Route('/health', endpoint=health, methods=['GET']),
+        ],
+        lifespan=lifespan
+    )
+
+def create_worker_app():
+    """App Factory für uvicorn Worker Prozesse (GOOGLE_MCP_HTTP_WORKERS > 1)"""
+    return create_http_app(worker=True)
+
+async def serve_stdio():
+    """Ein Client über stdin/stdout"""
     async with stdio_server() as (read_stream, write_stream):
         await app.run(
             read_stream,
@@ -350,5 +3217,95 @@ async def main():
             app.create_initialization_options()
         )
 
+def _warn_unprotected_http():
+    """Warnung, wenn der HTTP Server ohne Token im Netzwerk erreichbar ist"""
+    if HTTP_HOST not in ('127.0.0.1', 'localhost', '::1') and not HTTP_AUTH_TOKEN:
+        print(f"⚠️  HTTP Server auf {HTTP_HOST} ohne GOOGLE_MCP_HTTP_TOKEN - "
+              "jeder im Netzwerk kann Emails senden", file=sys.stderr)
+
+async def serve_http():
+    """Viele Clients über Streamable HTTP/SSE"""
+    import uvicorn
+
+    _warn_unprotected_http()
+    config = uvicorn.Config(
+        create_http_app(), host=HTTP_HOST, port=HTTP_PORT, log_level='warning')
+    print(f"🌐 MCP Server auf http://{HTTP_HOST}:{HTTP_PORT}{HTTP_PATH}", file=sys.stderr)
+    await uvicorn.Server(config).serve()
+
+def serve_http_workers():
+    """HTTP Modus mit HTTP_WORKERS Prozessen - blockiert, startet eigene Event Loops"""
+    import uvicorn
+
+    _warn_unprotected_http()
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    print(f"🌐 MCP Server auf http://{HTTP_HOST}:{HTTP_PORT}{HTTP_PATH} "
+          f"({HTTP_WORKERS} Worker Prozesse)", file=sys.stderr)
+    uvicorn.run(
+        f'{module}:create_worker_app', factory=True, workers=HTTP_WORKERS,
+        host=HTTP_HOST, port=HTTP_PORT, log_level='warning')
+
+async def _run_background():
+    """Token Refresh, Mail Sync und Scheduler"""
+    # Authentifizierung läuft im Hintergrund, der Handshake wartet nicht darauf.
+    # Danach wird das Token im Hintergrund vor Ablauf erneuert
+    await asyncio.gather(
+        google_server.run_token_refresher(),
+        google_server.run_mail_sync(),
+        google_server.run_scheduler(),
+        return_exceptions=True
+    )
+
+async def _run_background_elected():
+    """Hintergrund-Tasks nur im Worker Prozess, der den Lock hält
+
+    Sonst würden alle Worker parallel synchronisieren und geplante Emails
+    versenden. Die übrigen erneuern Tokens bei Bedarf (token_store) und
+    übernehmen, sobald der gewählte Prozess endet.
+    """
+    lock_path = os.path.join(os.path.dirname(TOKEN_PATH), 'background')
+    while True:
+        with token_store.try_locked(lock_path) as elected:
+            if elected:
+                await _run_background()
+                return
+        await asyncio.sleep(BACKGROUND_ELECTION_RETRY)
+
+@asynccontextmanager
+async def background_tasks(elect: bool = False):
+    """Token Refresh und Mail Sync im Hintergrund, beim Beenden alles schließen
+
+    elect: Worker Prozess - Hintergrund-Tasks laufen nur in einem der Prozesse
+    """
+    background = asyncio.create_task(
+        _run_background_elected() if elect else _run_background())
+
+    try:
+        yield
+    finally:
+        background.cancel()
+        if google_server.transport is not None:
+            await google_server.transport.aclose()
+        if google_server.mail_index is not None:
+            google_server.mail_index.close()
+        if google_server.calendar_store is not None:
+            google_server.calendar_store.close()
+        if google_server.schedule_store is not None:
+            google_server.schedule_store.close()
+        executor.shutdown()
+
+async def main():
+    """Server starten"""
+    _log_timing('Imports abgeschlossen')
+
+    async with background_tasks():
+        if SERVER_TRANSPORT == 'http':
+            await serve_http()
+        else:
+            await serve_stdio()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    if SERVER_TRANSPORT == 'http' and HTTP_WORKERS > 1:
+        serve_http_workers()
+    else:
+        asyncio.run(main())
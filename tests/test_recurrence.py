@@ -0,0 +1,198 @@
+"""
+Tests für recurrence.py - Beispiele aus RFC 5545, Abschnitt 3.8.5.3
+
+Start: python -m pytest tests (oder python -m unittest discover tests)
+"""
+
+import os
+import sys
+import unittest
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recurrence import Series, UnsupportedRule  # noqa: E402
+from timezones import get_zone  # noqa: E402
+
+NEW_YORK = get_zone('America/New_York')
+
+
+def timed_series(start: str, *recurrence: str, minutes: int = 60) -> Series:
+    """Serie mit Ortszeit start (America/New_York) und den recurrence Zeilen"""
+    begin = datetime.fromisoformat(start)
+    end = begin + timedelta(minutes=minutes)
+    return Series({
+        'id': 'ev',
+        'start': {'dateTime': begin.isoformat(), 'timeZone': NEW_YORK.key},
+        'end': {'dateTime': end.isoformat(), 'timeZone': NEW_YORK.key},
+        'recurrence': list(recurrence),
+    }, NEW_YORK)
+
+
+def all_day_series(start: str, *recurrence: str) -> Series:
+    """Ganztägige Serie (ein Tag) ab start"""
+    first = date.fromisoformat(start)
+    return Series({
+        'id': 'ev',
+        'start': {'date': first.isoformat()},
+        'end': {'date': (first + timedelta(days=1)).isoformat()},
+        'recurrence': list(recurrence),
+    }, NEW_YORK)
+
+
+def local_starts(series: Series, until: str, excluded=()) -> list:
+    """Startzeiten bis until als Ortszeit-Strings 'YYYY-MM-DD HH:MM'"""
+    start = datetime(1990, 1, 1, tzinfo=NEW_YORK).timestamp()
+    end = datetime.fromisoformat(until).replace(tzinfo=NEW_YORK).timestamp()
+    return [datetime.fromtimestamp(timestamp, NEW_YORK).strftime('%Y-%m-%d %H:%M')
+            for timestamp in series.between(start, end, excluded)]
+
+
+def at_nine(*days: str) -> list:
+    return [f'{day} 09:00' for day in days]
+
+
+class RfcExamplesTest(unittest.TestCase):
+    """Regeln und erwartete Instanzen wie im RFC"""
+
+    def test_daily_count(self):
+        series = timed_series('1997-09-02T09:00:00', 'RRULE:FREQ=DAILY;COUNT=10')
+        self.assertEqual(local_starts(series, '1998-01-01T00:00:00'), at_nine(
+            '1997-09-02', '1997-09-03', '1997-09-04', '1997-09-05', '1997-09-06',
+            '1997-09-07', '1997-09-08', '1997-09-09', '1997-09-10', '1997-09-11'))
+
+    def test_weekly_until_with_wkst(self):
+        series = timed_series(
+            '1997-09-02T09:00:00', 'RRULE:FREQ=WEEKLY;UNTIL=19971007T000000Z;WKST=SU;BYDAY=TU,TH')
+        self.assertEqual(local_starts(series, '1998-01-01T00:00:00'), at_nine(
+            '1997-09-02', '1997-09-04', '1997-09-09', '1997-09-11', '1997-09-16',
+            '1997-09-18', '1997-09-23', '1997-09-25', '1997-09-30', '1997-10-02'))
+
+    def test_monthly_first_friday(self):
+        series = timed_series('1997-09-05T09:00:00', 'RRULE:FREQ=MONTHLY;COUNT=10;BYDAY=1FR')
+        self.assertEqual(local_starts(series, '1999-01-01T00:00:00'), at_nine(
+            '1997-09-05', '1997-10-03', '1997-11-07', '1997-12-05', '1998-01-02',
+            '1998-02-06', '1998-03-06', '1998-04-03', '1998-05-01', '1998-06-05'))
+
+    def test_monthly_negative_byday(self):
+        series = timed_series('1997-09-22T09:00:00', 'RRULE:FREQ=MONTHLY;COUNT=6;BYDAY=-2MO')
+        self.assertEqual(local_starts(series, '1999-01-01T00:00:00'), at_nine(
+            '1997-09-22', '1997-10-20', '1997-11-17', '1997-12-22', '1998-01-19',
+            '1998-02-16'))
+
+    def test_monthly_negative_bymonthday(self):
+        series = timed_series('1997-09-28T09:00:00', 'RRULE:FREQ=MONTHLY;COUNT=6;BYMONTHDAY=-3')
+        self.assertEqual(local_starts(series, '1999-01-01T00:00:00'), at_nine(
+            '1997-09-28', '1997-10-29', '1997-11-28', '1997-12-29', '1998-01-29',
+            '1998-02-26'))
+
+    def test_bysetpos_last_work_day(self):
+        series = timed_series(
+            '1997-09-30T09:00:00', 'RRULE:FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1')
+        self.assertEqual(local_starts(series, '1998-04-01T00:00:00'), at_nine(
+            '1997-09-30', '1997-10-31', '1997-11-28', '1997-12-31', '1998-01-30',
+            '1998-02-27', '1998-03-31'))
+
+    def test_bysetpos_third_weekday(self):
+        series = timed_series(
+            '1997-09-04T09:00:00', 'RRULE:FREQ=MONTHLY;COUNT=3;BYDAY=TU,WE,TH;BYSETPOS=3')
+        self.assertEqual(local_starts(series, '1999-01-01T00:00:00'), at_nine(
+            '1997-09-04', '1997-10-07', '1997-11-06'))
+
+    def test_friday_13th_with_exdate(self):
+        series = timed_series(
+            '1997-09-02T09:00:00',
+            'EXDATE;TZID=America/New_York:19970902T090000',
+            'RRULE:FREQ=MONTHLY;BYDAY=FR;BYMONTHDAY=13')
+        self.assertEqual(local_starts(series, '2001-01-01T00:00:00'), at_nine(
+            '1998-02-13', '1998-03-13', '1998-11-13', '1999-08-13', '2000-10-13'))
+
+    def test_yearly_bymonth(self):
+        series = timed_series('1997-06-10T09:00:00', 'RRULE:FREQ=YEARLY;COUNT=10;BYMONTH=6,7')
+        self.assertEqual(local_starts(series, '2003-01-01T00:00:00'), at_nine(
+            '1997-06-10', '1997-07-10', '1998-06-10', '1998-07-10', '1999-06-10',
+            '1999-07-10', '2000-06-10', '2000-07-10', '2001-06-10', '2001-07-10'))
+
+    def test_yearly_twentieth_monday(self):
+        series = timed_series('1997-05-19T09:00:00', 'RRULE:FREQ=YEARLY;BYDAY=20MO')
+        self.assertEqual(local_starts(series, '2000-01-01T00:00:00'), at_nine(
+            '1997-05-19', '1998-05-18', '1999-05-17'))
+
+
+class ExceptionsTest(unittest.TestCase):
+    """EXDATE, RDATE, COUNT mit Ausnahmen, UNTIL bei ganztägigen Serien, Sommerzeit"""
+
+    def test_count_includes_excluded_dates(self):
+        # EXDATE entfernt Instanzen aus der Menge, die COUNT erzeugt - es gibt keinen Ersatz
+        series = timed_series(
+            '2025-03-03T09:00:00',
+            'RRULE:FREQ=DAILY;COUNT=5',
+            'EXDATE;TZID=America/New_York:20250305T090000')
+        self.assertEqual(local_starts(series, '2025-04-01T00:00:00'), at_nine(
+            '2025-03-03', '2025-03-04', '2025-03-06', '2025-03-07'))
+
+    def test_count_with_changed_instances(self):
+        # Geänderte oder abgesagte Instanzen (Ausnahmen) zählen für COUNT mit
+        series = timed_series('2025-03-03T09:00:00', 'RRULE:FREQ=DAILY;COUNT=3')
+        changed = datetime(2025, 3, 4, 9, tzinfo=NEW_YORK).timestamp()
+        self.assertEqual(local_starts(series, '2025-04-01T00:00:00', {changed}), at_nine(
+            '2025-03-03', '2025-03-05'))
+
+    def test_rdate_adds_instances(self):
+        series = timed_series(
+            '2025-03-03T09:00:00',
+            'RRULE:FREQ=WEEKLY;COUNT=2',
+            'RDATE;TZID=America/New_York:20250305T090000,20250303T090000')
+        self.assertEqual(local_starts(series, '2025-04-01T00:00:00'), at_nine(
+            '2025-03-03', '2025-03-05', '2025-03-10'))
+
+    def test_exdate_in_utc(self):
+        series = timed_series(
+            '2025-03-03T09:00:00', 'RRULE:FREQ=DAILY;COUNT=3', 'EXDATE:20250304T140000Z')
+        self.assertEqual(local_starts(series, '2025-04-01T00:00:00'), at_nine(
+            '2025-03-03', '2025-03-05'))
+
+    def test_all_day_until_date_is_inclusive(self):
+        series = all_day_series('2025-01-06', 'RRULE:FREQ=WEEKLY;UNTIL=20250127')
+        self.assertEqual(local_starts(series, '2025-06-01T00:00:00'), [
+            '2025-01-06 00:00', '2025-01-13 00:00', '2025-01-20 00:00', '2025-01-27 00:00'])
+
+    def test_all_day_exdate(self):
+        series = all_day_series(
+            '2025-01-06', 'RRULE:FREQ=DAILY;COUNT=3', 'EXDATE;VALUE=DATE:20250107')
+        self.assertEqual(local_starts(series, '2025-06-01T00:00:00'), [
+            '2025-01-06 00:00', '2025-01-08 00:00'])
+
+    def test_all_day_bounds_across_dst(self):
+        # 2025-03-09: Umstellung auf Sommerzeit, der Tag hat 23 Stunden
+        series = all_day_series('2025-03-08', 'RRULE:FREQ=DAILY;COUNT=3')
+        start = datetime(2025, 3, 9, tzinfo=NEW_YORK).timestamp()
+        self.assertEqual(series.bounds(start)[1] - start, 23 * 3600)
+
+    def test_wall_time_kept_across_dst(self):
+        series = timed_series('2025-11-01T09:00:00', 'RRULE:FREQ=DAILY;COUNT=3')
+        self.assertEqual(local_starts(series, '2025-12-01T00:00:00'), at_nine(
+            '2025-11-01', '2025-11-02', '2025-11-03'))
+
+    def test_overlap_includes_running_instance(self):
+        series = timed_series('2025-03-03T09:00:00', 'RRULE:FREQ=DAILY;COUNT=3', minutes=120)
+        start = datetime(2025, 3, 4, 10, tzinfo=NEW_YORK).timestamp()
+        self.assertEqual(series.between(start, start + 60),
+                         [datetime(2025, 3, 4, 9, tzinfo=NEW_YORK).timestamp()])
+
+    def test_instance_id_follows_api_scheme(self):
+        series = timed_series('2025-03-03T09:00:00', 'RRULE:FREQ=DAILY;COUNT=2')
+        instance = series.instance(datetime(2025, 3, 4, 9, tzinfo=NEW_YORK).timestamp())
+        self.assertEqual(instance['id'], 'ev_20250304T140000Z')
+        self.assertEqual(instance['recurringEventId'], 'ev')
+        self.assertNotIn('recurrence', instance)
+
+    def test_unsupported_rule(self):
+        with self.assertRaises(UnsupportedRule):
+            timed_series('2025-03-03T09:00:00', 'RRULE:FREQ=HOURLY;COUNT=2')
+        with self.assertRaises(UnsupportedRule):
+            timed_series('2025-03-03T09:00:00', 'RRULE:FREQ=YEARLY;BYWEEKNO=20')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+Zeitzonen für Calendar Events
+
+get_zone() merkt sich die ZoneInfo Objekte (lru_cache): legt ein Batch
+viele Events in verschiedenen Zonen an, wird die tz Datenbank pro Zone nur
+einmal gefragt. localize() bringt ISO 8601 Zeitpunkte in eine Zone - ohne
+Offset gelten sie als Ortszeit dieser Zone, mit Offset wird umgerechnet.
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+@lru_cache(maxsize=256)
+def get_zone(name: str) -> ZoneInfo:
+    """ZoneInfo zu einem IANA Namen (z.B. 'America/New_York')"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unbekannte Zeitzone: {name}") from None
+
+
+def localize(value: str, tz: ZoneInfo) -> datetime:
+    """ISO 8601 Zeitpunkt als aware datetime in tz
+
+    Eine Ortszeit, die es wegen der Zeitumstellung in tz nicht gibt
+    (z.B. 02:30 am Tag der Umstellung auf Sommerzeit), ist ein Fehler.
+    """
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Ungültiger Zeitpunkt: {value!r} (erwartet ISO 8601)") from None
+    if parsed.tzinfo is not None:
+        return parsed.astimezone(tz)
+    local = parsed.replace(tzinfo=tz)
+    if local.astimezone(timezone.utc).astimezone(tz).replace(tzinfo=None) != parsed:
+        raise ValueError(f"{value} existiert in {tz.key} nicht (Zeitumstellung)")
+    return local
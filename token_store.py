@@ -0,0 +1,86 @@
+"""
+Token-Datei, die sich mehrere Server-Prozesse teilen
+
+Im HTTP Modus mit mehreren Worker Prozessen (GOOGLE_MCP_HTTP_WORKERS)
+liest jeder Prozess dasselbe token.json. Erneuert wird unter einem
+exklusiven File Lock: wer den Lock bekommt, prüft zuerst, ob ein anderer
+Prozess das Token inzwischen erneuert hat, und übernimmt es dann nur.
+So erneuert pro Ablauf genau ein Prozess das Token bei Google.
+
+try_locked() wartet nicht: damit wählen die Worker Prozesse einen aus,
+der die Hintergrund-Tasks (Token Refresh, Mail Sync, Scheduler) ausführt.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def locked(path: str):
+    """Exklusiver Lock über Prozesse hinweg (Lock-Datei <path>.lock)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def try_locked(path: str):
+    """Wie locked(), aber ohne zu warten - liefert False, wenn ein anderer Prozess den Lock hält"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'a+') as lock_file:
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def adopt_stored_token(creds, path: str, scopes: list) -> bool:
+    """Neueres Token aus der Datei in creds übernehmen (in-place) - Lock muss gehalten werden
+
+    True, wenn ein anderer Prozess bereits erneuert hat und creds jetzt
+    dessen Token verwendet.
+    """
+    from google.oauth2.credentials import Credentials
+
+    if not os.path.exists(path):
+        return False
+    stored = Credentials.from_authorized_user_file(path, scopes)
+    if not stored.valid or stored.token == creds.token:
+        return False
+    if creds.expiry is not None and stored.expiry is not None and stored.expiry <= creds.expiry:
+        return False
+    creds.token = stored.token
+    creds.expiry = stored.expiry
+    return True